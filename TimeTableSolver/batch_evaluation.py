@@ -0,0 +1,111 @@
+"""
+    This module evaluates all soft constraints of a whole timetable at once with NumPy.
+    The events of the timetable are collected in one pass into arrays, afterwards every penalty is an array reduction.
+    The result is equal to soft_constraints.return_total_penalty_of_timetable, which stays as the reference.
+"""
+import itertools
+import numpy as np
+
+
+def get_penalty_arrays(context):
+    """
+    :param context: instance of SolverContext, its ids have to be interned
+    :return: the capacity and site of every class room, and the not_home and distance penalty of every curriculum
+             on every site, as arrays indexed by the integer ids, built the first time they are requested
+    """
+    if context.penalty_arrays is None:
+        curriculum_site_penalties = context.get_curriculum_site_penalties()
+        capacities = np.zeros(len(context.class_rooms_dict))
+        room_sites = np.zeros(len(context.class_rooms_dict), dtype=np.intp)
+        for fi_number, room in context.class_rooms_dict.items():
+            capacities[fi_number] = room.capacity
+            room_sites[fi_number] = room.site_id
+        not_home = np.zeros((len(context.curricula_dict), len(context.sites_dict)))
+        distance = np.zeros((len(context.curricula_dict), len(context.sites_dict)))
+        for curriculum_code, site_penalties in curriculum_site_penalties.items():
+            for site_code, (not_home_penalty, distance_penalty) in site_penalties.items():
+                not_home[curriculum_code, site_code] = not_home_penalty
+                distance[curriculum_code, site_code] = distance_penalty
+        context.penalty_arrays = (capacities, room_sites, not_home, distance)
+    return context.penalty_arrays
+
+
+class BatchEvaluation:
+
+    def __init__(self, timetable):
+        """
+        Evaluates all soft constraints of the timetable, the penalties are attributes with the same names as the
+        sums of the DeltaEvaluator.
+        :param timetable: instance of TimeTable
+        """
+        self.timetable = timetable
+        self.context = timetable.context
+        time_slots = self.context.total_course_hours
+        capacities, room_sites, not_home, distance = get_penalty_arrays(self.context)
+
+        # one entry per event, and one entry per curriculum of an event
+        positions = np.array(list(self.timetable.occupied_positions), dtype=np.intp).reshape(-1, 2)
+        rooms = positions[:, 0]
+        event_time_slots = positions[:, 1]
+        events = [self.timetable.timetable[position] for position in self.timetable.occupied_positions]
+        student_amounts = np.array([course_event.student_amount for course_event in events], dtype=float)
+        pair_events = np.repeat(np.arange(len(events)), [len(course_event.curricula) for course_event in events])
+        pair_curricula = np.fromiter(itertools.chain.from_iterable(course_event.curricula for course_event in events),
+                                     dtype=np.intp, count=len(pair_events))
+        pair_sites = room_sites[rooms][pair_events]
+        pair_time_slots = event_time_slots[pair_events]
+
+        # curriculum x time slot matrices of the week: the events of this timetable, and the occupied time slots
+        # of the curricula in the context, which are the ones that decide if an event is the only one on its day
+        amount_of_curricula = len(self.context.curricula_dict)
+        self.curriculum_events = np.bincount(pair_curricula * time_slots + pair_time_slots,
+                                             minlength=amount_of_curricula * time_slots) \
+            .reshape(amount_of_curricula, time_slots)
+        week_masks = np.array([curriculum.occupied_mask >> (time_slots * self.timetable.offset) & (1 << time_slots) - 1
+                               for curriculum in self.context.curricula_dict.values()], dtype=np.int64)
+        self.curriculum_occupancy = week_masks[:, np.newaxis] >> np.arange(time_slots) & 1
+
+        self.amount_of_events = len(rooms)
+        self.late_hour_penalty = int(np.count_nonzero(event_time_slots % 8 >= 6)) * self.context.late_hour_penalty
+        self.room_size_total = float((student_amounts / capacities[rooms]).sum())
+        self.not_home_penalty = float(not_home[pair_curricula, pair_sites].sum())
+        self.distance_penalty = float(distance[pair_curricula, pair_sites].sum())
+        self.one_hour_penalty = int(self.get_curriculum_day_penalties().sum())
+        # the straight hours penalty counts the occupied time slots of the whole semester
+        self.curriculum_penalties = [max(0, len(curriculum.occupied_time_slots) - 4)
+                                     for curriculum in self.context.curricula_dict.values()]
+        self.straight_hours_penalty = sum(self.curriculum_penalties)
+
+    def get_curriculum_day_events(self):
+        """
+        :return: array of curricula x days of the week with the amount of events of this timetable
+        """
+        amount_of_curricula, time_slots = self.curriculum_events.shape
+        return self.curriculum_events.reshape(amount_of_curricula, time_slots // 8, 8).sum(axis=2)
+
+    def get_curriculum_day_penalties(self):
+        """
+        Every event of a curriculum that is the only lesson on its day gets a penalty.
+        :return: array of curricula x days of the week with the only one hour penalty
+        """
+        amount_of_curricula, time_slots = self.curriculum_occupancy.shape
+        occupied_time_slots = self.curriculum_occupancy.reshape(amount_of_curricula, time_slots // 8, 8).sum(axis=2)
+        return np.where(occupied_time_slots == 1, self.get_curriculum_day_events(), 0)
+
+    def get_total_cost(self):
+        """
+        :return: the total cost, combined in the same way as soft_constraints.return_total_penalty_of_timetable
+        """
+        room_size = 0
+        if self.amount_of_events > 0:
+            room_size = self.room_size_total / self.amount_of_events
+        return float(self.late_hour_penalty) + float(self.one_hour_penalty) + float(self.straight_hours_penalty) \
+            + float(room_size) + float(self.not_home_penalty) + 4 * self.distance_penalty / 75
+
+
+def return_total_penalty_of_timetable(timetable):
+    """
+    :param timetable: instance of TimeTable
+    :return: the total penalty of the timetable
+    """
+    return BatchEvaluation(timetable).get_total_cost()
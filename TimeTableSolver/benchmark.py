@@ -0,0 +1,153 @@
+"""
+    This module runs the full pipeline on a matrix of instances and seeds and writes the measurements to a json file.
+    Every phase gets its wall time and, with --memory, the peak memory traced by tracemalloc.
+    Worker processes are not traced, so with --workers the memory of the parallel phases is incomplete.
+
+    Example: python benchmark.py datasets/project.json datasets/synthetic.json --seeds 1 2 3 -o benchmark.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+import batch_evaluation as be
+import generate_output as go
+import instance_cache
+import process_input
+import timetable_builder as tb
+
+
+class PhaseRecorder:
+
+    def __init__(self, trace_memory=False):
+        """
+        Measures the wall time and peak memory of named phases, in the order they are run.
+        :param trace_memory: True to measure the peak memory of every phase with tracemalloc
+        """
+        self.trace_memory = trace_memory
+        self.phases = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            measurement = {'phase': name, 'wall_time': time.perf_counter() - start_time}
+            if self.trace_memory:
+                measurement['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            self.phases.append(measurement)
+
+
+def run(instance_path, seed, workers=None, trace_memory=False, use_cache=False, time_limit=None, replicas=None,
+        compact_output=False, construction="greedy", grid=False):
+    """
+    This function solves one instance with one seed.
+    :param instance_path: the path to the json file of the instance
+    :param seed: the seed of the random generator
+    :param workers: the amount of worker processes, None to solve everything in this process
+    :param trace_memory: True to measure the peak memory of every phase
+    :param use_cache: True to load the instance through the binary instance cache
+    :param time_limit: the amount of seconds for the build, None for the default time of every sub problem
+    :param replicas: the amount of parallel tempering replicas in the improvement phase, None for one chain
+    :param compact_output: True to merge the reservations of the output over weeks and consecutive hours
+    :param construction: the engine that constructs the initial timetables, one of tb.construction_engines
+    :param grid: True to keep the timetables in NumPy arrays, see grid_timetable
+    :return: dictionary with the measurements of the run
+    """
+    random.seed(seed)
+    recorder = PhaseRecorder(trace_memory)
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        start_time = time.perf_counter()
+        with recorder.phase("process input"):
+            if use_cache:
+                context = instance_cache.load_context(instance_path)
+            else:
+                context = process_input.load_context(instance_path)
+            timetable = process_input.create_initial_timetable(context, grid)
+            events_1, events_2, events_3, events_4 = process_input.create_initial_events_lists(context)
+
+        timetable_builder = tb.TimeTableBuilder(context=context,
+                                                timetable=timetable,
+                                                events_1=events_1,
+                                                events_2=events_2,
+                                                events_3=events_3,
+                                                events_4=events_4,
+                                                courses_set=context.courses_set,
+                                                start_time=start_time,
+                                                workers=workers,
+                                                phase_recorder=recorder,
+                                                time_limit=time_limit,
+                                                replicas=replicas,
+                                                construction=construction)
+        timetable_weeks = timetable_builder.build_timetable()
+
+        with recorder.phase("generate output"):
+            with tempfile.TemporaryDirectory() as directory:
+                go.generate_output_from_time_table(timetable_weeks, os.path.join(directory, "output.json"),
+                                                   compact_output)
+        wall_time = time.perf_counter() - start_time
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    penalties = [be.return_total_penalty_of_timetable(timetable) for timetable, weeks in timetable_weeks]
+    return {'instance': instance_path,
+            'seed': seed,
+            'workers': workers,
+            'time_limit': time_limit,
+            'replicas': replicas,
+            'compact_output': compact_output,
+            'construction': construction,
+            'grid': grid,
+            'wall_time': wall_time,
+            'phases': recorder.phases,
+            'events': {1: len(events_1), 2: len(events_2), 3: len(events_3), 4: len(events_4)},
+            'unplaced': timetable_builder.unplaced_counts,
+            'penalty': sum(penalties),
+            'penalty_per_week': penalties}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the timetable solver on instances and seeds.")
+    parser.add_argument('instances', nargs='*', default=[process_input.default_path])
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--memory', action='store_true', help="measure the peak memory of every phase")
+    parser.add_argument('--cache', action='store_true', help="load the instances through the binary cache")
+    parser.add_argument('--time-limit', type=float, default=None, help="seconds for the build of every run")
+    parser.add_argument('--replicas', type=int, default=None, help="parallel tempering replicas, needs --workers")
+    parser.add_argument('--construction', choices=sorted(tb.construction_engines), default="greedy")
+    parser.add_argument('--compact-output', action='store_true', help="merge the reservations of the output")
+    parser.add_argument('--grid-timetable', action='store_true', help="keep the timetables in NumPy arrays")
+    parser.add_argument('-o', '--output', default="benchmark.json")
+    arguments = parser.parse_args()
+    if arguments.replicas is not None and (arguments.workers is None or arguments.workers < 2):
+        parser.error("--replicas needs --workers with at least two worker processes")
+
+    results = {'created': datetime.datetime.now().isoformat(),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'runs': []}
+    for instance_path in arguments.instances:
+        for seed in arguments.seeds:
+            print("Benchmarking " + instance_path + " with seed " + str(seed))
+            results['runs'].append(run(instance_path, seed, arguments.workers, arguments.memory, arguments.cache,
+                                       arguments.time_limit, arguments.replicas, arguments.compact_output,
+                                       arguments.construction, arguments.grid_timetable))
+            # the results are written after every run, so an interrupted benchmark keeps its measurements
+            with open(arguments.output, 'w') as f:
+                json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
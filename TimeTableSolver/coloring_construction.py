@@ -0,0 +1,220 @@
+"""
+    This module holds a construction in two stages: first every event gets a time slot by graph coloring,
+    then the events of every time slot get their rooms.
+"""
+import bisect
+import heapq
+import time
+import room_assignment as ra
+
+
+class ColoringConstruction:
+
+    def __init__(self, events_list, courses_set, timetable):
+        """
+        An alternative for ConstructTimeTable with the same interface.
+        The time slots are the colors of a DSATUR coloring of the events: the event with the fewest time slots left
+        gets a time slot first. A time slot is left for an event if a lecturer is free, none of the curricula is
+        occupied and the free rooms of the time slot can still hold the event together with the events that already
+        got the time slot. Afterwards the events of every time slot are packed into its free rooms.
+        :param events_list: list of instances of CourseEvent
+        :param courses_set: set of all courses, only there for the same interface as ConstructTimeTable
+        :param timetable: instance of TimeTable
+        """
+        self.events = events_list
+        self.courses = courses_set
+        self.timetable = timetable
+        self.context = timetable.context
+        self.conflict_graph = self.context.get_conflict_graph()
+        self.time_slots = self.context.total_course_hours
+        self.week_mask = (1 << self.time_slots) - 1
+        # the time slots that got taken during the coloring, per lecturer and curriculum, as bitsets of the week
+        self.colored_lecturers = {}
+        self.colored_curricula = {}
+        # per time slot: the capacities of the free rooms, largest first, and the sizes of the colored events,
+        # smallest first, negated so they are sorted largest first
+        self.capacities = []
+        self.negated_sizes = []
+        self.max_sizes = []  # per time slot: the largest event that still fits next to the colored events
+        for time_slot in range(self.time_slots):
+            capacities = [capacity for capacity, fi_number in self.timetable.free_rooms.free_rooms[time_slot]]
+            capacities.reverse()
+            self.capacities.append(capacities)
+            self.negated_sizes.append([])
+            self.max_sizes.append(capacities[0] if len(capacities) > 0 else 0)
+
+    def construct(self, max_time=None):
+        """
+        :param max_time: the amount of seconds the coloring may take, None for no limit,
+                         the events that did not get a time slot when the time is up stay unplaced
+        :return: the events that did not get a time slot and the timetable
+        """
+        deadline = None
+        if max_time is not None:
+            deadline = time.monotonic() + max_time
+        colors = self.color_events(deadline)
+        unplaced_events = [course_event for index, course_event in enumerate(self.events) if index not in colors]
+        self.pack_rooms(colors)
+        return unplaced_events, self.timetable
+
+    def get_week_mask(self, occupied_mask):
+        """
+        :param occupied_mask: the occupied time slots of a lecturer or curriculum in the semester
+        :return: the occupied time slots in the week of the timetable
+        """
+        return occupied_mask >> (self.time_slots * self.timetable.offset) & self.week_mask
+
+    def get_available_mask(self, course_event):
+        """
+        :param course_event: instance of CourseEvent
+        :return: bitset of the time slots of the week that are left for the event
+        """
+        free_lecturers_mask = 0
+        for ugent_id in course_event.lecturers:
+            occupied_mask = self.get_week_mask(self.context.lecturers_dict[ugent_id].occupied_mask)
+            free_lecturers_mask |= ~(occupied_mask | self.colored_lecturers.get(ugent_id, 0))
+        occupied_curricula_mask = 0
+        for curriculum_code in course_event.curricula:
+            occupied_mask = self.get_week_mask(self.context.curricula_dict[curriculum_code].occupied_mask)
+            occupied_curricula_mask |= occupied_mask | self.colored_curricula.get(curriculum_code, 0)
+        available_mask = free_lecturers_mask & ~occupied_curricula_mask & self.week_mask
+        for time_slot in range(self.time_slots):
+            if course_event.student_amount > self.max_sizes[time_slot]:
+                available_mask &= ~(1 << time_slot)
+        return available_mask
+
+    def compute_max_size(self, time_slot):
+        """
+        The events fit into the rooms if the largest events, in order, fit into the largest rooms.
+        A new event fits if the events that come after it in that order still fit when they shift one room.
+        :param time_slot: time slot of the week
+        :return: the size of the largest event that still fits into the time slot
+        """
+        capacities = self.capacities[time_slot]
+        negated_sizes = self.negated_sizes[time_slot]
+        if len(negated_sizes) >= len(capacities):
+            return 0
+        index = len(negated_sizes)
+        while index > 0 and -negated_sizes[index - 1] <= capacities[index]:
+            index -= 1
+        if index == 0:
+            return capacities[0]
+        return min(capacities[index], -negated_sizes[index - 1])
+
+    def get_best_time_slot(self, available_mask):
+        """
+        The time slots outside the last two hours of a day come first, then the time slots with the fewest events,
+        so the events get spread over the week.
+        :param available_mask: bitset of the time slots that are left for an event
+        :return: the time slot for the event
+        """
+        best_key = None
+        best_time_slot = None
+        for time_slot in range(self.time_slots):
+            if available_mask >> time_slot & 1:
+                key = (time_slot % 8 >= 6, len(self.negated_sizes[time_slot]))
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best_time_slot = time_slot
+        return best_time_slot
+
+    def get_free_lecturer(self, course_event, time_slot):
+        """
+        :return: the ugent_id of the first lecturer of the event that is free in the time slot
+        """
+        for ugent_id in course_event.lecturers:
+            occupied_mask = self.get_week_mask(self.context.lecturers_dict[ugent_id].occupied_mask) \
+                | self.colored_lecturers.get(ugent_id, 0)
+            if not occupied_mask >> time_slot & 1:
+                return ugent_id
+        return None
+
+    def color_events(self, deadline=None):
+        """
+        This function gives the events a time slot, the event with the fewest time slots left first.
+        Ties are broken by the degree of the course in the conflict graph and then by the amount of students.
+        :param deadline: the time.monotonic() at which the coloring stops, None for no limit
+        :return: dictionary index of a course event -> (time slot, ugent_id of its lecturer)
+        """
+        events = self.events
+        events_of_course = {}
+        for index, course_event in enumerate(events):
+            events_of_course.setdefault(course_event.course_code, []).append(index)
+        by_size = sorted(range(len(events)), key=lambda i: events[i].student_amount)
+        sizes = [events[index].student_amount for index in by_size]
+        degrees = [self.conflict_graph.get_degree(course_event.course_code) for course_event in events]
+
+        masks = [self.get_available_mask(course_event) for course_event in events]
+        counts = [bin(mask).count("1") for mask in masks]
+        heap = [(counts[i], -degrees[i], -events[i].student_amount, i) for i in range(len(events))]
+        heapq.heapify(heap)
+        colored = [False] * len(events)
+        colors = {}
+
+        def update(index, mask):
+            masks[index] = mask
+            count = bin(mask).count("1")
+            if count != counts[index]:
+                counts[index] = count
+                heapq.heappush(heap, (count, -degrees[index], -events[index].student_amount, index))
+
+        while len(heap) > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            count, degree, students, index = heapq.heappop(heap)
+            if colored[index] or count != counts[index]:
+                continue  # an entry of an event that is colored already, or that has fewer time slots by now
+            colored[index] = True
+            if count == 0:
+                continue  # the event stays unplaced
+            course_event = events[index]
+            time_slot = self.get_best_time_slot(masks[index])
+            ugent_id = self.get_free_lecturer(course_event, time_slot)
+            colors[index] = (time_slot, ugent_id)
+
+            # take the time slot for the lecturer, the curricula and the rooms
+            self.colored_lecturers[ugent_id] = self.colored_lecturers.get(ugent_id, 0) | 1 << time_slot
+            for curriculum_code in course_event.curricula:
+                self.colored_curricula[curriculum_code] = self.colored_curricula.get(curriculum_code, 0) \
+                    | 1 << time_slot
+            bisect.insort(self.negated_sizes[time_slot], -course_event.student_amount)
+            old_max_size = self.max_sizes[time_slot]
+            self.max_sizes[time_slot] = self.compute_max_size(time_slot)
+
+            # the events that share a lecturer or a curriculum can lose the time slot
+            course_codes = set(self.conflict_graph.get_courses_of_lecturer(ugent_id))
+            for curriculum_code in course_event.curricula:
+                course_codes.update(self.conflict_graph.get_courses_of_curriculum(curriculum_code))
+            course_codes.add(course_event.course_code)
+            for course_code in course_codes:
+                for other_index in events_of_course.get(course_code, ()):
+                    if not colored[other_index] and masks[other_index] >> time_slot & 1:
+                        update(other_index, self.get_available_mask(events[other_index]))
+            # the events that are too big for the rooms that are left lose the time slot
+            first = bisect.bisect_right(sizes, self.max_sizes[time_slot])
+            last = bisect.bisect_right(sizes, old_max_size)
+            for other_index in by_size[first:last]:
+                if not colored[other_index] and masks[other_index] >> time_slot & 1:
+                    update(other_index, masks[other_index] & ~(1 << time_slot))
+        return colors
+
+    def pack_rooms(self, colors):
+        """
+        This function assigns the events of every time slot to its free rooms with an optimal room assignment.
+        The coloring made sure that the free rooms can hold all events of a time slot.
+        :param colors: dictionary index of a course event -> (time slot, ugent_id of its lecturer)
+        """
+        events_of_time_slot = {}
+        for index, (time_slot, ugent_id) in colors.items():
+            events_of_time_slot.setdefault(time_slot, []).append((self.events[index], ugent_id))
+
+        room_assignment = ra.RoomAssignment(self.timetable)
+        amount_of_events = len(self.timetable.occupied_positions) + len(colors)
+        for time_slot, events in events_of_time_slot.items():
+            rooms = [self.context.class_rooms_dict[fi_number]
+                     for capacity, fi_number in self.timetable.free_rooms.free_rooms[time_slot]]
+            costs = [room_assignment.get_costs(course_event, rooms, amount_of_events)
+                     for course_event, ugent_id in events]
+            assignment = ra.hungarian(costs)
+            for (course_event, ugent_id), column in zip(events, assignment):
+                self.timetable.assign_course_to_position(course_event, (rooms[column].fi_number, time_slot), ugent_id)
@@ -0,0 +1,63 @@
+"""
+    This module holds the conflict graph between courses.
+"""
+
+
+class ConflictGraph:
+
+    def __init__(self, courses):
+        """
+        Two courses are in conflict if they have a common lecturer or a common curriculum.
+        The graph is built once from inverted indexes, so no pair of courses has to be compared.
+        :param courses: iterable of instances of Course
+        """
+        self.courses_by_lecturer = {}  # ugent_id -> set of course codes
+        self.courses_by_curriculum = {}  # curriculum_code -> set of course codes
+        self.neighbours = {}  # course_code -> set of conflicting course codes
+
+        for course in courses:
+            for ugent_id in course.lecturers:
+                self.courses_by_lecturer.setdefault(ugent_id, set()).add(course.code)
+            for curriculum_code in course.curricula:
+                self.courses_by_curriculum.setdefault(curriculum_code, set()).add(course.code)
+            self.neighbours[course.code] = set()
+
+        for course in courses:
+            neighbours = self.neighbours[course.code]
+            for ugent_id in course.lecturers:
+                neighbours.update(self.courses_by_lecturer[ugent_id])
+            for curriculum_code in course.curricula:
+                neighbours.update(self.courses_by_curriculum[curriculum_code])
+            neighbours.discard(course.code)
+
+    def get_neighbours(self, course_code):
+        """
+        :param course_code: the code of a course
+        :return: set of the codes of all courses that are in conflict with the given course
+        """
+        return self.neighbours.get(course_code, set())
+
+    def get_degree(self, course_code):
+        """
+        :param course_code: the code of a course
+        :return: the amount of courses that are in conflict with the given course
+        """
+        return len(self.get_neighbours(course_code))
+
+    def are_conflicting(self, course_code_1, course_code_2):
+        """
+        :return: True if the two courses have a common lecturer or curriculum, False otherwise
+        """
+        return course_code_2 in self.get_neighbours(course_code_1)
+
+    def get_courses_of_lecturer(self, ugent_id):
+        """
+        :return: set of the codes of all courses given by the lecturer
+        """
+        return self.courses_by_lecturer.get(ugent_id, set())
+
+    def get_courses_of_curriculum(self, curriculum_code):
+        """
+        :return: set of the codes of all courses that are part of the curriculum
+        """
+        return self.courses_by_curriculum.get(curriculum_code, set())
@@ -1,7 +1,7 @@
 import hard_constraints as hc
 import soft_constraints as sc
 import math
-import general_info as gi
+import time
 
 
 class ConstructTimeTable:
@@ -10,30 +10,37 @@ class ConstructTimeTable:
         self.events = events_list
         self.courses = courses_set
         self.timetable = timetable
+        self.context = timetable.context
 
-    def construct(self):
+    def construct(self, max_time=None):
         """
         This function will try to build an initial timetable using an heuristic approach.
         It will prioritize "harder" events, and try to place them in their best positions.
         This process will end if either a feasible timetable is build, or the time limit is reached.
+        :param max_time: the amount of seconds the construction may take, None for no limit,
+                         the events that were not tried when the time is up stay unplaced
+        :return: the events that could not be placed and the timetable
         """
-
+        deadline = None
+        if max_time is not None:
+            deadline = time.monotonic() + max_time
         unplaced_events = []
 
         # the events get sorted, harder to place events will get placed first
         sorted_events = self.order_course_events_by_priority(self.events, self.courses)
         # collect all available positions for this event
         for index, course_event in enumerate(sorted_events):
+            if deadline is not None and time.monotonic() >= deadline:
+                unplaced_events += sorted_events[index:]
+                break
             available_positions = []
-            for room_fi_number, time_slot in self.timetable.empty_positions:
-                room = gi.class_rooms_dict[room_fi_number]
-                fits = hc.course_event_fits_into_time_slot(course_event,
-                                                           time_slot + self.timetable.offset * 40
-                                                           ) and hc.room_capacity_constraint(
-                                                                                             course_event,
-                                                                                             room
-                                                                                            )
-                if fits:
+            # all time slots of this week in which the event fits, computed at once
+            time_slots_mask = hc.available_time_slots_mask(self.context, course_event, self.timetable.offset)
+            for time_slot in hc.time_slots_in_mask(time_slots_mask):
+                # only the free rooms that are big enough, found with a bisect on capacity
+                free_rooms = self.timetable.free_rooms.free_rooms_with_capacity(time_slot,
+                                                                                course_event.student_amount)
+                for capacity, room_fi_number in free_rooms:
                     available_positions.append((room_fi_number, time_slot))
             # if no available positions were found, the event gets added to unplaced_events
             if len(available_positions) == 0:
@@ -68,8 +75,7 @@ class ConstructTimeTable:
             # and we want to order from biggest priority value to smallest
             rank1 = self.get_events_ranking1(course_event, lectures_amount[course_event.course_code])
             course_events_ranking[course_event.course_code].append(1 / rank1 if rank1 != 0 else 0)
-            course_events_ranking[course_event.course_code].append(
-                self.get_events_ranking2(course_event, list(courses_set)))
+            course_events_ranking[course_event.course_code].append(self.get_events_ranking2(course_event))
 
         courses_sorted = list(course_events)
         courses_sorted.sort(key=lambda cr: course_events_ranking[cr.course_code], reverse=True)
@@ -87,43 +93,12 @@ class ConstructTimeTable:
             lectures_amount[course.code] = course.course_hours
         return lectures_amount
 
-    @staticmethod
-    def compute_amount_of_available_time_slots(course_event):
+    def compute_amount_of_available_time_slots(self, course_event):
         """
         :param course_event: an instance of course event
         :return: the total number of available time slots for the given course
         """
-        amount = 0
-        for i in range(gi.total_course_hours):
-            if hc.course_event_fits_into_time_slot(course_event, i):
-                amount += 1
-        return amount
-
-    @staticmethod
-    def have_common_lecturers(course_event, course):
-        """
-        Checks if the two courses have a common lecturer.
-        :param course_event: instance of CourseEvent
-        :param course: instance of course
-        :return: True if there is at least one common lecturer, False otherwise
-        """
-        for lecturer in course_event.lecturers:
-            if lecturer in course.lecturers:
-                return True
-        return False
-
-    @staticmethod
-    def have_common_curricula(course_event, course):
-        """
-        Checks if two courses have a common curriculum.
-        :param course_event: instance of CourseEvent
-        :param course: instance of course
-        :return: True if there is at least one common curriculum, False otherwise
-        """
-        for curriculum in course_event.curricula:
-            if curriculum in course.curricula:
-                return True
-        return False
+        return hc.count_time_slots_in_mask(hc.available_time_slots_mask(self.context, course_event))
 
     def get_events_ranking1(self, course_event, amount_of_events):
         """
@@ -140,21 +115,14 @@ class ConstructTimeTable:
         rank = total_number_of_available_time_slots / math.sqrt(amount_of_events)
         return rank
 
-    def get_events_ranking2(self, course_event, courses):
+    def get_events_ranking2(self, course_event):
         """
         Order priority by conflict, a conflict is a course_event with has the same lecturer as another event,
         or is part of the same curriculum of another event.
         :param course_event: an instance of course event
-        :param courses: a list of all courses
-        :return: the rank of the given course
+        :return: the rank of the given course, its degree in the conflict graph
         """
-        amount = 0
-        for curr_course in courses:
-            if course_event.course_code != curr_course.code:
-                if self.have_common_lecturers(course_event, curr_course) or self.have_common_curricula(course_event,
-                                                                                                       curr_course):
-                    amount += 1
-        rank = amount
+        rank = self.context.get_conflict_graph().get_degree(course_event.course_code)
         return rank
 
     def order_positions_by_priority(self, positions, course_event):
@@ -172,7 +140,7 @@ class ConstructTimeTable:
             positions_ranking[room_fi_number] = []
 
         for room_fi_number, time_slot in positions:
-            room = gi.class_rooms_dict[room_fi_number]
+            room = self.context.class_rooms_dict[room_fi_number]
             rank1 = self.get_positions_ranking1(room, course_event)
             positions_ranking[room.fi_number].append(rank1)
             rank2 = self.get_positions_ranking2(room, course_event)
@@ -180,15 +148,14 @@ class ConstructTimeTable:
         positions.sort(key=lambda tup: positions_ranking[tup[0]], reverse=False)
         return positions
 
-    @staticmethod
-    def get_positions_ranking1(room, course_event):
+    def get_positions_ranking1(self, room, course_event):
         """
         Rank1 is equal to the not home penalty, the smaller the better.
         :param room: an instance of ClassRoom
         :param course_event: instance of CourseEvent
         :return: the not home penalty
         """
-        return sc.return_not_home_penalty(room, course_event)
+        return sc.return_not_home_penalty(self.context, room, course_event)
 
     @staticmethod
     def get_positions_ranking2(room, course_event):
@@ -1,10 +1,18 @@
 import hard_constraints as hc
-import general_info as gi
 import math
 import copy
+import random
+import bisect
+
+
+# the code of a course, the ugent_id of a lecturer, the code of a curriculum or site and the fi_number of a class room
+# are dense integer ids once the instance is loaded, see SolverContext.intern_ids
 
 
 class Course:
+    __slots__ = ("code", "name", "student_amount", "contact_hours", "course_hours", "lecturers", "curricula",
+                 "course_events")
+
     def __init__(self, code, name, student_amount, contact_hours, lecturers, curricula):
         self.code = code
         self.name = name
@@ -17,46 +25,58 @@ class Course:
 
 
 class Lecturer:
+    __slots__ = ("ugent_id", "first_name", "last_name", "occupied_time_slots", "occupied_mask")
+
     def __init__(self, ugent_id, first_name, last_name):
         self.ugent_id = ugent_id
         self.first_name = first_name
         self.last_name = last_name
         self.occupied_time_slots = set()
+        self.occupied_mask = 0  # bit i is set if time slot i of the semester is occupied
 
     def add_occupied_time_slot(self, time_slot_number):
         if time_slot_number in self.occupied_time_slots:
             return False
         self.occupied_time_slots.add(time_slot_number)
+        self.occupied_mask |= 1 << time_slot_number
         return True
 
     def remove_occupied_time_slot(self, time_slot_number):
         self.occupied_time_slots.discard(time_slot_number)
+        self.occupied_mask &= ~(1 << time_slot_number)
 
     def contains_time_slot(self, time_slot_number):
-        return time_slot_number in self.occupied_time_slots
+        return self.occupied_mask >> time_slot_number & 1 == 1
 
 
 class Curriculum:
+    __slots__ = ("code", "mt1", "home_site", "occupied_time_slots", "occupied_mask")
+
     def __init__(self, code, mt1, home_site):
         self.code = code
         self.mt1 = mt1
         self.home_site = home_site
         self.occupied_time_slots = set()
+        self.occupied_mask = 0  # bit i is set if time slot i of the semester is occupied
 
     def add_occupied_time_slot(self, time_slot_number):
         if time_slot_number in self.occupied_time_slots:
             return False
         self.occupied_time_slots.add(time_slot_number)
+        self.occupied_mask |= 1 << time_slot_number
         return True
 
     def remove_occupied_time_slot(self, time_slot_number):
         self.occupied_time_slots.discard(time_slot_number)
+        self.occupied_mask &= ~(1 << time_slot_number)
 
     def contains_time_slot(self, time_slot_number):
-        return time_slot_number in self.occupied_time_slots
+        return self.occupied_mask >> time_slot_number & 1 == 1
 
 
 class Site:
+    __slots__ = ("code", "name", "x_coord", "y_coord", "class_rooms")
+
     def __init__(self, code, name, x_coord, y_coord, class_rooms):
         self.code = code
         self.name = name
@@ -66,6 +86,8 @@ class Site:
 
 
 class ClassRoom:
+    __slots__ = ("fi_number", "name", "capacity", "site_id")
+
     def __init__(self, fi_number, name, capacity, site_id):
         self.fi_number = fi_number
         self.name = name
@@ -74,37 +96,332 @@ class ClassRoom:
 
 
 class CourseEvent:
+    __slots__ = ("course_code", "lecturers", "student_amount", "curricula", "event_number")
+
     def __init__(self, course_code, lecturers, student_amount, curricula, event_number):
         self.course_code = course_code
         self.lecturers = lecturers
         self.student_amount = student_amount
         self.curricula = curricula
         self.event_number = event_number
-        self.assigned_lecturer = None
 
-    def set_assigned_lecturer(self, ugent_id):
-        if self.assigned_lecturer is None:
-            self.assigned_lecturer = copy.deepcopy(ugent_id)
-            return True
-        return False
 
-    def remove_assigned_lecturer(self):
-        self.assigned_lecturer = None
+class IndexedSet:
+    """
+    A set that also keeps its items in a list, so adding, removing and picking a random item are all O(1).
+    """
+
+    def __init__(self, items=()):
+        self.items = []
+        self.indexes = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item in self.indexes:
+            return False
+        self.indexes[item] = len(self.items)
+        self.items.append(item)
+        return True
+
+    def append(self, item):
+        self.add(item)
+
+    def remove(self, item):
+        """
+        Removes the item by moving the last item into its place.
+        :raise ValueError: if the item is not part of the set, just like list.remove
+        """
+        index = self.indexes.pop(item, None)
+        if index is None:
+            raise ValueError("item not in IndexedSet")
+        last_item = self.items.pop()
+        if index < len(self.items):
+            self.items[index] = last_item
+            self.indexes[last_item] = index
+
+    def discard(self, item):
+        if item in self.indexes:
+            self.remove(item)
+
+    def copy(self):
+        indexed_set = IndexedSet()
+        indexed_set.items = list(self.items)
+        indexed_set.indexes = dict(self.indexes)
+        return indexed_set
+
+    def random_choice(self):
+        return random.choice(self.items)
+
+    def __contains__(self, item):
+        return item in self.indexes
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class WeekLayer:
+    """
+    A mapping of positions on top of a snapshot of the positions of another week.
+    A position that was not written in this week falls through to the snapshot, writes only go to this week,
+    so all weeks that were created from the same timetable share one snapshot.
+    """
+
+    def __init__(self, snapshot):
+        """
+        :param snapshot: dictionary position -> value, with every position, that never changes afterwards
+        """
+        self.snapshot = snapshot
+        self.changes = {}  # position -> value, the positions that were written in this week
+
+    def __getitem__(self, position):
+        if position in self.changes:
+            return self.changes[position]
+        return self.snapshot[position]
+
+    def __setitem__(self, position, value):
+        self.changes[position] = value
+
+    def __contains__(self, position):
+        return position in self.snapshot
+
+    def __iter__(self):
+        return iter(self.snapshot)
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def get(self, position, default=None):
+        if position in self.changes:
+            return self.changes[position]
+        return self.snapshot.get(position, default)
+
+    def keys(self):
+        return self.snapshot.keys()
+
+    def items(self):
+        changes = self.changes
+        for position, value in self.snapshot.items():
+            yield position, changes.get(position, value)
+
+    def values(self):
+        for position, value in self.items():
+            yield value
+
+
+class CopyOnWriteIndex:
+    """
+    A mapping key -> container (IndexedSet or list) that shares its containers with its copies.
+    A container only gets copied the first time it is changed through get_writable,
+    so a copy costs O(keys) and a week only pays for the time slots and rooms it changes.
+    """
+
+    def __init__(self, containers):
+        """
+        :param containers: dictionary key -> container, the containers belong to this index
+        """
+        self.containers = containers
+        self.owned = set(containers)  # the keys of the containers that are not shared with another index
+
+    def __getitem__(self, key):
+        return self.containers[key]
+
+    def __contains__(self, key):
+        return key in self.containers
+
+    def __iter__(self):
+        return iter(self.containers)
+
+    def __len__(self):
+        return len(self.containers)
+
+    def get(self, key, default=None):
+        return self.containers.get(key, default)
+
+    def keys(self):
+        return self.containers.keys()
+
+    def items(self):
+        return self.containers.items()
+
+    def values(self):
+        return self.containers.values()
+
+    def get_writable(self, key):
+        """
+        :return: the container of the key, copied first if it is shared with another index
+        """
+        if key not in self.owned:
+            self.containers[key] = self.containers[key].copy()
+            self.owned.add(key)
+        return self.containers[key]
+
+    def copy(self):
+        """
+        :return: a new index that shares all containers, afterwards both indexes copy a container before changing it
+        """
+        index = CopyOnWriteIndex({})
+        index.containers = dict(self.containers)
+        self.owned = set()
+        return index
+
+
+class FreeRoomIndex:
+    """
+    Keeps the free rooms of every time slot sorted by capacity,
+    so the smallest free room that can hold an amount of students is found with a bisect.
+    """
+
+    def __init__(self, time_slots):
+        # time_slot -> sorted list of (capacity, fi_number)
+        self.free_rooms = CopyOnWriteIndex({time_slot: [] for time_slot in time_slots})
+
+    def copy(self):
+        free_room_index = FreeRoomIndex(())
+        free_room_index.free_rooms = self.free_rooms.copy()
+        return free_room_index
+
+    def add(self, room, time_slot):
+        bisect.insort(self.free_rooms.get_writable(time_slot), (room.capacity, room.fi_number))
+
+    def remove(self, room, time_slot):
+        free_rooms = self.free_rooms.get_writable(time_slot)
+        index = bisect.bisect_left(free_rooms, (room.capacity, room.fi_number))
+        if index < len(free_rooms) and free_rooms[index][1] == room.fi_number:
+            del free_rooms[index]
+
+    def free_rooms_with_capacity(self, time_slot, student_amount):
+        """
+        :return: the free rooms (capacity, fi_number) with at least the given capacity, smallest first
+        """
+        free_rooms = self.free_rooms[time_slot]
+        index = bisect.bisect_left(free_rooms, (student_amount,))
+        return free_rooms[index:]
+
+    def smallest_free_room(self, time_slot, student_amount):
+        """
+        :return: fi_number of the smallest free room with at least the given capacity, None if there is none
+        """
+        free_rooms = self.free_rooms[time_slot]
+        index = bisect.bisect_left(free_rooms, (student_amount,))
+        if index == len(free_rooms):
+            return None
+        return free_rooms[index][1]
+
+    def largest_free_capacity(self, time_slot):
+        """
+        :return: the capacity of the largest free room in the time slot, 0 if there is none
+        """
+        free_rooms = self.free_rooms[time_slot]
+        if len(free_rooms) == 0:
+            return 0
+        return free_rooms[-1][0]
 
 
 class TimeTable:
 
-    def __init__(self, timetable, occupied_positions, empty_positions, offset):
+    def __init__(self, context, timetable, occupied_positions, empty_positions, offset):
+        """
+        :param context: instance of SolverContext, shared with all copies of this timetable
+        :param timetable: dictionary (fi_number, time_slot) -> instance of CourseEvent or None
+        :param occupied_positions: list of all positions that hold an event
+        :param empty_positions: list of all positions without an event
+        :param offset: the week of the semester this timetable represents
+        """
+        self.context = context
         self.timetable = timetable
-        self.occupied_positions = occupied_positions
-        self.empty_positions = empty_positions
+        # the lecturer that gives the event on a position, the events themselves are shared between weeks
+        self.lecturers = dict.fromkeys(timetable)
+        self.positions = list(timetable)
+        self.occupied_positions = IndexedSet()
+        # secondary indexes of the positions per time slot and per room, the empty positions are only kept here
+        time_slots = sorted(set(time_slot for fi_number, time_slot in self.positions))
+        fi_numbers = sorted(set(fi_number for fi_number, time_slot in self.positions))
+        self.occupied_by_time_slot = CopyOnWriteIndex({time_slot: IndexedSet() for time_slot in time_slots})
+        self.empty_by_time_slot = CopyOnWriteIndex({time_slot: IndexedSet() for time_slot in time_slots})
+        self.occupied_by_room = CopyOnWriteIndex({fi_number: IndexedSet() for fi_number in fi_numbers})
+        self.empty_by_room = CopyOnWriteIndex({fi_number: IndexedSet() for fi_number in fi_numbers})
+        # the free rooms of every time slot, sorted by capacity
+        self.free_rooms = FreeRoomIndex(self.empty_by_time_slot)
+        for position in occupied_positions:
+            self.mark_position_occupied(position)
+        for position in empty_positions:
+            self.mark_position_empty(position)
         self.offset = offset
+        self.undo_log = None
+
+    def mark_position_occupied(self, position):
+        """
+        Moves the position from the empty indexes to the occupied indexes.
+        :param position: (fi_number, time_slot)
+        """
+        fi_number, time_slot = position
+        if position in self.empty_by_time_slot[time_slot]:
+            self.free_rooms.remove(self.context.class_rooms_dict[fi_number], time_slot)
+            self.empty_by_time_slot.get_writable(time_slot).remove(position)
+            self.empty_by_room.get_writable(fi_number).remove(position)
+        if position not in self.occupied_positions:
+            self.occupied_positions.add(position)
+            self.occupied_by_time_slot.get_writable(time_slot).add(position)
+            self.occupied_by_room.get_writable(fi_number).add(position)
+
+    def mark_position_empty(self, position):
+        """
+        Moves the position from the occupied indexes to the empty indexes.
+        :param position: (fi_number, time_slot)
+        """
+        fi_number, time_slot = position
+        if position in self.occupied_positions:
+            self.occupied_positions.remove(position)
+            self.occupied_by_time_slot.get_writable(time_slot).remove(position)
+            self.occupied_by_room.get_writable(fi_number).remove(position)
+        if position not in self.empty_by_time_slot[time_slot]:
+            self.free_rooms.add(self.context.class_rooms_dict[fi_number], time_slot)
+            self.empty_by_time_slot.get_writable(time_slot).add(position)
+            self.empty_by_room.get_writable(fi_number).add(position)
+
+    def begin(self):
+        """
+        This function starts a transaction.
+        Every assignment and removal gets recorded in the undo log until commit or rollback is called.
+        """
+        self.undo_log = []
 
-    def assign_course_to_position(self, course_event, position):
+    def commit(self):
+        """
+        This function ends the current transaction and keeps all changes.
+        """
+        self.undo_log = None
+
+    def rollback(self):
+        """
+        This function ends the current transaction and undoes all changes made since begin was called,
+        including the occupied time slots of the lecturers and curricula.
+        The cost only depends on the amount of changed positions.
+        """
+        undo_log = self.undo_log
+        self.undo_log = None
+        if undo_log is None:
+            return
+        while len(undo_log) > 0:
+            entry = undo_log.pop()
+            if entry[0] == "assign":
+                self.remove_course_from_position(entry[1])
+            elif entry[0] == "move":
+                self.move_courses_to_rooms(entry[1])
+            else:
+                _, position, course_event, ugent_id = entry
+                self.assign_course_to_position(course_event, position, ugent_id)
+
+    def assign_course_to_position(self, course_event, position, ugent_id=None):
         """
         This function will assign a course_event to a specific position in the time table.
         :param course_event: instance of CourseEvent, the course event that will be scheduled.
         :param position: (fi_number, time_slot)
+        :param ugent_id: optional, the lecturer that will be assigned, the first available lecturer otherwise.
         :return: True if the event is successfully scheduled, False otherwise
         """
 
@@ -115,33 +432,33 @@ class TimeTable:
             return False
 
         self.timetable[position] = course_event
-        course = gi.courses_dict[course_event.course_code]
+        course = self.context.courses_dict[course_event.course_code]
         room_fi_number = position[0]
         time_slot = position[1] + 40 * self.offset
 
         for curriculum_code in course.curricula:
-            curriculum = gi.curricula_dict[curriculum_code]
+            curriculum = self.context.curricula_dict[curriculum_code]
             # adding the time_slot to the list of occupied time_slots
             curriculum.add_occupied_time_slot(time_slot)
 
         # get a lecturer
         assigned_lecturer = None
-        for ugent_id in course_event.lecturers:
-            lecturer = gi.lecturers_dict[ugent_id]
-            if not hc.lecturer_is_occupied_in_time_slot(lecturer, time_slot):
-                assigned_lecturer = lecturer
-                break
+        if ugent_id is not None:
+            assigned_lecturer = self.context.lecturers_dict[ugent_id]
+        else:
+            for ugent_id in course_event.lecturers:
+                lecturer = self.context.lecturers_dict[ugent_id]
+                if not hc.lecturer_is_occupied_in_time_slot(lecturer, time_slot):
+                    assigned_lecturer = lecturer
+                    break
 
         assigned_lecturer.add_occupied_time_slot(time_slot)
-        course_event.set_assigned_lecturer(assigned_lecturer.ugent_id)
+        self.lecturers[position] = assigned_lecturer.ugent_id
 
         course.course_hours -= 1
-        self.occupied_positions.append(position)
-        try:
-            self.empty_positions.remove(position)
-        except ValueError:
-            # event got swapped, so is not part of events.
-            return
+        if self.undo_log is not None:
+            self.undo_log.append(("assign", position))
+        self.mark_position_occupied(position)
 
     def remove_course_from_position(self, position):
         """
@@ -154,45 +471,106 @@ class TimeTable:
         if self.timetable[position] is not None:
             course_event = self.timetable[position]
             self.timetable[position] = None
-            self.empty_positions.append(position)
-            self.occupied_positions.remove(position)
-            course = gi.courses_dict[course_event.course_code]
+            self.mark_position_empty(position)
+            course = self.context.courses_dict[course_event.course_code]
             course.course_hours += 1
 
             # remove the time_slot from the occupied time_sot list from every curriculum
             for curriculum_code in course.curricula:
-                curriculum = gi.curricula_dict[curriculum_code]
+                curriculum = self.context.curricula_dict[curriculum_code]
                 curriculum.remove_occupied_time_slot(time_slot)
 
-            ugent_id = course_event.assigned_lecturer
-            lecturer = gi.lecturers_dict[ugent_id]
+            ugent_id = self.lecturers[position]
+            self.lecturers[position] = None
+            lecturer = self.context.lecturers_dict[ugent_id]
             lecturer.remove_occupied_time_slot(time_slot)
-            course_event.remove_assigned_lecturer()
 
+            if self.undo_log is not None:
+                self.undo_log.append(("remove", position, course_event, ugent_id))
             return course_event
         return False
 
-    def update_offset(self, offset):
+    def move_courses_to_rooms(self, moves):
         """
-        This function will change the new offset and make sure that all relevant values get updated.
-        Warning! only use this function when copying a timetable to use as the base timetable for the new week.
+        This function moves events to other rooms in the same time slot, all at once, so events can exchange rooms.
+        The occupied time slots of the lecturers and curricula do not change.
+        :param moves: list of (position, fi_number), the position of an event and the room it moves to
         """
-        self.offset = offset
+        course_events = [(self.timetable[position], self.lecturers[position]) for position, fi_number in moves]
+        for position, fi_number in moves:
+            self.timetable[position] = None
+            self.lecturers[position] = None
+            self.mark_position_empty(position)
+        for (course_event, ugent_id), (position, fi_number) in zip(course_events, moves):
+            new_position = (fi_number, position[1])
+            self.timetable[new_position] = course_event
+            self.lecturers[new_position] = ugent_id
+            self.mark_position_occupied(new_position)
+        if self.undo_log is not None:
+            self.undo_log.append(("move", [((fi_number, position[1]), position[0]) for position, fi_number in moves]))
+
+    def create_weeks(self, offsets):
+        """
+        This function creates the timetables of other weeks, which start with the events of this timetable.
+        All new timetables share one snapshot of the positions of this timetable and only keep their own changes,
+        so the events are not copied and this timetable can still be changed afterwards.
+        The indexes per time slot and per room are shared as well, a week copies one the first time it changes it.
+        The events of the snapshot occupy the time slots of their lecturers and curricula in every new week.
+        :param offsets: the weeks of the new timetables
+        :return: list of instances of TimeTable, one for every offset
+        """
+        snapshot = self.snapshot_placements()
+        weeks = []
+        for offset in offsets:
+            week = copy.copy(self)
+            week.timetable, week.lecturers = self.create_week_placements(snapshot)
+            week.occupied_positions = self.occupied_positions.copy()
+            week.occupied_by_time_slot = self.occupied_by_time_slot.copy()
+            week.empty_by_time_slot = self.empty_by_time_slot.copy()
+            week.occupied_by_room = self.occupied_by_room.copy()
+            week.empty_by_room = self.empty_by_room.copy()
+            week.free_rooms = self.free_rooms.copy()
+            week.offset = offset
+            week.undo_log = None
+            for position in week.occupied_positions:
+                time_slot = position[1] + 40 * offset
+                course = self.context.courses_dict[week.timetable[position].course_code]
+                for curriculum_code in course.curricula:
+                    self.context.curricula_dict[curriculum_code].add_occupied_time_slot(time_slot)
+                self.context.lecturers_dict[week.lecturers[position]].add_occupied_time_slot(time_slot)
+            weeks.append(week)
+        return weeks
+
+    def snapshot_placements(self):
+        """
+        :return: the events and lecturers of all positions, which all weeks of create_weeks start with
+        """
+        return dict(self.timetable.items()), dict(self.lecturers.items())
 
-        # iterate over all non None values in the dictionary
-        # update all occupied time_slot sets
-        for course_event in self.timetable.values():
-            if course_event is not None:
-                assigned_lecturer = gi.lecturers_dict[course_event.assigned_lecturer]
-                # update occupied time slots for the lecturer
-                new_time_slots = set()
-                for occupied_time_slot in assigned_lecturer.occupied_time_slots:
-                    new_time_slots.add(occupied_time_slot % 40 + offset*40)
-                assigned_lecturer.occupied_time_slots.union(new_time_slots)
-                # update occupied time slots for the curricula
-                for curriculum_code in course_event.curricula:
-                    curriculum = gi.curricula_dict[curriculum_code]
-                    new_time_slots = set()
-                    for occupied_time_slot in curriculum.occupied_time_slots:
-                        new_time_slots.add(occupied_time_slot % 40 + offset*40)
-                    curriculum.occupied_time_slots.union(new_time_slots)
+    @staticmethod
+    def create_week_placements(snapshot):
+        """
+        :param snapshot: as returned by snapshot_placements
+        :return: the mappings position -> event and position -> ugent_id of a new week
+        """
+        timetable_snapshot, lecturers_snapshot = snapshot
+        return WeekLayer(timetable_snapshot), WeekLayer(lecturers_snapshot)
+
+    def count_events_per_time_slot(self):
+        """
+        :return: list with the amount of events in every time slot of the week
+        """
+        return [len(self.occupied_by_time_slot.get(time_slot, ()))
+                for time_slot in range(self.context.total_course_hours)]
+
+    def count_late_hour_events(self):
+        """
+        :return: the amount of events in the last two hours of a day
+        """
+        return sum(count for time_slot, count in enumerate(self.count_events_per_time_slot()) if time_slot % 8 >= 6)
+
+    def get_occupancy_rate(self):
+        """
+        :return: the part of all positions that holds an event
+        """
+        return len(self.occupied_positions) / len(self.positions)
@@ -0,0 +1,241 @@
+"""
+    This module holds the incremental evaluation of the soft constraints.
+"""
+import soft_constraints as sc
+
+
+class DeltaEvaluator:
+
+    def __init__(self, timetable):
+        """
+        Keeps the penalty contributions of a timetable cached per curriculum and per day,
+        so the cost of a move can be computed by only looking at the curricula and days it touches.
+        The total cost is equal to soft_constraints.return_total_penalty_of_timetable.
+        :param timetable: instance of TimeTable
+        """
+        self.timetable = timetable
+        self.context = timetable.context
+        self.curriculum_day_events = {}  # (curriculum_code, day) -> amount of events of this timetable on that day
+        self.curriculum_day_penalty = {}  # (curriculum_code, day) -> only one hour penalty
+        self.curriculum_penalty = {}  # curriculum_code -> to many straight hours penalty
+        # the sums of all penalties
+        self.late_hour_penalty = 0
+        self.one_hour_penalty = 0
+        self.straight_hours_penalty = 0
+        self.room_size_total = 0
+        self.amount_of_events = 0
+        self.not_home_penalty = 0
+        self.distance_penalty = 0
+        self.total_cost = 0
+        self.undo_entry = None
+        self.resync()
+
+    def resync(self):
+        """
+        This function will recompute all cached contributions from scratch with one batch evaluation,
+        which also removes the rounding errors that the incremental updates of the sums build up.
+        NumPy is optional, without it the contributions are added up event by event.
+        :return: the total cost of the timetable
+        """
+        try:
+            import batch_evaluation
+        except ImportError:
+            self.add_all_events()
+        else:
+            self.add_batch_evaluation(batch_evaluation.BatchEvaluation(self.timetable))
+        self.undo_entry = None
+        self.total_cost = self.compute_total_cost()
+        return self.total_cost
+
+    def add_batch_evaluation(self, evaluation):
+        """
+        This function fills the cached contributions from a batch evaluation.
+        :param evaluation: instance of batch_evaluation.BatchEvaluation of the timetable
+        """
+        self.late_hour_penalty = evaluation.late_hour_penalty
+        self.room_size_total = evaluation.room_size_total
+        self.amount_of_events = evaluation.amount_of_events
+        self.not_home_penalty = evaluation.not_home_penalty
+        self.distance_penalty = evaluation.distance_penalty
+        self.one_hour_penalty = evaluation.one_hour_penalty
+        self.straight_hours_penalty = evaluation.straight_hours_penalty
+
+        # the days of the batch evaluation are the days of the week, the keys use the days of the semester
+        first_day = self.get_day((None, 0))
+        day_events = evaluation.get_curriculum_day_events()
+        day_penalties = evaluation.get_curriculum_day_penalties()
+        self.curriculum_day_events = {}
+        self.curriculum_day_penalty = {}
+        for curriculum_code, day in zip(*day_events.nonzero()):
+            key = (int(curriculum_code), first_day + int(day))
+            self.curriculum_day_events[key] = int(day_events[curriculum_code, day])
+            self.curriculum_day_penalty[key] = int(day_penalties[curriculum_code, day])
+        self.curriculum_penalty = dict(zip(self.context.curricula_dict, evaluation.curriculum_penalties))
+
+    def add_all_events(self):
+        """
+        This function fills the cached contributions by adding the penalties of every event of the timetable.
+        """
+        self.curriculum_day_events = {}
+        self.curriculum_day_penalty = {}
+        self.curriculum_penalty = {}
+        self.late_hour_penalty = 0
+        self.room_size_total = 0
+        self.amount_of_events = 0
+        self.not_home_penalty = 0
+        self.distance_penalty = 0
+
+        for position in self.timetable.occupied_positions:
+            course_event = self.timetable.timetable[position]
+            self.add_position_penalties(position, course_event, 1)
+            day = self.get_day(position)
+            for curriculum_code in course_event.curricula:
+                key = (curriculum_code, day)
+                self.curriculum_day_events[key] = self.curriculum_day_events.get(key, 0) + 1
+
+        for key in self.curriculum_day_events:
+            self.curriculum_day_penalty[key] = self.compute_curriculum_day_penalty(key)
+        for curriculum_code in self.context.curricula_dict:
+            self.curriculum_penalty[curriculum_code] = self.compute_curriculum_penalty(curriculum_code)
+        self.one_hour_penalty = sum(self.curriculum_day_penalty.values())
+        self.straight_hours_penalty = sum(self.curriculum_penalty.values())
+
+    def compute_total_cost(self):
+        """
+        :return: the total cost, combined from the cached sums in the same way as the full evaluation
+        """
+        room_size = 0
+        if self.amount_of_events > 0:
+            room_size = self.room_size_total / self.amount_of_events
+        return float(self.late_hour_penalty) + float(self.one_hour_penalty) + float(self.straight_hours_penalty) \
+            + float(room_size) + float(self.not_home_penalty) + 4 * self.distance_penalty / 75
+
+    def add_position_penalties(self, position, course_event, change):
+        """
+        Adds (change = 1) or subtracts (change = -1) the penalties that only depend on the position of an event.
+        :param position: (fi_number, time_slot)
+        :param course_event: instance of CourseEvent
+        :param change: 1 or -1
+        """
+        room = self.context.class_rooms_dict[position[0]]
+        self.late_hour_penalty += change * sc.return_last_two_hour_penalty(self.context, position, course_event)
+        self.room_size_total += change * sc.return_room_size_penalty(self.context, position, course_event)
+        self.amount_of_events += change
+        self.not_home_penalty += change * sc.return_not_home_penalty(self.context, room, course_event)
+        self.distance_penalty += change * sc.return_distance_penalty(self.context, room, course_event)
+
+    def get_day(self, position):
+        """
+        :param position: (fi_number, time_slot)
+        :return: the day of the semester on which the position takes place
+        """
+        return (position[1] + 40 * self.timetable.offset) // 8
+
+    def compute_curriculum_day_penalty(self, key):
+        """
+        Every event of a curriculum that is the only lesson on its day gets a penalty.
+        :param key: (curriculum_code, day)
+        :return: the only one hour penalty of this curriculum on this day
+        """
+        amount_of_events = self.curriculum_day_events.get(key, 0)
+        if amount_of_events == 0:
+            return 0
+        curriculum_code, day = key
+        curriculum = self.context.curricula_dict[curriculum_code]
+        amount_of_time_slots = 0
+        for time_slot in range(day * 8, day * 8 + 8):
+            if curriculum.contains_time_slot(time_slot):
+                amount_of_time_slots += 1
+        if amount_of_time_slots == 1:
+            return amount_of_events
+        return 0
+
+    def compute_curriculum_penalty(self, curriculum_code):
+        """
+        :param curriculum_code: the code of the curriculum
+        :return: the to many straight hours penalty of the curriculum
+        """
+        curriculum = self.context.curricula_dict[curriculum_code]
+        return max(0, len(curriculum.occupied_time_slots) - 4)
+
+    def update(self, moves):
+        """
+        This function updates the cached contributions after some events were moved in the timetable.
+        Only the curricula and days of the moved events are recomputed.
+        :param moves: list of (course_event, old_position, new_position), a position is None if unplaced
+        :return: the difference in total cost caused by the moves
+        """
+        undo_day_events = {}
+        undo_day_penalty = {}
+        undo_curriculum_penalty = {}
+        undo_sums = (self.late_hour_penalty, self.one_hour_penalty, self.straight_hours_penalty,
+                     self.room_size_total, self.amount_of_events, self.not_home_penalty,
+                     self.distance_penalty, self.total_cost)
+
+        curricula = set()
+        keys = set()
+        for course_event, old_position, new_position in moves:
+            for position, change in ((old_position, -1), (new_position, 1)):
+                if position is None:
+                    continue
+                self.add_position_penalties(position, course_event, change)
+                day = self.get_day(position)
+                for curriculum_code in course_event.curricula:
+                    key = (curriculum_code, day)
+                    if key not in undo_day_events:
+                        undo_day_events[key] = self.curriculum_day_events.get(key)
+                    self.curriculum_day_events[key] = self.curriculum_day_events.get(key, 0) + change
+                    keys.add(key)
+                    curricula.add(curriculum_code)
+
+        # the undo values are None for the keys that were not cached yet, so revert can remove them again
+        for key in keys:
+            undo_day_penalty[key] = self.curriculum_day_penalty.get(key)
+            self.curriculum_day_penalty[key] = self.compute_curriculum_day_penalty(key)
+            self.one_hour_penalty += self.curriculum_day_penalty[key] - (undo_day_penalty[key] or 0)
+        for curriculum_code in curricula:
+            undo_curriculum_penalty[curriculum_code] = self.curriculum_penalty.get(curriculum_code)
+            self.curriculum_penalty[curriculum_code] = self.compute_curriculum_penalty(curriculum_code)
+            self.straight_hours_penalty += self.curriculum_penalty[curriculum_code] \
+                - (undo_curriculum_penalty[curriculum_code] or 0)
+
+        self.undo_entry = (undo_day_events, undo_day_penalty, undo_curriculum_penalty, undo_sums)
+        old_cost = self.total_cost
+        self.total_cost = self.compute_total_cost()
+        return self.total_cost - old_cost
+
+    def swap_delta(self, position_1, position_2):
+        """
+        Call this function after the events on both positions got swapped in the timetable.
+        :param position_1: (fi_number, time_slot)
+        :param position_2: (fi_number, time_slot)
+        :return: the difference in total cost caused by the swap
+        """
+        event_1 = self.timetable.timetable[position_1]  # used to be on position_2
+        event_2 = self.timetable.timetable[position_2]  # used to be on position_1
+        moves = []
+        if event_1 is not None:
+            moves.append((event_1, position_2, position_1))
+        if event_2 is not None:
+            moves.append((event_2, position_1, position_2))
+        return self.update(moves)
+
+    def revert(self):
+        """
+        This function restores the cached contributions as they were before the last update.
+        Only use this function when the last moves got undone in the timetable as well.
+        """
+        if self.undo_entry is None:
+            return
+        undo_day_events, undo_day_penalty, undo_curriculum_penalty, undo_sums = self.undo_entry
+        for cache, undo_values in ((self.curriculum_day_events, undo_day_events),
+                                   (self.curriculum_day_penalty, undo_day_penalty),
+                                   (self.curriculum_penalty, undo_curriculum_penalty)):
+            for key, value in undo_values.items():
+                if value is None:
+                    del cache[key]
+                else:
+                    cache[key] = value
+        self.late_hour_penalty, self.one_hour_penalty, self.straight_hours_penalty, self.room_size_total, \
+            self.amount_of_events, self.not_home_penalty, self.distance_penalty, self.total_cost = undo_sums
+        self.undo_entry = None
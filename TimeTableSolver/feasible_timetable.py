@@ -1,34 +1,85 @@
 import neighborhood
 import hard_constraints as hc
-import general_info as gi
 import data
 import time
 import random
-import copy
+
+# the operators of the tabu search with the probability they start with
+operator_weights = {"position swap": 0.16, "unplaced swap": 0.50, "split event": 0.34}
+# the amount of iterations that the attribute of a move stays tabu, per operator
+tabu_tenures = {"position swap": 1000, "unplaced swap": 40, "split event": 60}
+# the score of an operator for a move that placed more events, and for a move that kept the same amount
+improvement_score = 5
+sideways_score = 1
+
+
+class TabuMemory:
+
+    def __init__(self):
+        """
+        Remembers the attributes of moves (a pair of positions, a time slot or an event) until their tenure ends.
+        Checking an attribute is a dictionary lookup, no matter how many attributes are tabu.
+        """
+        self.expirations = {}  # attribute -> first iteration in which the attribute is no longer tabu
+
+    def is_tabu(self, attribute, iteration):
+        return self.expirations.get(attribute, 0) > iteration
+
+    def add(self, attribute, iteration, tenure):
+        self.expirations[attribute] = iteration + tenure
+
+    def remove_expired(self, iteration):
+        self.expirations = {attribute: expiration for attribute, expiration in self.expirations.items()
+                            if expiration > iteration}
+
+    def clear(self):
+        self.expirations = {}
 
 
 class FeasibleTimetable:
 
-    def __init__(self, events, timetable):
+    def __init__(self, events, timetable, stagnation_limit=3000, max_restarts=5, segment_length=50,
+                 reaction_factor=0.2, min_weight=0.05, ruin_fraction=0.02):
+        """
+        A move is only kept if it does not increase the amount of unplaced events,
+        so the current timetable is always the best one found.
+        :param events: the events that could not be placed yet
+        :param timetable: instance of TimeTable
+        :param stagnation_limit: the amount of iterations without placing an event before the search restarts
+                                 from a perturbed timetable
+        :param max_restarts: the amount of restarts in a row without placing an event before the search stops
+        :param segment_length: the amount of iterations after which the operator weights get adapted
+        :param reaction_factor: how much the weights move towards the scores of the last segment, between 0 and 1
+        :param min_weight: the weight of an operator never drops below this probability
+        :param ruin_fraction: the part of the placed events that a restart removes and places again
+        """
         self.events = events
         self.timetable = timetable
+        self.context = timetable.context
         self.best_distance = len(self.events)
         self.last_distance = len(self.events)
-        self.best_feasible_tt = copy.deepcopy(timetable)
+        self.telemetry = timetable.context.telemetry
+        self.stagnation_limit = stagnation_limit
+        self.max_restarts = max_restarts
+        self.segment_length = segment_length
+        self.reaction_factor = reaction_factor
+        self.min_weight = min_weight
+        self.ruin_fraction = ruin_fraction
+        self.tabu_memory = TabuMemory()
+        self.iteration = 0
+        self.weights = dict(operator_weights)
+        self.scores = {operator: 0 for operator in operator_weights}
+        self.attempts = {operator: 0 for operator in operator_weights}
 
-    def position_swap(self, tabu_list):
+    def position_swap(self):
         position_1, position_2 = neighborhood.get_random_positions(self.timetable)
+        attribute = frozenset((position_1, position_2))
+        tabu = self.tabu_memory.is_tabu(attribute, self.iteration)
+        self.tabu_memory.add(attribute, self.iteration, tabu_tenures["position swap"])
 
-        # check if the moves are already in the tabu list
-        # if not, add them to the list
-        if (position_1, position_2) in tabu_list or (position_2, position_1) in tabu_list:
-            return False
-        tabu_list.append((position_1, position_2))
-        tabu_list.append((position_2, position_1))
-
-        # make a back up, so a rollback is possible
-        timetable_back_up = copy.deepcopy(self.timetable)
-        events_back_up = copy.deepcopy(self.events)
+        # start a transaction and back up the unplaced events, so a rollback is possible
+        self.timetable.begin()
+        events_back_up = list(self.events)
         success, self.timetable, self.events = neighborhood.swap_positions(self.timetable,
                                                                            self.events,
                                                                            position_1,
@@ -37,67 +88,41 @@ class FeasibleTimetable:
                                                                            )
 
         if not success:
-            self.timetable = timetable_back_up
+            self.timetable.rollback()
             self.events = events_back_up
             return False
-        # shuffle events, and try to place them in a random order
-        random.shuffle(self.events)
-        events_to_remove = []
-        for event in self.events:
-            for position in self.timetable.empty_positions:
-                room_fi_number = position[0]
-                time_slot = position[1]
-                room = gi.class_rooms_dict[room_fi_number]
-                if hc.course_event_fits_into_time_slot(event, time_slot + self.timetable.offset*40) and hc.room_capacity_constraint(event, room):
-                    self.timetable.assign_course_to_position(event, position)
-                    events_to_remove.append(event)
-                    break
-
-        # removed assigned events
-        for event in events_to_remove:
-            self.events.remove(event)
-
-        distance = len(self.events)
-        delta_e = distance - self.last_distance
-
-        if delta_e > 0:
-            self.timetable = timetable_back_up
-            self.events = events_back_up
-            return False
-        # Success!
-        self.last_distance = distance
-        if self.last_distance < self.best_distance:
-            self.best_feasible_tt = copy.deepcopy(self.timetable)
-            self.best_distance = distance
-        return True
+        self.place_unplaced_events()
+        return self.accept_move(events_back_up, tabu)
 
-    def split_event(self, tabu_list):
+    def split_event(self):
         # sort events by largest student amount
         self.events.sort(key=lambda ev: ev.student_amount, reverse=True)
-        # get the course with the most amount of students
-        event = self.events.pop(0)
-        # check if this event is not in the tabu list
-        max_events = len(self.events)
-        index = 0
-        while event in tabu_list and index < max_events:
-            self.events.append(event)
-            event = self.events.pop(0)
-            index += 1
+        # take the biggest event that is not tabu, the biggest event if all of them are tabu
+        tabu = True
+        event_index = 0
+        for index, event in enumerate(self.events):
+            if not self.tabu_memory.is_tabu(event, self.iteration):
+                tabu = False
+                event_index = index
+                break
+        event = self.events[event_index]
 
         # get all available positions, not taking in account the room capacity
         biggest_capacity = 0
-        for empty_position in self.timetable.empty_positions:
-            fi_number = empty_position[0]
-            time_slot = empty_position[1]
-            if hc.course_event_fits_into_time_slot(event, time_slot + self.timetable.offset*40):
-                size = gi.class_rooms_dict[fi_number].capacity
-                if size > biggest_capacity:
-                    biggest_capacity = size
-
-        if biggest_capacity == 0:
-            tabu_list.append(event)
-            self.events.append(event)
-            return
+        time_slots_mask = hc.available_time_slots_mask(self.context, event, self.timetable.offset)
+        for time_slot in hc.time_slots_in_mask(time_slots_mask):
+            size = self.timetable.free_rooms.largest_free_capacity(time_slot)
+            if size > biggest_capacity:
+                biggest_capacity = size
+
+        if biggest_capacity == 0 or biggest_capacity >= event.student_amount:
+            # the event can not be placed anywhere, or it fits without splitting
+            self.tabu_memory.add(event, self.iteration, tabu_tenures["split event"])
+            return False
+
+        self.timetable.begin()
+        events_back_up = list(self.events)
+        del self.events[event_index]
         # split the event
         course_code = event.course_code
         lecturers = event.lecturers
@@ -105,7 +130,7 @@ class FeasibleTimetable:
         student_amount_2 = event.student_amount - student_amount_1
         curricula = event.curricula
         event_number = event.event_number
-        course = gi.courses_dict[course_code]
+        course = self.context.courses_dict[course_code]
         course.course_hours += 1  # because the event is split into two, an extra course hour should be created
         event_1 = data.CourseEvent(course_code=course_code,
                                    lecturers=lecturers,
@@ -117,42 +142,26 @@ class FeasibleTimetable:
                                    student_amount=student_amount_2,
                                    curricula=curricula,
                                    event_number=event_number)
-        # add the new events to the tabu list
-        tabu_list.append(event_1)
-        tabu_list.append(event_2)
+        # the new events are tabu, so they do not get split again right away
+        self.tabu_memory.add(event_1, self.iteration, tabu_tenures["split event"])
+        self.tabu_memory.add(event_2, self.iteration, tabu_tenures["split event"])
         self.events.insert(0, event_1)
         self.events.insert(1, event_2)
 
-        # check if it is possible to place extra events
-        events_to_remove = []
-        for event in self.events:
-            for position in self.timetable.empty_positions:
-                room_fi_number = position[0]
-                time_slot = position[1]
-                room = gi.class_rooms_dict[room_fi_number]
-                if hc.course_event_fits_into_time_slot(event, time_slot + self.timetable.offset*40) and hc.room_capacity_constraint(event, room):
-                    self.timetable.assign_course_to_position(event, position)
-                    events_to_remove.append(event)
-                    break
-        # remove the events that got assigned
-        for event in events_to_remove:
-            self.events.remove(event)
-
-        distance = len(self.events)
-        self.last_distance = distance
-        if self.last_distance <= self.best_distance:
-            self.best_feasible_tt = copy.deepcopy(self.timetable)
-            self.best_distance = distance
-        return
-
-    def occupied_unplaced_time_slot_swap(self, tabu_list):
-        time_slot = neighborhood.get_random_time_slot()
-        if time_slot in tabu_list:
+        self.place_unplaced_events()
+        if not self.accept_move(events_back_up, tabu):
+            course.course_hours -= 1
             return False
-        tabu_list.append(time_slot)
+        return True
+
+    def occupied_unplaced_time_slot_swap(self):
+        time_slot = neighborhood.get_random_time_slot(self.context)
+        attribute = ("time slot", time_slot)
+        tabu = self.tabu_memory.is_tabu(attribute, self.iteration)
+        self.tabu_memory.add(attribute, self.iteration, tabu_tenures["unplaced swap"])
 
-        timetable_back_up = copy.deepcopy(self.timetable)
-        events_back_up = copy.deepcopy(self.events)
+        self.timetable.begin()
+        events_back_up = list(self.events)
 
         success, self.timetable, self.events = neighborhood.swap_occupied_for_unplaced_in_time_slot(self.timetable,
                                                                                                     self.events,
@@ -160,64 +169,142 @@ class FeasibleTimetable:
                                                                                                     )
 
         if not success:
-            self.timetable = timetable_back_up
+            self.timetable.rollback()
             self.events = events_back_up
             return False
+        self.place_unplaced_events()
+        return self.accept_move(events_back_up, tabu)
+
+    def ruin_and_recreate(self):
+        """
+        This function perturbs the timetable to leave a stagnated region of the search: a random part of the
+        placed events is removed, then all unplaced events are placed again in a random order.
+        Like every move it is only kept if it does not increase the amount of unplaced events.
+        :return: True if the perturbed timetable is kept, False otherwise
+        """
+        if len(self.timetable.occupied_positions) == 0:
+            return False
+        amount = max(1, int(len(self.timetable.occupied_positions) * self.ruin_fraction))
+        self.timetable.begin()
+        events_back_up = list(self.events)
+        for position in random.sample(list(self.timetable.occupied_positions), amount):
+            self.events.append(self.timetable.remove_course_from_position(position))
+        self.place_unplaced_events()
+        return self.accept_move(events_back_up, False)
 
-        # shuffle events, and try to place them in a random order
+    def place_unplaced_events(self):
+        """
+        This function tries to place the unplaced events in a random order, each one at the first free position.
+        """
         random.shuffle(self.events)
         events_to_remove = []
         for event in self.events:
-            for position in self.timetable.empty_positions:
-                room_fi_number = position[0]
-                time_slot = position[1]
-                room = gi.class_rooms_dict[room_fi_number]
-                if hc.course_event_fits_into_time_slot(event, time_slot + self.timetable.offset*40) and hc.room_capacity_constraint(event, room):
-                    self.timetable.assign_course_to_position(event, position)
-                    events_to_remove.append(event)
-                    break
+            position = neighborhood.find_free_position(self.timetable, event)
+            if position is not None:
+                self.timetable.assign_course_to_position(event, position)
+                events_to_remove.append(event)
 
         # removed assigned events
         for event in events_to_remove:
             self.events.remove(event)
 
+    def accept_move(self, events_back_up, tabu):
+        """
+        This function keeps or undoes the move of the current transaction.
+        A move is kept if it does not increase the amount of unplaced events,
+        a tabu move only if it places more events than ever before (aspiration).
+        :param events_back_up: the unplaced events before the move
+        :param tabu: True if the move has a tabu attribute
+        :return: True if the move is kept, False otherwise
+        """
         distance = len(self.events)
-        delta_e = distance - self.last_distance
-
-        if delta_e > 0:
-            self.timetable = timetable_back_up
+        if distance > self.last_distance or (tabu and distance >= self.best_distance):
+            self.timetable.rollback()
             self.events = events_back_up
             return False
         # Success!
+        self.timetable.commit()
         self.last_distance = distance
-        if self.last_distance < self.best_distance:
-            self.best_feasible_tt = copy.deepcopy(self.timetable)
+        if distance < self.best_distance:
             self.best_distance = distance
         return True
 
-    def tabu_search(self):
-        starting_time = time.clock()
-        max_time = 120
-        tabu_positions = []
-        tabu_split = []
-        tabu_unplaced_swap = []
-        while len(self.events) > 0 and time.clock() < starting_time + max_time:
-            # if tabu list is full, remove the oldest entry
-            if len(tabu_positions) == 300:
-                tabu_positions.pop(0)
-            if len(tabu_split) == 20:
-                tabu_split.pop(0)
-            if len(tabu_unplaced_swap) == 20:
-                tabu_unplaced_swap.pop(0)
-
-            # randomly choose an action
-            action = random.randrange(100)
-            if action < 16:
-                self.position_swap(tabu_positions)
-                continue
-            if action < 66:
-                self.occupied_unplaced_time_slot_swap(tabu_unplaced_swap)
-                continue
-            if action >= 66:
-                self.split_event(tabu_split)
-        return self.events, self.best_feasible_tt
+    def adapt_weights(self):
+        """
+        This function moves the operator weights towards the average score of every operator in the last segment,
+        and starts a new segment.
+        """
+        performances = {operator: self.scores[operator] / self.attempts[operator]
+                        for operator in self.weights if self.attempts[operator] > 0}
+        total_performance = sum(performances.values())
+        if total_performance > 0:
+            for operator in self.weights:
+                performance = performances.get(operator, 0) / total_performance
+                weight = (1 - self.reaction_factor) * self.weights[operator] + self.reaction_factor * performance
+                self.weights[operator] = max(self.min_weight, weight)
+            total_weight = sum(self.weights.values())
+            for operator in self.weights:
+                self.weights[operator] /= total_weight
+        self.scores = {operator: 0 for operator in self.weights}
+        self.attempts = {operator: 0 for operator in self.weights}
+
+    def tabu_search(self, max_time=120):
+        """
+        :param max_time: the amount of seconds the search may take, it stops earlier when all events are placed
+                         or when the search stagnates after max_restarts restarts
+        :return: the events that could not be placed and the timetable
+        """
+        with self.telemetry.timer("tabu"):
+            return self.run_tabu_search(max_time)
+
+    def run_tabu_search(self, max_time):
+        starting_time = time.perf_counter()
+        operators = {"position swap": self.position_swap,
+                     "unplaced swap": self.occupied_unplaced_time_slot_swap,
+                     "split event": self.split_event}
+        last_improvement = 0
+        restarts = 0
+        while len(self.events) > 0 and time.perf_counter() < starting_time + max_time:
+            self.iteration += 1
+            operator = random.choices(list(self.weights), list(self.weights.values()))[0]
+            distance = self.last_distance
+            accepted = operators[operator]()
+
+            self.attempts[operator] += 1
+            if self.last_distance < distance:
+                self.scores[operator] += improvement_score
+                last_improvement = self.iteration
+                restarts = 0
+            elif accepted:
+                self.scores[operator] += sideways_score
+
+            if self.iteration % self.segment_length == 0:
+                self.adapt_weights()
+                self.tabu_memory.remove_expired(self.iteration)
+
+            if self.telemetry.enabled:
+                self.telemetry.count("tabu.iterations")
+                self.telemetry.count("tabu." + operator + " attempted")
+                if accepted:
+                    self.telemetry.count("tabu." + operator + " accepted")
+                self.telemetry.record("tabu", offset=self.timetable.offset, operator=operator,
+                                      accepted=accepted, unplaced=len(self.events))
+
+            if self.iteration - last_improvement >= self.stagnation_limit:
+                # stagnation: perturb the timetable and forget the tabu moves and the learned weights,
+                # or stop when restarting does not help
+                if restarts == self.max_restarts:
+                    break
+                restarts += 1
+                last_improvement = self.iteration
+                distance = self.last_distance
+                perturbed = self.ruin_and_recreate()
+                if self.last_distance < distance:
+                    restarts = 0
+                self.tabu_memory.clear()
+                self.weights = dict(operator_weights)
+                if self.telemetry.enabled:
+                    self.telemetry.count("tabu.restarts")
+                    if perturbed:
+                        self.telemetry.count("tabu.restarts perturbed")
+        return self.events, self.timetable
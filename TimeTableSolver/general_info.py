@@ -1,24 +0,0 @@
-"""
-    This module holds all mappings and variables.
-"""
-
-# variables
-
-academy_year = None
-semester = None
-kilometer_penalty = None
-late_hour_penalty = None
-not_home_penalty = None
-min_amount_students = None
-biggest_room_capacity = None
-total_course_hours = 40
-weeks = 12
-
-# mappings
-
-courses_set = None
-courses_dict = None
-lecturers_dict = None
-curricula_dict = None
-sites_dict = None
-class_rooms_dict = None
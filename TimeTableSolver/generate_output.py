@@ -1,38 +1,53 @@
-import process_input
 import json
 import math
 
+days_of_week = {0: "ma",
+                1: "di",
+                2: "wo",
+                3: "do",
+                4: "vr"}
 
-def generate_output_from_time_table(list_of_dicts):
+
+def generate_output_from_time_table(list_of_dicts, path='output/output.json', compact=False):
     """
     This function will convert the end solution time table to a correct json file
-    The JSON file will contain all reservation for a room during the semester
+    The JSON file will contain all reservation for a room during the semester,
+    the integer ids of the rooms and courses are mapped back to their FI numbers and course codes
     :param list_of_dicts: list of tuples: (timetable, weeks)
+    :param path: the path of the json file
+    :param compact: True to merge the reservations that only differ in their week or in a consecutive hour
     :return: we return true if successful
     """
-    room_reservation_dict = []
+    if compact:
+        reservations = compact_reservations(list_of_dicts)
+    else:
+        reservations = single_reservations(list_of_dicts)
+    write_reservations(reservations, path)
+    return True
+
+
+def single_reservations(list_of_dicts):
+    """
+    This function yields one reservation for every occupied position of every timetable.
+    :param list_of_dicts: list of tuples: (timetable, weeks)
+    :return: generator of reservations
+    """
     for timetable_weeks in list_of_dicts:
         timetable = timetable_weeks[0].timetable
         weeks = timetable_weeks[1]
+        context = timetable_weeks[0].context
         for position, course_event in timetable.items():
             # if not none then there is a reservation for this room on the specific time_slot
             if course_event is not None:
                 # we extract the course_id
-                course = process_input.courses_dict[course_event.course_code]
-                course_id = course.code
+                course_id = context.course_codes[course_event.course_code]
 
                 # we need the room id
-                room_fi_number = position[0]
+                room_fi_number = context.fi_numbers[position[0]]
 
                 # we get the student amount for this reservation
                 course_event_student_amount = course_event.student_amount
 
-                days_of_week = {0: "ma",
-                                1: "di",
-                                2: "wo",
-                                3: "do",
-                                4: "vr"}
-
                 time_slot = position[1]
                 day = days_of_week[math.floor(int(time_slot)/8)]
                 hour = (int(time_slot) % 8)+1
@@ -51,7 +66,60 @@ def generate_output_from_time_table(list_of_dicts):
                                    "weken": weeks,
                                    "uren": hours}
 
-                room_reservation_dict.append(end_reservation)
+                yield end_reservation
+
+
+def compact_reservations(list_of_dicts):
+    """
+    This function merges the reservations of the same room, course and student amount.
+    First the reservations of the same hour are merged over all weeks, then the reservations with the same weeks
+    on consecutive hours of the same day are merged into one reservation.
+    Only the merged reservations are kept in memory, not the reservation of every week.
+    :param list_of_dicts: list of tuples: (timetable, weeks)
+    :return: generator of reservations
+    """
+    # (room, course, student amount, local time slot) -> set of weeks
+    weeks_of_reservation = {}
+    for timetable, weeks in list_of_dicts:
+        context = timetable.context
+        for position, course_event in timetable.timetable.items():
+            if course_event is not None:
+                key = (context.fi_numbers[position[0]], context.course_codes[course_event.course_code],
+                       course_event.student_amount, int(position[1]))
+                weeks_of_reservation.setdefault(key, set()).update(weeks)
+
+    # (room, course, student amount, weeks, day) -> hours of the day
+    hours_of_reservation = {}
+    for (room_fi_number, course_id, student_amount, time_slot), weeks in weeks_of_reservation.items():
+        key = (room_fi_number, course_id, student_amount, tuple(sorted(weeks)), time_slot // 8)
+        hours_of_reservation.setdefault(key, []).append(time_slot % 8 + 1)
 
-    with open('output/output.json', 'w') as json_file:
-        json.dump(room_reservation_dict, json_file)
+    for (room_fi_number, course_id, student_amount, weeks, day), hours in hours_of_reservation.items():
+        hours.sort()
+        start = 0
+        for index in range(1, len(hours) + 1):
+            # a gap between two hours ends a block of consecutive hours
+            if index == len(hours) or hours[index] != hours[index - 1] + 1:
+                yield {"lokaal": room_fi_number,
+                       "code": course_id,
+                       "aantal": student_amount,
+                       "dagen": [days_of_week[day]],
+                       "weken": list(weeks),
+                       "uren": hours[start:index]}
+                start = index
+
+
+def write_reservations(reservations, path):
+    """
+    This function writes the reservations to a json list one at a time, so the whole list is never in memory.
+    :param reservations: iterable of reservations
+    :param path: the path of the json file
+    """
+    with open(path, 'w') as json_file:
+        json_file.write("[")
+        separator = ""
+        for reservation in reservations:
+            json_file.write(separator)
+            json_file.write(json.dumps(reservation))
+            separator = ", "
+        json_file.write("]")
@@ -0,0 +1,136 @@
+"""
+    This module holds a TimeTable that keeps its placements in NumPy arrays of rooms x time slots.
+    A position (fi_number, time_slot) is a cell of the arrays, because the fi_numbers are dense integer ids.
+    The search uses the same assign and remove functions as for the dictionary based TimeTable,
+    but whole timetable queries are array reductions.
+    Only the events and lecturers are kept in the arrays. The position indexes of TimeTable (occupied and empty
+    positions per time slot and per room, free rooms) are inherited and kept up to date next to them, because
+    the search needs their random choices and capacity order. A new week therefore copies the two buffers of
+    rooms x time slots (4 bytes per position each), shares the inherited indexes copy-on-write and copies the
+    set of occupied positions, so a week costs about as much memory as a week of the dictionary based TimeTable.
+"""
+import numpy as np
+import data
+
+
+class Registry:
+    """
+    Gives every object that gets stored in a grid a dense integer id.
+    The ids are never released, the registry is shared by all weeks of a grid and keeps every object that was
+    ever stored in one of them. Those are the course events or the ugent_ids of the lecturers of the instance,
+    so a registry holds at most one entry per event or per lecturer.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.ids = {}
+
+    def get_id(self, item):
+        item_id = self.ids.get(item)
+        if item_id is None:
+            item_id = len(self.items)
+            self.ids[item] = item_id
+            self.items.append(item)
+        return item_id
+
+
+class GridMapping:
+    """
+    A mapping position -> object or None, stored as the ids of a registry in a 2-D array, -1 for None.
+    """
+
+    def __init__(self, array, registry, positions=None):
+        """
+        :param array: NumPy integer array of rooms x time slots
+        :param registry: instance of Registry, shared with the copies of the mapping
+        :param positions: list of all positions in the order of the array, shared with the copies of the mapping
+        """
+        self.array = array
+        self.registry = registry
+        if positions is None:
+            rooms, time_slots = array.shape
+            positions = [(fi_number, time_slot) for fi_number in range(rooms) for time_slot in range(time_slots)]
+        self.positions = positions
+
+    def __getitem__(self, position):
+        item_id = self.array.item(position)
+        if item_id < 0:
+            return None
+        return self.registry.items[item_id]
+
+    def __setitem__(self, position, value):
+        self.array[position] = -1 if value is None else self.registry.get_id(value)
+
+    def __contains__(self, position):
+        fi_number, time_slot = position
+        rooms, time_slots = self.array.shape
+        return 0 <= fi_number < rooms and 0 <= time_slot < time_slots
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return self.array.size
+
+    def get(self, position, default=None):
+        if position in self:
+            return self[position]
+        return default
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        items = self.registry.items
+        for position, item_id in zip(self.positions, self.array.ravel().tolist()):
+            yield position, None if item_id < 0 else items[item_id]
+
+    def values(self):
+        for position, value in self.items():
+            yield value
+
+    def copy(self):
+        return GridMapping(self.array.copy(), self.registry, self.positions)
+
+
+class GridTimeTable(data.TimeTable):
+
+    def __init__(self, context, timetable, occupied_positions, empty_positions, offset):
+        """
+        A TimeTable with the same functions, that keeps the events and their lecturers in arrays.
+        :param context: instance of SolverContext, its fi_numbers have to be interned
+        :param timetable: dictionary (fi_number, time_slot) -> instance of CourseEvent or None
+        :param occupied_positions: list of all positions that hold an event
+        :param empty_positions: list of all positions without an event
+        :param offset: the week of the semester this timetable represents
+        """
+        shape = (len(context.class_rooms_dict), context.total_course_hours)
+        events = GridMapping(np.full(shape, -1, dtype=np.int32), Registry())
+        for position, course_event in timetable.items():
+            events[position] = course_event
+        super().__init__(context, events, occupied_positions, empty_positions, offset)
+        self.lecturers = GridMapping(np.full(shape, -1, dtype=np.int32), Registry(), events.positions)
+
+    def snapshot_placements(self):
+        # the arrays are copied for every new week, so there is nothing to share, unlike the inherited indexes
+        return self.timetable, self.lecturers
+
+    @staticmethod
+    def create_week_placements(snapshot):
+        timetable, lecturers = snapshot
+        return timetable.copy(), lecturers.copy()
+
+    def get_occupied_grid(self):
+        """
+        :return: boolean array of rooms x time slots, True if the position holds an event
+        """
+        return self.timetable.array >= 0
+
+    def count_events_per_time_slot(self):
+        return self.get_occupied_grid().sum(axis=0).tolist()
+
+    def count_late_hour_events(self):
+        return int(self.get_occupied_grid()[:, np.arange(self.context.total_course_hours) % 8 >= 6].sum())
+
+    def get_occupancy_rate(self):
+        return float(self.get_occupied_grid().mean())
@@ -1,7 +1,6 @@
 """
     This module holds all hard constraints.
 """
-import general_info as gi
 
 
 def lecturer_is_occupied_in_time_slot(lecturer, time_slot):
@@ -14,9 +13,10 @@ def lecturer_is_occupied_in_time_slot(lecturer, time_slot):
     return lecturer.contains_time_slot(time_slot)
 
 
-def lecturers_are_occupied_in_time_slot(course_event, time_slot):
+def lecturers_are_occupied_in_time_slot(context, course_event, time_slot):
     """
     This function will check if a lecturer is available for a given time
+    :param context: instance of SolverContext
     :param course_event: instance of CourseEvent, contains the list of lecturers.
     :param time_slot: the specific time_slot that needs to be checked.
     :return: True if no lecturer is available, otherwise False.
@@ -25,16 +25,17 @@ def lecturers_are_occupied_in_time_slot(course_event, time_slot):
         return True
 
     for ugent_id in course_event.lecturers:
-        lecturer = gi.lecturers_dict[ugent_id]
+        lecturer = context.lecturers_dict[ugent_id]
         if not lecturer_is_occupied_in_time_slot(lecturer, time_slot):
             return False
 
     return True
 
 
-def curriculum_is_occupied_in_time_slot(course_event, time_slot):
+def curriculum_is_occupied_in_time_slot(context, course_event, time_slot):
     """
     This functions checks if all curricula are available for the given course for a certain time slot.
+    :param context: instance of SolverContext
     :param course_event: instance of CourseEvent
     :param time_slot: the time slot.
     :return: True if not all curricula are available, False otherwise
@@ -44,7 +45,7 @@ def curriculum_is_occupied_in_time_slot(course_event, time_slot):
 
     available = False
     for curriculum_code in course_event.curricula:
-        curriculum = gi.curricula_dict[curriculum_code]
+        curriculum = context.curricula_dict[curriculum_code]
         if curriculum.contains_time_slot(time_slot):
             available = True
     return available
@@ -64,12 +65,73 @@ def room_capacity_constraint(course_event, room):
     return False
 
 
-def course_event_fits_into_time_slot(course_event, time_slot):
+def course_event_fits_into_time_slot(context, course_event, time_slot):
     """
     Checks if a course event can be placed into a certain time slot.
+    :param context: instance of SolverContext
     :param course_event: instance of CourseEvent.
     :param time_slot: the time slot that will be checked.
     :return: True if the course can be assigned to a specific time slot, False otherwise.
     """
-    return not lecturers_are_occupied_in_time_slot(course_event, time_slot) and not \
-        curriculum_is_occupied_in_time_slot(course_event, time_slot)
+    if context.telemetry.enabled:
+        context.telemetry.count("constraint checks")
+    return not lecturers_are_occupied_in_time_slot(context, course_event, time_slot) and not \
+        curriculum_is_occupied_in_time_slot(context, course_event, time_slot)
+
+
+def available_time_slots_mask(context, course_event, offset=0):
+    """
+    Computes all time slots of a week in which the course event fits, in one pass over its lecturers and curricula.
+    A time slot fits if at least one lecturer is free and none of the curricula is occupied.
+    :param context: instance of SolverContext
+    :param course_event: instance of CourseEvent.
+    :param offset: the week that will be checked.
+    :return: integer bitset, bit i is set if the event fits into time slot i of the week.
+    """
+    if course_event is None:
+        return 0
+    if context.telemetry.enabled:
+        context.telemetry.count("constraint checks")
+
+    free_lecturers_mask = 0
+    for ugent_id in course_event.lecturers:
+        free_lecturers_mask |= ~context.lecturers_dict[ugent_id].occupied_mask
+
+    occupied_curricula_mask = 0
+    for curriculum_code in course_event.curricula:
+        occupied_curricula_mask |= context.curricula_dict[curriculum_code].occupied_mask
+
+    week_mask = (1 << context.total_course_hours) - 1
+    return (free_lecturers_mask & ~occupied_curricula_mask) >> (context.total_course_hours * offset) & week_mask
+
+
+def time_slot_in_mask(mask, time_slot):
+    """
+    :param mask: integer bitset, as returned by available_time_slots_mask
+    :param time_slot: time slot of the week (int)
+    :return: True if the bit of the time slot is set, False otherwise
+    """
+    return mask >> time_slot & 1 == 1
+
+
+def time_slots_in_mask(mask):
+    """
+    :param mask: integer bitset, as returned by available_time_slots_mask
+    :return: list of all time slots of which the bit is set
+    """
+    time_slots = []
+    time_slot = 0
+    while mask:
+        if mask & 1:
+            time_slots.append(time_slot)
+        mask >>= 1
+        time_slot += 1
+    return time_slots
+
+
+def count_time_slots_in_mask(mask):
+    """
+    :param mask: integer bitset, as returned by available_time_slots_mask
+    :return: the amount of time slots of which the bit is set
+    """
+    return bin(mask).count("1")
@@ -1,60 +1,146 @@
 import time
 import math
 import soft_constraints as sc
+import delta_evaluator as de
 import neighborhood
 import random
-import copy
 
 
 class ImproveTimeTable:
 
-    def __init__(self, timetable):
+    def __init__(self, timetable, kempe_probability=0.5, resync_interval=10000, max_undo_entries=100000,
+                 max_swap_attempts=1000):
         """
         The constructor for the third phase the improvement phase
         :param timetable: The feasible timetable that we want to improve
+        :param kempe_probability: the probability that a move of the simulated annealing is a Kempe chain move
+                                  instead of a swap of two positions
+        :param resync_interval: the amount of iterations of the simulated annealing after which the incremental
+                                costs are computed again from scratch
+        :param max_undo_entries: the amount of undo log entries that are kept to restore the best timetable,
+                                 when there are more the best timetable is stored as a snapshot instead
+        :param max_swap_attempts: the amount of random pairs of positions a swap move tries before it gives up
         """
         self.timetable = timetable # this will hold the final time table with the best penalty cost on the end
-        self.best_cost = sc.return_total_penalty_of_timetable(self.timetable)
+        self.evaluator = de.DeltaEvaluator(self.timetable)
+        self.best_cost = self.evaluator.total_cost
         self.last_cost = self.best_cost
-
-    def improve(self):
+        self.telemetry = timetable.context.telemetry
+        self.kempe_probability = kempe_probability
+        self.resync_interval = resync_interval
+        self.max_undo_entries = max_undo_entries
+        self.max_swap_attempts = max_swap_attempts
+        # the undo logs of the moves that were accepted since the best timetable, oldest first
+        self.moves_since_best = []
+        self.undo_entries = 0
+        # snapshot position -> (event, ugent_id) of the best timetable, None if it is restored with the undo logs
+        self.best_placements = None
+
+    def improve(self, max_time=60):
         """
         This function will try to improve the timetable and it soft constraints
+        :param max_time: the amount of seconds the improvement may take
         :return: we return the total penalty and the timetable
 
         """
-        total_cost = sc.return_total_penalty_of_timetable(self.timetable)
+        total_cost = self.evaluator.resync()
+        self.best_cost = total_cost
+        self.last_cost = total_cost
+        self.set_current_best()
         print("Cost of tt before improve: " + str(total_cost))
 
-        self.simulated_annealing(5, 1.3, 5)
+        with self.telemetry.timer("sa"):
+            self.simulated_annealing(5, 1.3, 5, max_time)
+        self.restore_best()
 
         print("Cost after improve phase: " + str(self.best_cost))
 
         return self.best_cost, self.timetable
 
+    def set_current_best(self):
+        """
+        This function marks the current timetable as the best one.
+        """
+        self.moves_since_best = []
+        self.undo_entries = 0
+        self.best_placements = None
+
+    def is_at_best(self):
+        """
+        :return: True if the current timetable is the best one
+        """
+        return self.best_placements is None and len(self.moves_since_best) == 0
+
+    def restore_best(self):
+        """
+        This function undoes the moves that were accepted after the best timetable was found,
+        so the timetable is the best one again, and computes its cost from scratch.
+        """
+        if self.best_placements is not None:
+            self.set_placements(self.best_placements)
+        else:
+            self.undo_moves_since_best()
+        self.set_current_best()
+        self.best_cost = self.evaluator.resync()
+        self.last_cost = self.best_cost
+
+    def undo_moves_since_best(self):
+        """
+        This function rolls the timetable back to the best timetable with the undo logs of the accepted moves.
+        """
+        undo_log = []
+        for moves in self.moves_since_best:
+            undo_log += moves
+        self.moves_since_best = []
+        self.undo_entries = 0
+        self.timetable.undo_log = undo_log
+        self.timetable.rollback()
+
+    def store_best_placements(self):
+        """
+        This function replaces the undo logs by a snapshot of the best timetable, so they do not grow without
+        bound while the search does not find a better timetable. The current timetable stays the same.
+        """
+        current_placements = self.get_placements()
+        self.undo_moves_since_best()
+        self.best_placements = self.get_placements()
+        self.set_placements(current_placements)
+
+    def get_placements(self):
+        """
+        :return: dictionary position -> (event, ugent_id of its lecturer) of all occupied positions
+        """
+        return {position: (self.timetable.timetable[position], self.timetable.lecturers[position])
+                for position in self.timetable.occupied_positions}
+
+    def set_placements(self, placements):
+        """
+        This function replaces all events of the timetable by the given ones.
+        :param placements: dictionary position -> (event, ugent_id of its lecturer), as returned by get_placements
+        """
+        for position in list(self.timetable.occupied_positions):
+            self.timetable.remove_course_from_position(position)
+        for position, (course_event, ugent_id) in placements.items():
+            self.timetable.assign_course_to_position(course_event, position, ugent_id)
+
     def get_count_events_on_time_slot(self, time_slot):
         """
         This function will count the total amount of events on this time slot
         :param time_slot: the current time slot
         :return: we return the total amount
         """
-        count = 0
-        for pos, event in self.timetable.timetable.items():
-            if event is not None and pos[1] == time_slot:
-                count += 1
-        return count
+        return len(self.timetable.occupied_by_time_slot[time_slot])
 
     def switch_events_of_two_time_slots(self, day, ts_1, ts_2):
         list_ts_1 = []
         list_ts_2 = []
 
-        for oc_pos in self.timetable.occupied_positions:
-            if oc_pos[1] == ts_1:
-                removed_event = self.timetable.remove_course_from_position(oc_pos)
-                list_ts_1.append(((oc_pos[0], ts_2), removed_event))
-            elif oc_pos[1] == ts_2:
-                removed_event = self.timetable.remove_course_from_position(oc_pos)
-                list_ts_2.append(((oc_pos[0], ts_1), removed_event))
+        for oc_pos in list(self.timetable.occupied_by_time_slot[ts_1]):
+            removed_event = self.timetable.remove_course_from_position(oc_pos)
+            list_ts_1.append(((oc_pos[0], ts_2), removed_event))
+        for oc_pos in list(self.timetable.occupied_by_time_slot[ts_2]):
+            removed_event = self.timetable.remove_course_from_position(oc_pos)
+            list_ts_2.append(((oc_pos[0], ts_1), removed_event))
 
         for place in list_ts_1:
             self.timetable.assign_course_to_position(place[1], place[0])
@@ -95,16 +181,17 @@ class ImproveTimeTable:
 
         return True
 
-    def simulated_annealing(self, t_max, t_min, steps):
+    def simulated_annealing(self, t_max, t_min, steps, max_time=60):
         """
         This function will execute simulated annealing on the current time table
         We tried a lot of different functions, but when we run SA for to long the overall score was halfed.
         :param t_max: The highest temp
         :param t_min:  The lowest Temp
         :param steps: count of steps
+        :param max_time: the amount of seconds the simulated annealing may take
         :return: we return the total cost of the final timetable
         """
-        starting_time = time.clock()
+        starting_time = time.perf_counter()
 
         step = 0
 
@@ -112,9 +199,9 @@ class ImproveTimeTable:
 
         no_improvement = 0
 
-        # iterations = 0
+        iterations = 0
 
-        while self.best_cost > 0 and time.clock() - starting_time < 60:
+        while self.best_cost > 0 and time.perf_counter() - starting_time < max_time:
             if no_improvement > 10:
                 step = 0
 
@@ -126,14 +213,26 @@ class ImproveTimeTable:
             # select a random neighborhood move
             # x = random.randrange(2)
 
-            change = self.swap_positions_sa(t_value)
+            if random.random() < self.kempe_probability:
+                change = self.kempe_chain_move_sa(t_value)
+            else:
+                change = self.swap_positions_sa(t_value)
 
             if not change:
                 no_improvement += 1
             else:
                 no_improvement = 0
 
-            print("total cost of tt: " + str(self.best_cost))
+            iterations += 1
+            if iterations % self.resync_interval == 0:
+                self.last_cost = self.evaluator.resync()
+                if self.is_at_best() or self.last_cost < self.best_cost:
+                    # the current timetable is the best one, its cost without the rounding errors
+                    self.best_cost = self.last_cost
+                    self.set_current_best()
+            if self.telemetry.enabled and iterations % 100 == 0:
+                self.telemetry.record("sa", iteration=iterations, temperature=t_value,
+                                      best_cost=self.best_cost, current_cost=self.last_cost)
 
         return True
 
@@ -143,33 +242,92 @@ class ImproveTimeTable:
         :param t_value: The current temp
         :return: we return True if successful else False
         """
-        pos1, pos2 = neighborhood.get_random_positions(self.timetable)
-
-        backup_time_table = copy.deepcopy(self.timetable)
-
-        successful, backup1, backup2 = neighborhood.swap_positions(self.timetable, [], pos1, pos2, feasibility=True)
-
-        while not successful:
+        successful = False
+        attempts = 0
+        while not successful and attempts < self.max_swap_attempts:
             pos1, pos2 = neighborhood.get_random_positions(self.timetable)
+            # every attempt is a transaction of its own, so the probes of a failed attempt are undone
+            self.timetable.begin()
             successful, backup1, backup2 = neighborhood.swap_positions(self.timetable, [], pos1, pos2, feasibility=True)
+            if not successful:
+                self.timetable.rollback()
+            attempts += 1
 
+        if self.telemetry.enabled:
+            self.telemetry.count("sa.swap attempted", attempts)
         if not successful:
-            print("swap was no success")
-            self.timetable = backup_time_table
             return False
+        if self.telemetry.enabled:
+            self.telemetry.count("sa.evaluations")
+
+        # only the curricula and days of the two swapped events get evaluated again
+        delta_e = self.evaluator.swap_delta(pos1, pos2)
+        return self.accept_move(delta_e, t_value, "swap")
 
-        print("swap is SUCCESSFUL")
-        total_cost = sc.return_total_penalty_of_timetable(self.timetable)
-        delta_e = total_cost - self.last_cost
+    def kempe_chain_move_sa(self, t_value):
+        """
+        This function will swap the time slots of a Kempe chain for the simulated annealing process.
+        The chain starts at a random event and a random other time slot of the week, the moved events get the
+        smallest free room that fits in their new time slot.
+        :param t_value: The current temp
+        :return: we return True if successful else False
+        """
+        if len(self.timetable.occupied_positions) == 0:
+            return False
+        position = self.timetable.occupied_positions.random_choice()
+        time_slot = neighborhood.get_random_time_slot(self.timetable.context)
+        while time_slot == position[1]:
+            time_slot = neighborhood.get_random_time_slot(self.timetable.context)
+        chain = neighborhood.get_kempe_chain(self.timetable, position, time_slot)
+
+        if self.telemetry.enabled:
+            self.telemetry.count("sa.kempe attempted")
+            self.telemetry.count("sa.kempe chain events", len(chain))
+
+        self.timetable.begin()
+        moves = neighborhood.move_kempe_chain(self.timetable, chain, position[1], time_slot)
+        if moves is None:
+            # no room or an occupied lecturer or curriculum outside the chain
+            self.timetable.rollback()
+            return False
+
+        if self.telemetry.enabled:
+            self.telemetry.count("sa.evaluations")
+        # only the curricula and days of the moved events get evaluated again
+        delta_e = self.evaluator.update(moves)
+        return self.accept_move(delta_e, t_value, "kempe")
+
+    def accept_move(self, delta_e, t_value, operator):
+        """
+        This function will keep or undo the move of the current transaction with the Metropolis criterion.
+        :param delta_e: the difference in total cost caused by the move
+        :param t_value: The current temp
+        :param operator: the name of the move, only used for the telemetry
+        :return: we return True if the move is kept else False
+        """
+        total_cost = self.evaluator.total_cost
 
         if delta_e > 0 and random.random() > math.exp(-delta_e / t_value):
-            self.timetable = backup_time_table
+            self.timetable.rollback()
+            self.evaluator.revert()
             return False
 
+        # the undo log of the move is kept, so the best timetable can be restored at the end
+        undo_log = self.timetable.undo_log
+        self.timetable.commit()
+        if self.best_placements is None:
+            self.moves_since_best.append(undo_log)
+            self.undo_entries += len(undo_log)
+            if self.undo_entries > self.max_undo_entries:
+                self.store_best_placements()
         self.last_cost = total_cost
+        if self.telemetry.enabled:
+            self.telemetry.count("sa." + operator + " accepted")
 
         if total_cost <= self.best_cost:
-            print("TESTESTS")
+            if self.telemetry.enabled and total_cost < self.best_cost:
+                self.telemetry.count("sa.improvements")
             self.best_cost = total_cost
+            self.set_current_best()
 
         return True
@@ -0,0 +1,267 @@
+"""
+    This module holds the cached binary format of a problem instance.
+    The json file is parsed once, afterwards the instance is loaded from a binary file that is memory-mapped.
+    The binary file is keyed by the hash of the json file, so a changed input never uses an old cache.
+"""
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import data
+import process_input
+from solver_context import SolverContext
+
+magic = b"TTSI"
+version = 1
+default_cache_directory = "datasets/cache"
+
+
+def load_context(path=process_input.default_path, cache_directory=default_cache_directory):
+    """
+    This function loads an instance, from the binary cache if it exists and from the json file otherwise.
+    After parsing the json file, the binary cache gets written for the next run.
+    :param path: the path to the json file
+    :param cache_directory: the directory that holds the binary files
+    :return: instance of SolverContext
+    """
+    with open(path, 'rb') as f:
+        input_hash = hashlib.sha256(f.read()).hexdigest()
+    cache_path = os.path.join(cache_directory, input_hash + ".bin")
+
+    if os.path.exists(cache_path):
+        context = read_instance(cache_path)
+        if context is not None:
+            return context
+
+    context = process_input.load_context(path)
+    os.makedirs(cache_directory, exist_ok=True)
+    write_instance(context, cache_path)
+    return context
+
+
+class StringTable:
+    """
+    Interns all strings of an instance, every string is stored once and referred to by its integer id.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def get_id(self, string):
+        if string not in self.ids:
+            self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return self.ids[string]
+
+
+def write_instance(context, path):
+    """
+    This function writes the instance of a context to a binary file.
+    Every object gets a dense integer id, its attributes are written as arrays.
+    :param context: instance of SolverContext, before the course hours are changed by the events lists
+    :param path: the path of the binary file
+    """
+    strings = StringTable()
+
+    lecturers = list(context.lecturers_dict.values())
+    lecturer_ids = {lecturer.ugent_id: index for index, lecturer in enumerate(lecturers)}
+    curricula = list(context.curricula_dict.values())
+    curriculum_ids = {curriculum.code: index for index, curriculum in enumerate(curricula)}
+    rooms = list(context.class_rooms_dict.values())
+    room_ids = {room.fi_number: index for index, room in enumerate(rooms)}
+    sites = list(context.sites_dict.values())
+    site_ids = {site.code: index for index, site in enumerate(sites)}
+    courses = list(context.courses_dict.values())
+
+    arrays = []
+    # general info
+    arrays.append(array.array('i', [strings.get_id(context.academy_year), strings.get_id(context.semester),
+                                    context.min_amount_students]))
+    arrays.append(array.array('d', [context.not_home_penalty, context.kilometer_penalty,
+                                    context.late_hour_penalty]))
+    # lecturers
+    arrays.append(array.array('i', [strings.get_id(context.ugent_ids[lecturer.ugent_id]) for lecturer in lecturers]))
+    arrays.append(array.array('i', [strings.get_id(lecturer.first_name) for lecturer in lecturers]))
+    arrays.append(array.array('i', [strings.get_id(lecturer.last_name) for lecturer in lecturers]))
+    # curricula
+    arrays.append(array.array('i', [strings.get_id(context.curriculum_codes[curriculum.code])
+                                    for curriculum in curricula]))
+    arrays.append(array.array('i', [strings.get_id(curriculum.mt1) for curriculum in curricula]))
+    arrays.append(array.array('i', [strings.get_id(context.site_codes[curriculum.home_site])
+                                    for curriculum in curricula]))
+    # class rooms
+    arrays.append(array.array('i', [strings.get_id(context.fi_numbers[room.fi_number]) for room in rooms]))
+    arrays.append(array.array('i', [strings.get_id(room.name) for room in rooms]))
+    arrays.append(array.array('i', [room.capacity for room in rooms]))
+    arrays.append(array.array('i', [site_ids[room.site_id] for room in rooms]))
+    # sites, with the rooms of every site as adjacency list
+    arrays.append(array.array('i', [strings.get_id(context.site_codes[site.code]) for site in sites]))
+    arrays.append(array.array('i', [strings.get_id(site.name) for site in sites]))
+    arrays.append(array.array('i', [strings.get_id(site.x_coord) for site in sites]))
+    arrays.append(array.array('i', [strings.get_id(site.y_coord) for site in sites]))
+    arrays.extend(adjacency_arrays([[room_ids[room.fi_number] for room in site.class_rooms] for site in sites]))
+    # courses, with their lecturers and curricula as adjacency lists
+    arrays.append(array.array('i', [strings.get_id(context.course_codes[course.code]) for course in courses]))
+    arrays.append(array.array('i', [strings.get_id(course.name) for course in courses]))
+    arrays.append(array.array('i', [course.student_amount for course in courses]))
+    arrays.append(array.array('d', [course.contact_hours for course in courses]))
+    arrays.extend(adjacency_arrays([[lecturer_ids[ugent_id] for ugent_id in course.lecturers]
+                                    for course in courses]))
+    arrays.extend(adjacency_arrays([[curriculum_ids[curriculum_code] for curriculum_code in course.curricula]
+                                    for course in courses]))
+
+    encoded_strings = [string.encode('utf-8') for string in strings.strings]
+    string_offsets = array.array('i', [0])
+    for encoded_string in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(encoded_string))
+    arrays.insert(0, string_offsets)
+    string_blob = b"".join(encoded_strings)
+
+    # write to a temporary file first, so a crash never leaves a half written cache behind
+    temporary_path = path + ".tmp"
+    with open(temporary_path, 'wb') as f:
+        f.write(magic)
+        f.write(struct.pack('<IB', version, sys.byteorder == 'little'))
+        f.write(struct.pack('<I', len(arrays)))
+        for values in arrays:
+            f.write(struct.pack('<cI', values.typecode.encode('ascii'), len(values)))
+            write_padding(f)
+            values.tofile(f)
+        f.write(struct.pack('<I', len(string_blob)))
+        f.write(string_blob)
+    os.replace(temporary_path, path)
+
+
+def adjacency_arrays(adjacency_lists):
+    """
+    :param adjacency_lists: list of lists of integer ids
+    :return: the start index of every list (plus the end of the last one) and all lists concatenated
+    """
+    starts = array.array('i', [0])
+    indexes = array.array('i')
+    for adjacency_list in adjacency_lists:
+        indexes.extend(adjacency_list)
+        starts.append(len(indexes))
+    return [starts, indexes]
+
+
+def write_padding(f):
+    # every array starts at a multiple of 8 bytes, so it can be cast directly from the memory map
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def read_instance(path):
+    """
+    This function memory-maps a binary file written by write_instance and builds the context from it.
+    :param path: the path of the binary file
+    :return: instance of SolverContext, None if the file was written by another version or byte order
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as memory_map:
+            buffer = memoryview(memory_map)
+            try:
+                return read_context(buffer)
+            finally:
+                buffer.release()
+
+
+def read_context(buffer):
+    if bytes(buffer[0:4]) != magic:
+        return None
+    file_version, little_endian = struct.unpack_from('<IB', buffer, 4)
+    if file_version != version or bool(little_endian) != (sys.byteorder == 'little'):
+        return None
+    amount_of_arrays, = struct.unpack_from('<I', buffer, 9)
+    position = 13
+    arrays = []
+    for i in range(amount_of_arrays):
+        typecode, length = struct.unpack_from('<cI', buffer, position)
+        position += 5
+        position += -position % 8
+        item_size = array.array(typecode.decode('ascii')).itemsize
+        arrays.append(buffer[position:position + length * item_size].cast(typecode.decode('ascii')))
+        position += length * item_size
+    blob_length, = struct.unpack_from('<I', buffer, position)
+    position += 4
+    string_blob = bytes(buffer[position:position + blob_length])
+
+    string_offsets = arrays.pop(0)
+    strings = [string_blob[string_offsets[i]:string_offsets[i + 1]].decode('utf-8')
+               for i in range(len(string_offsets) - 1)]
+    arrays = iter(arrays)
+
+    context = SolverContext()
+    general_ints = next(arrays)
+    general_doubles = next(arrays)
+    context.academy_year = strings[general_ints[0]]
+    context.semester = strings[general_ints[1]]
+    context.min_amount_students = general_ints[2]
+    context.not_home_penalty, context.kilometer_penalty, context.late_hour_penalty = general_doubles.tolist()
+
+    lecturer_codes, first_names, last_names = next(arrays), next(arrays), next(arrays)
+    lecturer_ids = []
+    for index in range(len(lecturer_codes)):
+        lecturer = data.Lecturer(ugent_id=strings[lecturer_codes[index]],
+                                 first_name=strings[first_names[index]],
+                                 last_name=strings[last_names[index]])
+        context.lecturers_dict[lecturer.ugent_id] = lecturer
+        lecturer_ids.append(lecturer.ugent_id)
+
+    curriculum_codes, mt1s, home_sites = next(arrays), next(arrays), next(arrays)
+    curriculum_ids = []
+    for index in range(len(curriculum_codes)):
+        curriculum = data.Curriculum(code=strings[curriculum_codes[index]],
+                                     mt1=strings[mt1s[index]],
+                                     home_site=strings[home_sites[index]])
+        context.curricula_dict[curriculum.code] = curriculum
+        curriculum_ids.append(curriculum.code)
+
+    fi_numbers, room_names, capacities, room_sites = next(arrays), next(arrays), next(arrays), next(arrays)
+    site_codes, site_names, x_coords, y_coords = next(arrays), next(arrays), next(arrays), next(arrays)
+    site_room_starts, site_rooms = next(arrays), next(arrays)
+    rooms = []
+    for index in range(len(fi_numbers)):
+        room = data.ClassRoom(fi_number=strings[fi_numbers[index]],
+                              name=strings[room_names[index]],
+                              capacity=capacities[index],
+                              site_id=strings[site_codes[room_sites[index]]])
+        context.class_rooms_dict[room.fi_number] = room
+        rooms.append(room)
+    context.biggest_room_capacity = max(capacities, default=0)
+    for index in range(len(site_codes)):
+        class_rooms = [rooms[room_index] for room_index in site_rooms[site_room_starts[index]:
+                                                                      site_room_starts[index + 1]]]
+        site = data.Site(code=strings[site_codes[index]],
+                         name=strings[site_names[index]],
+                         x_coord=strings[x_coords[index]],
+                         y_coord=strings[y_coords[index]],
+                         class_rooms=class_rooms)
+        context.sites_dict[site.code] = site
+
+    course_codes, course_names, student_amounts, contact_hours = next(arrays), next(arrays), next(arrays), \
+        next(arrays)
+    lecturer_starts, course_lecturers = next(arrays), next(arrays)
+    curriculum_starts, course_curricula = next(arrays), next(arrays)
+    for index in range(len(course_codes)):
+        hours = contact_hours[index]
+        course = data.Course(code=strings[course_codes[index]],
+                             name=strings[course_names[index]],
+                             student_amount=student_amounts[index],
+                             contact_hours=int(hours) if hours.is_integer() else hours,
+                             lecturers=[lecturer_ids[i] for i in
+                                        course_lecturers[lecturer_starts[index]:lecturer_starts[index + 1]]],
+                             curricula=[curriculum_ids[i] for i in
+                                        course_curricula[curriculum_starts[index]:curriculum_starts[index + 1]]])
+        context.courses_dict[course.code] = course
+
+    for values in (general_ints, general_doubles, lecturer_codes, first_names, last_names, curriculum_codes, mt1s,
+                   home_sites, fi_numbers, room_names, capacities, room_sites, site_codes, site_names, x_coords,
+                   y_coords, site_room_starts, site_rooms, course_codes, course_names, student_amounts,
+                   contact_hours, lecturer_starts, course_lecturers, curriculum_starts, course_curricula,
+                   string_offsets):
+        values.release()
+    context.intern_ids()
+    return context
@@ -0,0 +1,172 @@
+"""
+    This module generates synthetic instances in the same json format as datasets/project.json.
+    The instances are used to measure how the solver scales, without using real data.
+
+    Example: python instance_generator.py --courses 5000 --faculties 4 --seed 1 -o datasets/synthetic.json
+"""
+import argparse
+import json
+import math
+import random
+
+default_contact_hours_mix = {15: 1, 20: 1, 25: 1, 30: 5, 36: 1, 40: 2, 45: 7, 50: 2, 60: 6, 70: 1}
+
+
+def generate_instance(courses=2400, lecturers=1800, curricula=600, sites=25, rooms_per_site=17, faculties=1,
+                      lecturers_per_course=1.8, curricula_per_course=1.05, cross_faculty=0.05,
+                      median_students=15, max_students=1200, median_capacity=50, capacity_spread=0.8,
+                      min_capacity=16, max_capacity=1000, contact_hours_mix=None, seed=None):
+    """
+    This function generates an instance. Courses, lecturers, curricula and sites are divided over the faculties,
+    a course only takes lecturers and curricula of its own faculty, except with probability cross_faculty.
+    :param courses: the amount of courses
+    :param lecturers: the amount of lecturers
+    :param curricula: the amount of curricula
+    :param sites: the amount of sites
+    :param rooms_per_site: the mean amount of class rooms of a site
+    :param faculties: the amount of faculties
+    :param lecturers_per_course: the mean amount of lecturers of a course
+    :param curricula_per_course: the mean amount of curricula of a course, this sets the conflict density
+    :param cross_faculty: the probability that a lecturer or curriculum of a course is taken from another faculty
+    :param median_students: the median amount of students of a course
+    :param max_students: the maximal amount of students of a course
+    :param median_capacity: the median capacity of a class room, capacities are log-normally distributed
+    :param capacity_spread: the sigma of the log-normal capacity distribution
+    :param min_capacity: the minimal capacity of a class room
+    :param max_capacity: the maximal capacity of a class room
+    :param contact_hours_mix: dictionary contact hours -> weight
+    :param seed: the seed of the random generator
+    :return: dictionary in the json format of the solver
+    """
+    rng = random.Random(seed)
+    if contact_hours_mix is None:
+        contact_hours_mix = default_contact_hours_mix
+    faculties = max(1, min(faculties, sites, lecturers, curricula))
+
+    # sites, every faculty gets its own sites
+    sites_json = []
+    site_faculty = []
+    for index in range(sites):
+        rooms_json = []
+        for room_index in range(max(1, round(rng.gauss(rooms_per_site, rooms_per_site / 4)))):
+            capacity = round(median_capacity * math.exp(rng.gauss(0, capacity_spread)))
+            rooms_json.append({'finummer': "%02d.%03d" % (index, room_index),
+                               'naam': "Room %d.%d" % (index, room_index),
+                               'capaciteit': str(min(max_capacity, max(min_capacity, capacity)))})
+        # the sites lie within a few kilometres of each other
+        sites_json.append({'code': "%02d" % index,
+                           'naam': "Site %d" % index,
+                           'xcoord': str(51.05 + rng.uniform(-0.05, 0.05)),
+                           'ycoord': str(3.72 + rng.uniform(-0.08, 0.08)),
+                           'lokalen': rooms_json})
+        site_faculty.append(index % faculties)
+
+    # every course needs a room in which it fits
+    biggest_capacity = max(int(room['capaciteit']) for site in sites_json for room in site['lokalen'])
+    max_students = min(max_students, biggest_capacity)
+
+    lecturers_json = [{'UGentid': "8%011d" % index,
+                       'voornaam': "First%d" % index,
+                       'naam': "Last%d" % index} for index in range(lecturers)]
+    curricula_json = []
+    for index in range(curricula):
+        faculty = index % faculties
+        home_sites = [site['code'] for site, site_fac in zip(sites_json, site_faculty) if site_fac == faculty]
+        curricula_json.append({'code': "C%05d" % index,
+                               'mt1': rng.choice("1111111222333456"),
+                               'homesite': rng.choice(home_sites)})
+
+    def sample(items, mean_amount, faculty):
+        # at least one item, on average mean_amount items, mostly of the same faculty
+        amount = 1 + poisson(rng, max(0.0, mean_amount - 1))
+        chosen = []
+        for i in range(amount):
+            item_faculty = faculty
+            if faculties > 1 and rng.random() < cross_faculty:
+                item_faculty = rng.randrange(faculties)
+            index = rng.randrange(item_faculty, len(items), faculties)
+            if items[index] not in chosen:
+                chosen.append(items[index])
+        return chosen
+
+    contact_hours_values = list(contact_hours_mix)
+    contact_hours_weights = [contact_hours_mix[value] for value in contact_hours_values]
+    courses_json = []
+    for index in range(courses):
+        faculty = index % faculties
+        students = round(median_students * math.exp(rng.gauss(0, 1)))
+        courses_json.append({'code': "S%07d" % index,
+                             'cursusnaam': "Course %d" % index,
+                             'studenten': str(min(max_students, max(1, students))),
+                             'contacturen': rng.choices(contact_hours_values, contact_hours_weights)[0],
+                             'lesgevers': sample(lecturers_json, lecturers_per_course, faculty),
+                             'programmas': sample(curricula_json, curricula_per_course, faculty)})
+
+    return {'academiejaar': "2018",
+            'semester': "1",
+            'nothomepenalty': "2.0",
+            'kilometerpenalty': "1.0",
+            'lateurenkost': "1.2",
+            'minimaalStudentenaantal': "5",
+            'vakken': courses_json,
+            'sites': sites_json}
+
+
+def poisson(rng, mean):
+    """
+    :return: a random number of a poisson distribution with the given mean (Knuth's algorithm)
+    """
+    limit = math.exp(-mean)
+    amount = 0
+    product = rng.random()
+    while product > limit:
+        amount += 1
+        product *= rng.random()
+    return amount
+
+
+def parse_contact_hours_mix(text):
+    """
+    :param text: comma separated list of hours:weight, e.g. "30:1,45:2,60:1"
+    :return: dictionary contact hours -> weight
+    """
+    contact_hours_mix = {}
+    for item in text.split(','):
+        hours, weight = item.split(':')
+        hours = float(hours)
+        contact_hours_mix[int(hours) if hours.is_integer() else hours] = float(weight)
+    return contact_hours_mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic timetabling instance.")
+    parser.add_argument('-o', '--output', default="datasets/synthetic.json")
+    parser.add_argument('--courses', type=int, default=2400)
+    parser.add_argument('--lecturers', type=int, default=1800)
+    parser.add_argument('--curricula', type=int, default=600)
+    parser.add_argument('--sites', type=int, default=25)
+    parser.add_argument('--rooms-per-site', type=float, default=17)
+    parser.add_argument('--faculties', type=int, default=1)
+    parser.add_argument('--lecturers-per-course', type=float, default=1.8)
+    parser.add_argument('--curricula-per-course', type=float, default=1.05)
+    parser.add_argument('--cross-faculty', type=float, default=0.05)
+    parser.add_argument('--median-students', type=float, default=15)
+    parser.add_argument('--max-students', type=int, default=1200)
+    parser.add_argument('--median-capacity', type=float, default=50)
+    parser.add_argument('--capacity-spread', type=float, default=0.8)
+    parser.add_argument('--min-capacity', type=int, default=16)
+    parser.add_argument('--max-capacity', type=int, default=1000)
+    parser.add_argument('--contact-hours-mix', type=parse_contact_hours_mix, default=None,
+                        help="comma separated list of hours:weight, e.g. 30:1,45:2,60:1")
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = vars(parser.parse_args())
+
+    output = arguments.pop('output')
+    instance = generate_instance(**arguments)
+    with open(output, 'w') as f:
+        json.dump(instance, f)
+    print("Generated " + str(len(instance['vakken'])) + " courses in " + output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,70 @@
+import argparse
+import json
 import process_input
-import general_info as gi
+import instance_cache
 import generate_output as go
 import time
 import timetable_builder as tb
+import telemetry
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Solve the timetable of an instance.")
+    parser.add_argument('--telemetry', default=None, help="json lines file for the telemetry of the search")
+    parser.add_argument('--telemetry-summary', action='store_true', help="print a summary of the telemetry")
+    parser.add_argument('--workers', type=int, default=None, help="amount of worker processes")
+    parser.add_argument('--replicas', type=int, default=None,
+                        help="amount of simulated annealing replicas in the worker processes")
+    parser.add_argument('--restarts', action='store_true',
+                        help="run the replicas as independent restarts instead of parallel tempering")
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help="seconds for the whole search, by default every sub problem gets a fixed time")
+    parser.add_argument('--construction', choices=sorted(tb.construction_engines), default="greedy",
+                        help="the engine that constructs the initial timetables")
+    parser.add_argument('--no-room-assignment', action='store_true',
+                        help="keep the rooms of the search instead of assigning the rooms of every time slot optimally")
+    parser.add_argument('--compact-output', action='store_true',
+                        help="merge the reservations over weeks and consecutive hours")
+    parser.add_argument('--grid-timetable', action='store_true',
+                        help="keep the timetables in NumPy arrays of rooms x time slots")
+    arguments = parser.parse_args()
+    if arguments.replicas is not None and (arguments.workers is None or arguments.workers < 2):
+        parser.error("--replicas needs --workers with at least two worker processes")
+
     start_time = time.perf_counter()
     # Initialize all variables needed to create a time table
     print("Starting to process input.  " + str(time.perf_counter() - start_time))
-    process_input.init_general_info()
-    timetable = process_input.create_initial_timetable()
-    events_1, events_2, events_3, events_4 = process_input.create_initial_events_lists()
-    courses_set = gi.courses_set
+    context = instance_cache.load_context()
+    if arguments.telemetry is not None or arguments.telemetry_summary:
+        context.telemetry = telemetry.Telemetry(arguments.telemetry)
+    timetable = process_input.create_initial_timetable(context, arguments.grid_timetable)
+    events_1, events_2, events_3, events_4 = process_input.create_initial_events_lists(context)
+    courses_set = context.courses_set
     print("Processing input completed.  " + str(time.perf_counter() - start_time))
 
     # Start constructing timetable
-    timetable_builder = tb.TimeTableBuilder(timetable=timetable,
+    timetable_builder = tb.TimeTableBuilder(context=context,
+                                            timetable=timetable,
                                             events_1=events_1,
                                             events_2=events_2,
                                             events_3=events_3,
                                             events_4=events_4,
                                             courses_set=courses_set,
-                                            start_time=start_time)
+                                            start_time=start_time,
+                                            workers=arguments.workers,
+                                            time_limit=arguments.time_limit,
+                                            replicas=arguments.replicas,
+                                            exchange_states=not arguments.restarts,
+                                            optimise_rooms=not arguments.no_room_assignment,
+                                            construction=arguments.construction)
     timetable_complete = timetable_builder.build_timetable()
     # Start generating the output file
     print("Starting to generate output.  " + str(time.perf_counter() - start_time))
-    go.generate_output_from_time_table(timetable_complete)
+    go.generate_output_from_time_table(timetable_complete, compact=arguments.compact_output)
     print("Generating output completed.  " + str(time.perf_counter() - start_time))
+    summary = context.telemetry.close()
+    if arguments.telemetry_summary:
+        print(json.dumps(summary, indent=2))
 
 
 if __name__ == '__main__':
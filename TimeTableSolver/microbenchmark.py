@@ -0,0 +1,159 @@
+"""
+    This module measures the operations per second of the primitives the search runs millions of times.
+    Every primitive runs on a timetable of the real instance that is filled up to several fill levels.
+
+    Example: python microbenchmark.py --fill-levels 0.1 0.2 0.3 --duration 1 -o microbenchmark.json
+"""
+import argparse
+import json
+import random
+import time
+import batch_evaluation as be
+import hard_constraints as hc
+import instance_cache
+import neighborhood
+import process_input
+import soft_constraints as sc
+
+
+def create_fixture(context, events, fill_level, grid=False):
+    """
+    This function creates a timetable and places events until the given part of all positions is occupied,
+    or until no more events fit. Only feasible positions are used.
+    :param context: instance of SolverContext
+    :param events: list of course events, in the order they get placed
+    :param fill_level: the part of all positions that should be occupied
+    :param grid: True for a timetable that keeps its placements in NumPy arrays
+    :return: the timetable and the list of events that were not placed
+    """
+    timetable = process_input.create_initial_timetable(context, grid)
+    wanted_positions = int(fill_level * len(timetable.positions))
+    unplaced_events = []
+    for course_event in events:
+        if len(timetable.occupied_positions) >= wanted_positions:
+            unplaced_events.append(course_event)
+            continue
+        position = neighborhood.find_free_position(timetable, course_event)
+        if position is None:
+            unplaced_events.append(course_event)
+        else:
+            timetable.assign_course_to_position(course_event, position)
+    return timetable, unplaced_events
+
+
+def measure(operation, arguments, duration):
+    """
+    This function calls the operation on the arguments, over and over, for at least the given duration.
+    :param operation: function that gets called with one element of arguments
+    :param arguments: list of arguments, prepared in advance so they are not part of the measurement
+    :param duration: the minimal amount of seconds to measure
+    :return: operations per second
+    """
+    amount = 0
+    start_time = time.perf_counter()
+    elapsed_time = 0
+    while elapsed_time < duration:
+        for argument in arguments:
+            operation(argument)
+        amount += len(arguments)
+        elapsed_time = time.perf_counter() - start_time
+    return amount / elapsed_time
+
+
+def benchmark_fill_level(context, events, fill_level, duration, batch_size=1000, grid=False):
+    """
+    :return: dictionary primitive -> operations per second, measured on one fixture
+    """
+    timetable, unplaced_events = create_fixture(context, events, fill_level, grid)
+    placed_events = [timetable.timetable[position] for position in timetable.occupied_positions]
+    results = {}
+
+    fits_arguments = [(random.choice(events), neighborhood.get_random_time_slot(context)) for i in range(batch_size)]
+    results['course_event_fits_into_time_slot'] = measure(
+        lambda argument: hc.course_event_fits_into_time_slot(context, argument[0], argument[1]),
+        fits_arguments, duration)
+
+    mask_arguments = [random.choice(events) for i in range(batch_size)]
+    results['available_time_slots_mask'] = measure(
+        lambda course_event: hc.available_time_slots_mask(context, course_event, timetable.offset),
+        mask_arguments, duration)
+
+    # an event gets assigned to a free position where it fits and removed again, so the fill level stays the same
+    assign_arguments = []
+    for course_event in unplaced_events[:batch_size]:
+        position = neighborhood.find_free_position(timetable, course_event)
+        if position is not None:
+            assign_arguments.append((course_event, position))
+    if len(assign_arguments) > 0:
+        def assign_and_remove(argument):
+            timetable.assign_course_to_position(argument[0], argument[1])
+            timetable.remove_course_from_position(argument[1])
+
+        results['assign_course_to_position + remove_course_from_position'] = measure(
+            assign_and_remove, assign_arguments, duration)
+
+    results['get_random_positions'] = measure(lambda argument: neighborhood.get_random_positions(timetable),
+                                              range(batch_size), duration)
+
+    # a swap moves events, so the fill level stays the same
+    if len(timetable.occupied_positions) > 0:
+        swap_arguments = [neighborhood.get_random_positions(timetable) for i in range(batch_size)]
+        results['swap_positions'] = measure(
+            lambda argument: neighborhood.swap_positions(timetable, placed_events, argument[0], argument[1]),
+            swap_arguments, duration)
+
+    for penalty_function in (sc.return_room_size_penalty_all,
+                             sc.return_last_two_hour_penalty_all,
+                             sc.return_to_many_straight_hours_penalty_all,
+                             sc.return_only_one_hour_penalty_all,
+                             sc.return_not_home_penalty_all,
+                             sc.return_distance_penalty_all,
+                             sc.return_total_penalty_of_timetable):
+        results[penalty_function.__name__] = measure(lambda argument: penalty_function(timetable),
+                                                     range(1), duration)
+    results['batch ' + be.return_total_penalty_of_timetable.__name__] = measure(
+        lambda argument: be.return_total_penalty_of_timetable(timetable), range(1), duration)
+
+    result = {'fill_level': fill_level,
+              'occupied_positions': len(timetable.occupied_positions),
+              'positions': len(timetable.positions),
+              'ops_per_second': results}
+    # the occupied time slots are kept in the context, so they have to be freed before the next fixture
+    for position in list(timetable.occupied_positions):
+        timetable.remove_course_from_position(position)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the primitives of the timetable solver.")
+    parser.add_argument('instance', nargs='?', default=process_input.default_path)
+    parser.add_argument('--fill-levels', type=float, nargs='+', default=[0.1, 0.2, 0.3])
+    parser.add_argument('--duration', type=float, default=1.0, help="seconds per primitive and fill level")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grid-timetable', action='store_true', help="measure a timetable with NumPy arrays")
+    parser.add_argument('-o', '--output', default=None, help="json file for the results")
+    arguments = parser.parse_args()
+
+    random.seed(arguments.seed)
+    context = instance_cache.load_context(arguments.instance)
+    events_1, events_2, events_3, events_4 = process_input.create_initial_events_lists(context)
+    events = events_1 + events_2 + events_3 + events_4
+    random.shuffle(events)
+
+    results = []
+    for fill_level in arguments.fill_levels:
+        result = benchmark_fill_level(context, events, fill_level, arguments.duration, grid=arguments.grid_timetable)
+        results.append(result)
+        print("fill level " + str(fill_level) + " (" + str(result['occupied_positions']) + " of "
+              + str(result['positions']) + " positions occupied)")
+        for primitive, ops_per_second in result['ops_per_second'].items():
+            print("    {:<60} {:>14,.1f} ops/sec".format(primitive, ops_per_second))
+
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as f:
+            json.dump({'instance': arguments.instance, 'seed': arguments.seed, 'grid': arguments.grid_timetable,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
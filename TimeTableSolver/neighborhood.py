@@ -1,23 +1,24 @@
 import hard_constraints as hc
-import general_info as gi
 import random
 
 
-def get_random_time_slot():
+def get_random_time_slot(context):
     """
+    :param context: instance of SolverContext
     :return: random time slot
     """
-    return random.randrange(gi.total_course_hours)
+    return random.randrange(context.total_course_hours)
 
 
-def get_random_time_slots():
+def get_random_time_slots(context):
     """
+    :param context: instance of SolverContext
     :return: two different random time slots, integers
     """
-    time_slot_1 = random.randrange(gi.total_course_hours)
-    time_slot_2 = random.randrange(gi.total_course_hours)
+    time_slot_1 = random.randrange(context.total_course_hours)
+    time_slot_2 = random.randrange(context.total_course_hours)
     while time_slot_1 == time_slot_2:
-        time_slot_2 = random.randrange(gi.total_course_hours)
+        time_slot_2 = random.randrange(context.total_course_hours)
     return time_slot_1, time_slot_2
 
 
@@ -27,15 +28,30 @@ def get_random_positions(timetable):
     :return: two different time table dictionary keys, (fi_number, time_slot)
     """
     if len(timetable.occupied_positions) == 0:
-        position_1 = random.choice(list(timetable.timetable))
+        position_1 = random.choice(timetable.positions)
     else:
-        position_1 = random.choice(list(timetable.occupied_positions))  # get an occupied position
-    position_2 = random.choice(list(timetable.timetable))
+        position_1 = timetable.occupied_positions.random_choice()  # get an occupied position
+    position_2 = random.choice(timetable.positions)
     while position_1 == position_2:
-        position_2 = random.choice(list(timetable.timetable))
+        position_2 = random.choice(timetable.positions)
     return position_1, position_2
 
 
+def find_free_position(timetable, course_event):
+    """
+    Looks for the smallest free room that can hold the event, in the first time slot where the event fits.
+    :param timetable: instance of Timetable
+    :param course_event: instance of CourseEvent
+    :return: (fi_number, time_slot), or None if the event fits nowhere
+    """
+    time_slots_mask = hc.available_time_slots_mask(timetable.context, course_event, timetable.offset)
+    for time_slot in hc.time_slots_in_mask(time_slots_mask):
+        fi_number = timetable.free_rooms.smallest_free_room(time_slot, course_event.student_amount)
+        if fi_number is not None:
+            return fi_number, time_slot
+    return None
+
+
 def swap_positions(timetable, events, position_1, position_2, feasibility=True):
     """
     :param timetable: instance of Timetable
@@ -47,11 +63,11 @@ def swap_positions(timetable, events, position_1, position_2, feasibility=True):
     """
     event_1 = timetable.timetable[position_1]
     fi_number_1 = position_1[0]
-    room_1 = gi.class_rooms_dict[fi_number_1]
+    room_1 = timetable.context.class_rooms_dict[fi_number_1]
     time_slot_1 = position_1[1]
     event_2 = timetable.timetable[position_2]
     fi_number_2 = position_2[0]
-    room_2 = gi.class_rooms_dict[fi_number_2]
+    room_2 = timetable.context.class_rooms_dict[fi_number_2]
     time_slot_2 = position_2[1]
     # Check if both events are not None or that they are not equal
     if (event_1 is None and event_2 is None) or event_1 == event_2:
@@ -62,14 +78,14 @@ def swap_positions(timetable, events, position_1, position_2, feasibility=True):
         # Check if no hard constraints get violated
         if event_1 is not None:
             timetable.remove_course_from_position(position_2)
-            swap_possible = hc.course_event_fits_into_time_slot(event_1, time_slot_2+timetable.offset*40) and hc.room_capacity_constraint(event_1, room_2)
+            swap_possible = hc.course_event_fits_into_time_slot(timetable.context, event_1, time_slot_2+timetable.offset*40) and hc.room_capacity_constraint(event_1, room_2)
             timetable.assign_course_to_position(event_2, position_2)
             if not swap_possible:
                 return False, timetable, events
 
         if event_2 is not None:
             timetable.remove_course_from_position(position_1)
-            swap_possible = hc.course_event_fits_into_time_slot(event_2, time_slot_1+timetable.offset*40) and hc.room_capacity_constraint(event_2, room_1)
+            swap_possible = hc.course_event_fits_into_time_slot(timetable.context, event_2, time_slot_1+timetable.offset*40) and hc.room_capacity_constraint(event_2, room_1)
             timetable.assign_course_to_position(event_1, position_1)
             if not swap_possible:
                 return False, timetable, events
@@ -86,13 +102,13 @@ def swap_positions(timetable, events, position_1, position_2, feasibility=True):
     timetable.remove_course_from_position(position_2)
     timetable.remove_course_from_position(position_1)
     if event_1 is not None:
-        swap_possible = hc.course_event_fits_into_time_slot(event_1, time_slot_2+timetable.offset*40) and hc.room_capacity_constraint(event_1, room_2)
+        swap_possible = hc.course_event_fits_into_time_slot(timetable.context, event_1, time_slot_2+timetable.offset*40) and hc.room_capacity_constraint(event_1, room_2)
         if swap_possible:
             timetable.assign_course_to_position(event_1, position_2)
         else:
             events.append(event_1)
     if event_2 is not None:
-        swap_possible = hc.course_event_fits_into_time_slot(event_2, time_slot_1+timetable.offset*40) and hc.room_capacity_constraint(event_2, room_1)
+        swap_possible = hc.course_event_fits_into_time_slot(timetable.context, event_2, time_slot_1+timetable.offset*40) and hc.room_capacity_constraint(event_2, room_1)
         if swap_possible:
             timetable.assign_course_to_position(event_2, position_1)
         else:
@@ -110,16 +126,15 @@ def swap_occupied_for_unplaced_in_time_slot(timetable, events, time_slot):
     :return: timetable, events
     """
 
-    for occupied_position in timetable.occupied_positions:
-        if occupied_position[1] != time_slot:
-            continue
+    # copy the positions of the time slot, because the index changes while swapping
+    for occupied_position in list(timetable.occupied_by_time_slot[time_slot]):
         event_back_up = timetable.remove_course_from_position(occupied_position)
         timetable.assign_course_to_position(event_back_up, occupied_position)
-        room = gi.class_rooms_dict[occupied_position[0]]
+        room = timetable.context.class_rooms_dict[occupied_position[0]]
         time_slot = occupied_position[1]
         found_replacement = False
         for event in events:
-            if hc.course_event_fits_into_time_slot(event, time_slot+timetable.offset*40) and hc.room_capacity_constraint(event, room):
+            if hc.course_event_fits_into_time_slot(timetable.context, event, time_slot+timetable.offset*40) and hc.room_capacity_constraint(event, room):
                 timetable.assign_course_to_position(event, occupied_position)
                 found_replacement = True
                 break
@@ -127,6 +142,67 @@ def swap_occupied_for_unplaced_in_time_slot(timetable, events, time_slot):
             timetable.assign_course_to_position(event_back_up, occupied_position)
             continue
         if found_replacement:
+            events.remove(event)
             events.append(event_back_up)
             return True, timetable, events
     return False, timetable, events
+
+
+def get_kempe_chain(timetable, position, time_slot):
+    """
+    Collects the Kempe chain of the event on the position: the events in its time slot and in the given time slot
+    that are connected to it by conflicts (a common lecturer or curriculum).
+    Swapping the time slots of all events of the chain keeps both time slots free of conflicts.
+    :param timetable: instance of Timetable
+    :param position: (fi_number, time_slot), an occupied position
+    :param time_slot: the other time slot of the chain
+    :return: set of the positions of all events of the chain
+    """
+    conflict_graph = timetable.context.get_conflict_graph()
+    other_time_slot = {position[1]: time_slot, time_slot: position[1]}
+    chain = {position}
+    positions_to_check = [position]
+    while len(positions_to_check) > 0:
+        current_position = positions_to_check.pop()
+        course_code = timetable.timetable[current_position].course_code
+        neighbours = conflict_graph.get_neighbours(course_code)
+        for other_position in timetable.occupied_by_time_slot[other_time_slot[current_position[1]]]:
+            if other_position in chain:
+                continue
+            other_course_code = timetable.timetable[other_position].course_code
+            if other_course_code == course_code or other_course_code in neighbours:
+                chain.add(other_position)
+                positions_to_check.append(other_position)
+    return chain
+
+
+def move_kempe_chain(timetable, chain, time_slot_1, time_slot_2):
+    """
+    Moves every event of the chain to the other time slot, into the smallest free room that can hold it.
+    The biggest events get a room first. Use this function inside a transaction of the timetable,
+    because the events that were already moved stay moved when the chain does not fit.
+    :param timetable: instance of Timetable
+    :param chain: set of positions, as returned by get_kempe_chain
+    :param time_slot_1: the time slot of one half of the chain
+    :param time_slot_2: the time slot of the other half of the chain
+    :return: list of (course_event, old_position, new_position), or None if an event does not fit
+    """
+    other_time_slot = {time_slot_1: time_slot_2, time_slot_2: time_slot_1}
+    removed_events = []
+    for position in chain:
+        removed_events.append((timetable.remove_course_from_position(position), position))
+    removed_events.sort(key=lambda removed_event: removed_event[0].student_amount, reverse=True)
+
+    moves = []
+    for course_event, old_position in removed_events:
+        time_slot = other_time_slot[old_position[1]]
+        # events outside the chain, e.g. of other weeks, can still occupy a lecturer or curriculum
+        if not hc.course_event_fits_into_time_slot(timetable.context, course_event, time_slot+timetable.offset*40):
+            return None
+        fi_number = timetable.free_rooms.smallest_free_room(time_slot, course_event.student_amount)
+        if fi_number is None:
+            return None
+        new_position = (fi_number, time_slot)
+        timetable.assign_course_to_position(course_event, new_position)
+        moves.append((course_event, old_position, new_position))
+    return moves
@@ -0,0 +1,125 @@
+"""
+    This module runs the improvement phase with several simulated annealing replicas in worker processes.
+"""
+import copy
+import math
+import random
+import time
+import delta_evaluator as de
+import improve_time_table as it
+
+
+class ParallelTempering:
+
+    def __init__(self, timetable, executor, replicas=4, t_min=0.05, t_max=5, exchange_interval=5.0,
+                 exchange_states=True):
+        """
+        Every replica runs simulated annealing at its own temperature, on a ladder from t_min to t_max.
+        After every exchange interval the states of replicas with adjacent temperatures are swapped with the
+        probability of parallel tempering, so good states move towards the low temperatures.
+        Without exchanging states, every replica is an independent restart that cools down from t_max to t_min.
+        The ladder goes lower than the single chain of ImproveTimeTable, because swaps at 1.3 already get accepted
+        so often that the cold replicas would not keep the improvements they find.
+        :param timetable: The feasible timetable that we want to improve
+        :param executor: the process pool that runs the replicas
+        :param replicas: the amount of replicas
+        :param t_min: the lowest temperature
+        :param t_max: the highest temperature
+        :param exchange_interval: the amount of seconds the replicas run between two exchanges
+        :param exchange_states: True for parallel tempering, False for independent restarts
+        """
+        self.timetable = timetable
+        self.context = timetable.context
+        self.executor = executor
+        self.replicas = replicas
+        self.t_min = t_min
+        self.t_max = t_max
+        self.exchange_interval = exchange_interval
+        self.exchange_states = exchange_states
+        if replicas > 1:
+            self.temperatures = [t_min * (t_max / t_min) ** (i / (replicas - 1)) for i in range(replicas)]
+        else:
+            self.temperatures = [t_min]
+
+    def improve(self, max_time=60):
+        """
+        This function improves the timetable with all replicas and keeps the best timetable that any of them found.
+        The replicas continue from their current states, the best state of every run is only kept to be returned.
+        :param max_time: the amount of seconds the improvement may take
+        :return: we return the total penalty and the timetable
+        """
+        deadline = time.perf_counter() + max_time
+        states = [self.timetable] * self.replicas  # every replica gets its own copy when it is pickled
+        costs = [None] * self.replicas
+        occupancies = [None] * self.replicas
+        best_cost = de.DeltaEvaluator(self.timetable).total_cost
+        best_state = None
+        print("Cost of tt before improve: " + str(best_cost))
+
+        exchange_round = 0
+        while time.perf_counter() < deadline:
+            if self.exchange_states:
+                interval = min(self.exchange_interval, deadline - time.perf_counter())
+                schedules = [(temperature, temperature, 1) for temperature in self.temperatures]
+            else:
+                interval = deadline - time.perf_counter()
+                schedules = [(self.t_max, self.t_min, 5)] * self.replicas
+            futures = []
+            for replica in range(self.replicas):
+                futures.append(self.executor.submit(run_replica, states[replica], schedules[replica], interval,
+                                                    random.randrange(2 ** 32)))
+            for replica, future in enumerate(futures):
+                current, best, telemetry = future.result()
+                costs[replica], states[replica], occupancies[replica] = current
+                self.context.telemetry.merge(telemetry)
+                if best[0] < best_cost:
+                    best_cost = best[0]
+                    best_state = best[1:]
+
+            if not self.exchange_states:
+                break
+            # swap the states of adjacent temperatures, the even pairs and the odd pairs take turns
+            for replica in range(exchange_round % 2, self.replicas - 1, 2):
+                exponent = (1 / self.temperatures[replica] - 1 / self.temperatures[replica + 1]) \
+                    * (costs[replica] - costs[replica + 1])
+                if exponent >= 0 or random.random() < math.exp(exponent):
+                    for values in (states, costs, occupancies):
+                        values[replica], values[replica + 1] = values[replica + 1], values[replica]
+            exchange_round += 1
+
+        print("Cost after improve phase: " + str(best_cost))
+        if best_state is None:
+            return best_cost, self.timetable
+
+        # the best timetable comes from a worker, its occupied time slots get merged back into the context
+        timetable, occupancy = best_state
+        self.context.import_week_occupancy(timetable.offset, occupancy)
+        timetable.context = self.context
+        return best_cost, timetable
+
+
+def run_replica(timetable, schedule, max_time, seed):
+    """
+    This function runs in a worker process, it runs simulated annealing on the timetable of one replica.
+    The timetable holds the worker's own copy of the context, so it never shares state with other replicas.
+    :param timetable: instance of TimeTable
+    :param schedule: (t_max, t_min, steps) of the simulated annealing, t_max equal to t_min for one temperature
+    :param max_time: the amount of seconds for the simulated annealing
+    :param seed: the seed of the random generator of the worker
+    :return: (cost, timetable, occupancy of its week) of the current state, which the replica continues from,
+             the same of the best state the replica visited and the exported telemetry
+    """
+    random.seed(seed)
+    improve = it.ImproveTimeTable(timetable)
+    t_max, t_min, steps = schedule
+    with timetable.context.telemetry.timer("sa"):
+        improve.simulated_annealing(t_max, t_min, steps, max_time)
+    current = (improve.evaluator.total_cost, timetable, timetable.context.export_week_occupancy(timetable.offset))
+    if improve.is_at_best():
+        best = (improve.best_cost, ) + current[1:]
+    else:
+        # the current state is copied with its own context, the timetable itself goes back to the best state
+        current = (current[0], copy.deepcopy(timetable), current[2])
+        improve.restore_best()
+        best = (improve.best_cost, timetable, timetable.context.export_week_occupancy(timetable.offset))
+    return current, best, timetable.context.telemetry.export()
@@ -0,0 +1,189 @@
+"""
+    This module assigns the rooms of every time slot optimally, without moving any event to another time slot.
+    The events of a time slot and the rooms of that time slot form an assignment problem, which is solved exactly
+    with the Hungarian algorithm. The cost of an event in a room is its not_home and distance penalty, plus the
+    part of the room it leaves empty. The empty part has the weight of the room size penalty, which is the mean over
+    all events, so it only decides between rooms on sites with the same penalty. Because events end up in the smallest
+    fitting rooms, the big rooms stay free for the events that still have to be placed in later weeks.
+"""
+import hard_constraints as hc
+import time
+
+# the cost of an event in a room that is too small, higher than any real cost of a time slot
+infeasible_cost = 1e9
+
+
+def hungarian(costs):
+    """
+    This function solves the assignment problem with the Hungarian algorithm (shortest augmenting paths),
+    in O(n^2 * m) time. Every row first gets its cheapest column if no other row took it yet,
+    so only the rows that compete for the same columns need an augmenting path.
+    :param costs: list of n rows with m costs each, n <= m
+    :return: list with the column assigned to every row, such that the sum of the costs is minimal
+    """
+    n = len(costs)
+    m = len(costs[0])
+    # index 0 is a dummy row and column, the rows and columns of the costs start at index 1
+    u = [0.0] * (n + 1)  # potentials of the rows
+    v = [0.0] * (m + 1)  # potentials of the columns
+    row_of_column = [0] * (m + 1)
+    previous_column = [0] * (m + 1)
+
+    # the cheapest column of every row is a tight edge, with the row minimum as potential of the row
+    unassigned_rows = []
+    for row in range(1, n + 1):
+        row_costs = costs[row - 1]
+        u[row] = min(row_costs)
+        column = row_costs.index(u[row]) + 1
+        if row_of_column[column] == 0:
+            row_of_column[column] = row
+        else:
+            unassigned_rows.append(row)
+
+    for row in unassigned_rows:
+        row_of_column[0] = row
+        column = 0
+        # the potentials only change for the columns in the tree, by the total delta since they joined it,
+        # so they are updated once the tree reaches a free column, and the minimal reduced costs of the
+        # other columns are stored with the total delta added to them
+        total_delta = 0.0
+        min_reduced_cost = [float('inf')] * (m + 1)
+        tree_columns = [0]
+        joined_at = [0.0]
+        other_columns = list(range(1, m + 1))
+        # grow a tree of tight edges from the new row until it reaches a free column
+        while True:
+            current_row = row_of_column[column]
+            current_costs = costs[current_row - 1]
+            shift = total_delta - u[current_row]
+            best = float('inf')
+            next_index = 0
+            for index, j in enumerate(other_columns):
+                reduced_cost = current_costs[j - 1] - v[j] + shift
+                if reduced_cost < min_reduced_cost[j]:
+                    min_reduced_cost[j] = reduced_cost
+                    previous_column[j] = column
+                else:
+                    reduced_cost = min_reduced_cost[j]
+                if reduced_cost < best:
+                    best = reduced_cost
+                    next_index = index
+            total_delta = best
+            column = other_columns.pop(next_index)
+            tree_columns.append(column)
+            joined_at.append(total_delta)
+            if row_of_column[column] == 0:
+                break
+        for j, joined in zip(tree_columns, joined_at):
+            u[row_of_column[j]] += total_delta - joined
+            v[j] -= total_delta - joined
+        # flip the augmenting path
+        while column != 0:
+            previous = previous_column[column]
+            row_of_column[column] = row_of_column[previous]
+            column = previous
+
+    assignment = [0] * n
+    for j in range(1, m + 1):
+        if row_of_column[j] != 0:
+            assignment[row_of_column[j] - 1] = j - 1
+    return assignment
+
+
+class RoomAssignment:
+
+    def __init__(self, timetable):
+        """
+        :param timetable: instance of TimeTable
+        """
+        self.timetable = timetable
+        self.context = timetable.context
+        self.site_costs = {}  # course_code -> site_id -> not_home and distance penalty of the events on the site
+
+    def get_site_costs(self, course_event):
+        """
+        :param course_event: instance of CourseEvent
+        :return: dictionary site_id -> not_home and distance penalty of the event on that site
+        """
+        if course_event.course_code not in self.site_costs:
+            curriculum_site_penalties = self.context.get_curriculum_site_penalties()
+            site_costs = {}
+            for site_code in self.context.sites_dict:
+                site_costs[site_code] = 0
+                for curriculum_code in course_event.curricula:
+                    not_home, distance = curriculum_site_penalties[curriculum_code][site_code]
+                    site_costs[site_code] += not_home + 4 * distance / 75
+            self.site_costs[course_event.course_code] = site_costs
+        return self.site_costs[course_event.course_code]
+
+    def get_costs(self, course_event, rooms, amount_of_events):
+        """
+        :param course_event: instance of CourseEvent
+        :param rooms: list of instances of ClassRoom
+        :param amount_of_events: the amount of events in the timetable
+        :return: list with the cost of the event in every room
+        """
+        site_costs = self.get_site_costs(course_event)
+        return [site_costs[room.site_id] + (1 - course_event.student_amount / room.capacity) / amount_of_events
+                if hc.room_capacity_constraint(course_event, room) else infeasible_cost
+                for room in rooms]
+
+    def get_penalty(self, course_event, room, amount_of_events):
+        """
+        :param course_event: instance of CourseEvent
+        :param room: instance of ClassRoom
+        :param amount_of_events: the amount of events in the timetable
+        :return: the share of the event in the total penalty, if it takes place in the room
+        """
+        return self.get_site_costs(course_event)[room.site_id] \
+            + course_event.student_amount / room.capacity / amount_of_events
+
+    def optimise_time_slot(self, time_slot):
+        """
+        This function moves the events of the time slot to the rooms of the optimal assignment.
+        :param time_slot: the time slot of the week
+        :return: the difference in total penalty
+        """
+        occupied_positions = list(self.timetable.occupied_by_time_slot[time_slot])
+        if len(occupied_positions) == 0:
+            return 0
+        amount_of_events = len(self.timetable.occupied_positions)
+        events = [self.timetable.timetable[position] for position in occupied_positions]
+        # the first rooms are the current rooms of the events, in the same order
+        rooms = [self.context.class_rooms_dict[fi_number] for fi_number, ts in occupied_positions] \
+            + [self.context.class_rooms_dict[fi_number] for fi_number, ts in self.timetable.empty_by_time_slot[time_slot]]
+
+        costs = [self.get_costs(course_event, rooms, amount_of_events) for course_event in events]
+        assignment = hungarian(costs)
+        old_cost = sum(costs[index][index] for index in range(len(events)))
+        new_cost = sum(costs[index][column] for index, column in enumerate(assignment))
+        if new_cost >= old_cost - 1e-9:
+            return 0
+
+        difference = 0
+        moves = []
+        for course_event, position, column in zip(events, occupied_positions, assignment):
+            if rooms[column].fi_number != position[0]:
+                difference += self.get_penalty(course_event, rooms[column], amount_of_events) \
+                    - self.get_penalty(course_event, self.context.class_rooms_dict[position[0]], amount_of_events)
+                moves.append((position, rooms[column].fi_number))
+        self.timetable.move_courses_to_rooms(moves)
+        return difference
+
+    def optimise(self, max_time=None):
+        """
+        This function assigns the rooms of every time slot of the timetable optimally.
+        :param max_time: the amount of seconds the assignment may take, None for no limit,
+                         the time slots that are not reached when the time is up keep their rooms
+        :return: the difference in total penalty
+        """
+        deadline = None
+        if max_time is not None:
+            deadline = time.monotonic() + max_time
+        difference = 0
+        with self.context.telemetry.timer("rooms"):
+            for time_slot in self.timetable.occupied_by_time_slot:
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                difference += self.optimise_time_slot(time_slot)
+        return difference
@@ -1,58 +1,66 @@
 """
     This module holds all soft constraints.
 """
-import general_info as gi
-from haversine import haversine
 import math
 
 
-def return_distance_penalty(room, course_event):
+def init_cost_tables(context):
+    """
+    This function precomputes the distance between every two sites and the not_home and distance penalty
+    of every curriculum on every site. Afterwards the room based penalties are table lookups.
+    Use context.get_curriculum_site_penalties, which calls this function the first time the tables are needed.
+    :param context: instance of SolverContext
+    """
+    # haversine is only imported when the distances are needed
+    from haversine import haversine
+
+    context.site_distances = {}
+    for site_code_1, site_1 in context.sites_dict.items():
+        position_1 = (float(site_1.x_coord), float(site_1.y_coord))
+        for site_code_2, site_2 in context.sites_dict.items():
+            position_2 = (float(site_2.x_coord), float(site_2.y_coord))
+            context.site_distances[(site_code_1, site_code_2)] = haversine(position_1, position_2)
+
+    context.curriculum_site_penalties = {}
+    for curriculum_code, curriculum in context.curricula_dict.items():
+        site_penalties = {}
+        for site_code in context.sites_dict:
+            if curriculum.home_site == site_code:
+                site_penalties[site_code] = (0, 0)
+            else:
+                distance = context.site_distances[(site_code, curriculum.home_site)]
+                site_penalties[site_code] = (1, context.kilometer_penalty * distance)
+        context.curriculum_site_penalties[curriculum_code] = site_penalties
+
+
+def return_distance_penalty(context, room, course_event):
     """
     This function will calculate the total distance penalty for a specific course
+    :param context: instance of SolverContext
     :param room: the current room
     :param course_event: the current course
     :return: we return the total penalty
     """
-    class_room_site = gi.sites_dict[room.site_id]
-
-    curricula_of_courses = course_event.curricula
-
+    curriculum_site_penalties = context.get_curriculum_site_penalties()
     total_penalty = 0
-    for curriculum_code in curricula_of_courses:
-        curriculum = gi.curricula_dict[curriculum_code]
-        if curriculum.home_site == room.site_id:
-            continue
-
-        x_coord_class = float(class_room_site.x_coord)
-        y_coord_class = float(class_room_site.y_coord)
-        position_class = (x_coord_class, y_coord_class)
-
-        home_of_curriculum = gi.sites_dict[curriculum.home_site]
-        x_coord_home_of_curriculum = float(home_of_curriculum.x_coord)
-        y_coord_home_of_curriculum = float(home_of_curriculum.y_coord)
-        position_home = (x_coord_home_of_curriculum, y_coord_home_of_curriculum)
-
-        distance = haversine(position_class, position_home)
-
-        total_penalty += gi.kilometer_penalty * distance
+    for curriculum_code in course_event.curricula:
+        total_penalty += curriculum_site_penalties[curriculum_code][room.site_id][1]
 
     return total_penalty
 
 
-def return_not_home_penalty(room, course_event):
+def return_not_home_penalty(context, room, course_event):
     """
     This function calculates the not_home penalty for a given room and course.
+    :param context: instance of SolverContext
     :param room: instance of ClassRoom
     :param course_event: instance of CourseEvent
     :return: The total not_home penalty.
     """
+    curriculum_site_penalties = context.get_curriculum_site_penalties()
     count_not_home = 0
-    curricula_of_courses = course_event.curricula
-
-    for curriculum_code in curricula_of_courses:
-        curriculum = gi.curricula_dict[curriculum_code]
-        if curriculum.home_site != room.site_id:
-            count_not_home += 1
+    for curriculum_code in course_event.curricula:
+        count_not_home += curriculum_site_penalties[curriculum_code][room.site_id][0]
 
     return count_not_home
 
@@ -68,29 +76,33 @@ def return_room_size_penalty_all(timetable):
     for pos, event in timetable.timetable.items():
         if event is not None:
             count += 1
-            diff = return_room_size_penalty(pos, event)
+            diff = return_room_size_penalty(timetable.context, pos, event)
             mean_size += diff
+    if count == 0:
+        return 0
     return mean_size / count
 
 
-def return_room_size_penalty(position, event):
+def return_room_size_penalty(context, position, event):
     """
     This function will compute the room_size penalty for one room and event that is scheduled their
+    :param context: instance of SolverContext
     :param position: the position, containing the room and time_slot
     :param event: the event that was scheduled
     :return: we return the penalty
     """
     room_id = position[0]
-    room = gi.class_rooms_dict[room_id]
+    room = context.class_rooms_dict[room_id]
     student_amount = event.student_amount
     room_capacity = room.capacity
     diff = student_amount / room_capacity
     return diff
 
 
-def return_last_two_hour_penalty(position, event):
+def return_last_two_hour_penalty(context, position, event):
     """
     This function will compute a penalty if the event is scheduled at the last two hours of a day
+    :param context: instance of SolverContext
     :param position: the position in the timetable
     :param event: the event scheduled
     :return: we return the penalty
@@ -100,7 +112,7 @@ def return_last_two_hour_penalty(position, event):
         # compute the hour of the day
         event_hour = time_slot % 8
         if event_hour == 6 or event_hour == 7:  # last two hours of a day
-            return gi.late_hour_penalty
+            return context.late_hour_penalty
         return 0
     return 0
 
@@ -111,12 +123,8 @@ def return_last_two_hour_penalty_all(timetable):
     :param timetable: the object that holds the timetable
     :return: we return the total penalty
     """
-    count_last_two_hours = 0
-    for pos, event in timetable.timetable.items():
-        if event is not None:
-            count_last_two_hours += return_last_two_hour_penalty(pos, event)
-
-    return count_last_two_hours
+    # every event in the last two hours of a day gets the same penalty, so only the events need to be counted
+    return timetable.count_late_hour_events() * timetable.context.late_hour_penalty
 
 
 def return_to_many_straight_hours_penalty_all(timetable):
@@ -128,7 +136,7 @@ def return_to_many_straight_hours_penalty_all(timetable):
 
     count = 0
 
-    for curriculum_id, curriculum in gi.curricula_dict.items():
+    for curriculum_id, curriculum in timetable.context.curricula_dict.items():
 
         events_of_curriculum = sorted(curriculum.occupied_time_slots)
         # check if there are 4 or more events after each other
@@ -141,24 +149,25 @@ def return_to_many_straight_hours_penalty_all(timetable):
                 # 4 events after each other
                 count += 1
 
-    print("aantal 4 of meer:" + str(count))
-
     return count
 
 
-def return_only_one_hour_penalty(pos, event):
+def return_only_one_hour_penalty(context, pos, event, offset=0):
     """
     This function will look if the specific event is the only one on the day from position
+    :param context: instance of SolverContext
     :param pos: This is the specific position
     :param event: the specific event
+    :param offset: the week of the timetable that holds the position
     :return: return a penalty if it is the only event in a day for that curriculum
     """
     penalty = 0
     curricula = event.curricula
     for curriculum_id in curricula:
-        curriculum = gi.curricula_dict[curriculum_id]
+        curriculum = context.curricula_dict[curriculum_id]
         time_slot_list = curriculum.occupied_time_slots
-        current_time_slot = pos[1]
+        # the occupied time slots of a curriculum are stored for the whole semester
+        current_time_slot = pos[1] + 40 * offset
         day = int(math.floor(current_time_slot/8))
         min_two = False
         for ts in time_slot_list:
@@ -181,12 +190,12 @@ def return_only_one_hour_penalty_all(timetable):
     one_hour_total_penalty = 0
     for pos, event in timetable.timetable.items():
         if event is not None:
-            one_hour_total_penalty += return_only_one_hour_penalty(pos, event)
+            one_hour_total_penalty += return_only_one_hour_penalty(timetable.context, pos, event, timetable.offset)
 
     return one_hour_total_penalty
 
     # alternative solution to compute the one_hour penalty
-    # for id, curriculum in gi.curricula_dict.items():
+    # for id, curriculum in timetable.context.curricula_dict.items():
     #     time_slot_list = curriculum.occupied_time_slots
     #     days = [0,0,0,0,0]
     #     for ts in time_slot_list:
@@ -206,8 +215,8 @@ def return_not_home_penalty_all(timetable):
     total_penalty = 0
     for pos, event in timetable.timetable.items():
         if event is not None:
-            room = gi.class_rooms_dict[pos[0]]
-            total_penalty += return_not_home_penalty(room, event)
+            room = timetable.context.class_rooms_dict[pos[0]]
+            total_penalty += return_not_home_penalty(timetable.context, room, event)
 
     return total_penalty
 
@@ -221,8 +230,8 @@ def return_distance_penalty_all(timetable):
     total_penalty = 0
     for pos, event in timetable.timetable.items():
         if event is not None:
-            room = gi.class_rooms_dict[pos[0]]
-            total_penalty += return_distance_penalty(room, event)
+            room = timetable.context.class_rooms_dict[pos[0]]
+            total_penalty += return_distance_penalty(timetable.context, room, event)
 
     return total_penalty
 
@@ -237,10 +246,11 @@ def return_total_penalty_of_timetable(timetable):
     late_hour_penalty = return_last_two_hour_penalty_all(timetable)
     one_hour_penalty = return_only_one_hour_penalty_all(timetable)
     four_or_more = return_to_many_straight_hours_penalty_all(timetable)
-    #room_size = return_room_size_penalty_all(timetable)
-    #not_home_penalty = return_not_home_penalty_all(timetable)
-    #distance_penalty = return_not_home_penalty_all(timetable)
-    total_penalty = float(late_hour_penalty) + float(one_hour_penalty) + float(four_or_more) #+ float(room_size) #+ float(not_home_penalty) + 4*distance_penalty/75
+    room_size = return_room_size_penalty_all(timetable)
+    not_home_penalty = return_not_home_penalty_all(timetable)
+    distance_penalty = return_distance_penalty_all(timetable)
+    total_penalty = float(late_hour_penalty) + float(one_hour_penalty) + float(four_or_more) + float(room_size) \
+        + float(not_home_penalty) + 4 * distance_penalty / 75
     return total_penalty
 
 
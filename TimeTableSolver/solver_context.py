@@ -0,0 +1,148 @@
+"""
+    This module holds the SolverContext, all mappings and variables of one problem instance.
+"""
+import soft_constraints as sc
+import conflict_graph as cg
+import telemetry
+
+
+class SolverContext:
+
+    def __init__(self):
+        """
+        A context is passed explicitly to the timetables, the constraint modules and the phase classes,
+        so more than one instance can be solved in the same process.
+        """
+        # variables
+        self.academy_year = None
+        self.semester = None
+        self.kilometer_penalty = None
+        self.late_hour_penalty = None
+        self.not_home_penalty = None
+        self.min_amount_students = None
+        self.biggest_room_capacity = None
+        self.total_course_hours = 40
+        self.weeks = 12
+        self.telemetry = telemetry.disabled  # replaced by an instance of Telemetry to measure the search
+
+        # mappings
+        self.courses_set = set()
+        self.courses_dict = {}
+        self.lecturers_dict = {}
+        self.curricula_dict = {}
+        self.sites_dict = {}
+        self.class_rooms_dict = {}
+
+        # the string ids of the input, indexed by the integer ids that the mappings use, see intern_ids
+        self.course_codes = []
+        self.ugent_ids = []
+        self.curriculum_codes = []
+        self.site_codes = []
+        self.fi_numbers = []
+
+        # computed the first time they are needed
+        self.conflict_graph = None
+        self.site_distances = None
+        self.curriculum_site_penalties = None
+        self.penalty_arrays = None  # see batch_evaluation.get_penalty_arrays
+
+    def __deepcopy__(self, memo):
+        # timetables that are copied from each other keep sharing the same context,
+        # only pickling (e.g. for a worker process) creates a new one
+        return self
+
+    def intern_ids(self):
+        """
+        This function gives every course, lecturer, curriculum, site and class room a dense integer id,
+        in the order they were loaded. Afterwards the mappings and all references between the objects use the
+        integer ids, so every lookup hashes and compares a small integer instead of a string.
+        The string ids are only needed again to write the output, they are kept in the lists of this context.
+        """
+        self.intern_mapping(self.courses_dict, self.course_codes)
+        lecturer_ids = self.intern_mapping(self.lecturers_dict, self.ugent_ids)
+        curriculum_ids = self.intern_mapping(self.curricula_dict, self.curriculum_codes)
+        site_ids = self.intern_mapping(self.sites_dict, self.site_codes)
+        room_ids = self.intern_mapping(self.class_rooms_dict, self.fi_numbers)
+
+        for code, course in self.courses_dict.items():
+            course.code = code
+            course.lecturers = [lecturer_ids[ugent_id] for ugent_id in course.lecturers]
+            course.curricula = [curriculum_ids[curriculum_code] for curriculum_code in course.curricula]
+        for ugent_id, lecturer in self.lecturers_dict.items():
+            lecturer.ugent_id = ugent_id
+        for code, curriculum in self.curricula_dict.items():
+            curriculum.code = code
+            curriculum.home_site = site_ids[curriculum.home_site]
+        for code, site in self.sites_dict.items():
+            site.code = code
+        for fi_number, room in self.class_rooms_dict.items():
+            room.fi_number = fi_number
+            room.site_id = site_ids[room.site_id]
+
+    @staticmethod
+    def intern_mapping(objects_dict, strings):
+        """
+        This function replaces the string keys of a mapping by dense integer ids, in place.
+        :param objects_dict: dictionary string id -> object
+        :param strings: empty list, that gets the string id of every integer id
+        :return: dictionary string id -> integer id
+        """
+        ids = {}
+        objects = list(objects_dict.items())
+        objects_dict.clear()
+        for string, loaded_object in objects:
+            ids[string] = len(strings)
+            objects_dict[len(strings)] = loaded_object
+            strings.append(string)
+        return ids
+
+    def get_conflict_graph(self):
+        """
+        :return: instance of ConflictGraph of all courses, built the first time it is requested
+        """
+        if self.conflict_graph is None:
+            self.conflict_graph = cg.ConflictGraph(self.courses_dict.values())
+        return self.conflict_graph
+
+    def get_curriculum_site_penalties(self):
+        """
+        :return: curriculum_code -> {site_code: (not_home, distance_penalty)}, built the first time it is requested
+        """
+        if self.curriculum_site_penalties is None:
+            sc.init_cost_tables(self)
+        return self.curriculum_site_penalties
+
+    def export_week_occupancy(self, offset):
+        """
+        This function collects the occupied time slots of every lecturer and curriculum within one week.
+        :param offset: the week
+        :return: tuple of two dictionaries, ugent_id -> set of time slots and curriculum_code -> set of time slots
+        """
+        first_time_slot = offset * self.total_course_hours
+        last_time_slot = first_time_slot + self.total_course_hours
+        lecturers_occupancy = {}
+        for ugent_id, lecturer in self.lecturers_dict.items():
+            lecturers_occupancy[ugent_id] = {time_slot for time_slot in lecturer.occupied_time_slots
+                                             if first_time_slot <= time_slot < last_time_slot}
+        curricula_occupancy = {}
+        for curriculum_code, curriculum in self.curricula_dict.items():
+            curricula_occupancy[curriculum_code] = {time_slot for time_slot in curriculum.occupied_time_slots
+                                                    if first_time_slot <= time_slot < last_time_slot}
+        return lecturers_occupancy, curricula_occupancy
+
+    def import_week_occupancy(self, offset, occupancy):
+        """
+        This function replaces the occupied time slots of one week by the ones computed in a worker process.
+        :param offset: the week
+        :param occupancy: tuple as returned by export_week_occupancy
+        """
+        first_time_slot = offset * self.total_course_hours
+        lecturers_occupancy, curricula_occupancy = occupancy
+        for objects_dict, objects_occupancy in ((self.lecturers_dict, lecturers_occupancy),
+                                                (self.curricula_dict, curricula_occupancy)):
+            for key, time_slots in objects_occupancy.items():
+                occupied_object = objects_dict[key]
+                for time_slot in range(first_time_slot, first_time_slot + self.total_course_hours):
+                    occupied_object.remove_occupied_time_slot(time_slot)
+                for time_slot in time_slots:
+                    occupied_object.add_occupied_time_slot(time_slot)
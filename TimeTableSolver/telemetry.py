@@ -0,0 +1,142 @@
+"""
+    This module holds the telemetry of the solver: counters, timers and records of the search over time.
+    Every SolverContext holds a telemetry object, the disabled one by default, so nothing is measured
+    unless Telemetry is set on the context. Hot code checks telemetry.enabled before it counts anything.
+"""
+import contextlib
+import json
+import time
+
+
+class Telemetry:
+    enabled = True
+
+    def __init__(self, path=None):
+        """
+        :param path: the path of a json lines file that gets every record and the summary at the end,
+                     None to only keep the counters and timers in memory
+        """
+        self.counters = {}
+        self.timers = {}
+        self.start_time = time.perf_counter()
+        self.file = None
+        if path is not None:
+            self.file = open(path, 'w')
+
+    def __getstate__(self):
+        # a worker process starts with empty counters and does not write records,
+        # its counters and timers are merged back with export and merge
+        return {'counters': {}, 'timers': {}, 'start_time': self.start_time, 'file': None}
+
+    def count(self, name, amount=1):
+        """
+        :param name: the name of the counter
+        :param amount: the amount that gets added to the counter
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, name, seconds):
+        """
+        :param name: the name of the timer
+        :param seconds: the amount of seconds that gets added to the timer
+        """
+        self.timers[name] = self.timers.get(name, 0) + seconds
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """
+        :param name: the name of the timer
+        :return: context manager that adds the time spent inside it to the timer
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start_time)
+
+    def record(self, name, **values):
+        """
+        Writes one line to the json lines file, with the time since the start of the telemetry.
+        :param name: the name of the record
+        :param values: the values of the record
+        """
+        if self.file is None:
+            return
+        values['record'] = name
+        values['time'] = time.perf_counter() - self.start_time
+        self.file.write(json.dumps(values) + "\n")
+
+    def export(self):
+        """
+        :return: the counters and timers, to be merged into the telemetry of another process
+        """
+        return {'counters': dict(self.counters), 'timers': dict(self.timers)}
+
+    def merge(self, exported):
+        """
+        :param exported: the result of export of another telemetry object
+        """
+        if exported is None:
+            return
+        for name, amount in exported['counters'].items():
+            self.count(name, amount)
+        for name, seconds in exported['timers'].items():
+            self.add_time(name, seconds)
+
+    def summary(self):
+        """
+        Every counter "x.y" whose prefix "x" is a timer also gets a rate "x.y per second".
+        :return: dictionary with all counters, timers and rates
+        """
+        rates = {}
+        for name, amount in self.counters.items():
+            prefix = name.split('.')[0]
+            if self.timers.get(prefix, 0) > 0:
+                rates[name + " per second"] = amount / self.timers[prefix]
+        return {'counters': dict(self.counters), 'timers': dict(self.timers), 'rates': rates}
+
+    def close(self):
+        """
+        Writes the summary as last line of the json lines file and closes it.
+        :return: the summary
+        """
+        summary = self.summary()
+        if self.file is not None:
+            self.record("summary", **summary)
+            self.file.close()
+            self.file = None
+        return summary
+
+
+class NullTelemetry:
+    """
+    Telemetry that measures nothing, all functions return immediately.
+    """
+    enabled = False
+
+    def count(self, name, amount=1):
+        pass
+
+    def add_time(self, name, seconds):
+        pass
+
+    def timer(self, name):
+        return contextlib.nullcontext()
+
+    def record(self, name, **values):
+        pass
+
+    def export(self):
+        return None
+
+    def merge(self, exported):
+        pass
+
+    def summary(self):
+        return None
+
+    def close(self):
+        return None
+
+
+disabled = NullTelemetry()
@@ -0,0 +1,31 @@
+import json
+import os
+import sys
+import pytest
+
+# the modules of the solver import each other by their plain names, like when main.py runs from its directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instance_generator  # noqa: E402
+import process_input  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def instance_path(tmp_path_factory):
+    """
+    :return: the path of a small synthetic instance, generated once for all tests
+    """
+    instance = instance_generator.generate_instance(courses=80, lecturers=60, curricula=20, sites=2, rooms_per_site=6,
+                                                    seed=7)
+    path = tmp_path_factory.mktemp("instance") / "instance.json"
+    with open(path, 'w') as f:
+        json.dump(instance, f)
+    return str(path)
+
+
+@pytest.fixture
+def context(instance_path):
+    """
+    :return: a freshly parsed SolverContext of the small instance, the tests may change it
+    """
+    return process_input.load_context(instance_path)
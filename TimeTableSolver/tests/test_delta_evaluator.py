@@ -0,0 +1,111 @@
+import random
+import pytest
+import construct_timetable as ct
+import delta_evaluator as de
+import neighborhood
+import process_input
+import soft_constraints as sc
+
+
+def build_timetable(context):
+    """
+    :return: a timetable of the first week with as many events of all types as the construction can place
+    """
+    events_1, events_2, events_3, events_4 = process_input.create_initial_events_lists(context)
+    timetable = process_input.create_initial_timetable(context)
+    unplaced_events, timetable = ct.ConstructTimeTable(events_1 + events_2 + events_3 + events_4,
+                                                       context.courses_set, timetable).construct()
+    return timetable
+
+
+def capture_caches(evaluator):
+    """
+    :return: copies of all cached contributions of the evaluator
+    """
+    return (dict(evaluator.curriculum_day_events), dict(evaluator.curriculum_day_penalty),
+            dict(evaluator.curriculum_penalty),
+            (evaluator.late_hour_penalty, evaluator.one_hour_penalty, evaluator.straight_hours_penalty,
+             evaluator.room_size_total, evaluator.amount_of_events, evaluator.not_home_penalty,
+             evaluator.distance_penalty, evaluator.total_cost))
+
+
+def without_zeros(cache):
+    return {key: value for key, value in cache.items() if value != 0}
+
+
+def random_move(timetable, evaluator, rng):
+    """
+    Applies a random swap or Kempe chain move inside a transaction and updates the evaluator.
+    :return: the difference in total cost of the evaluator, None if the move was not possible
+    """
+    if rng.random() < 0.5:
+        position_1, position_2 = neighborhood.get_random_positions(timetable)
+        timetable.begin()
+        successful = neighborhood.swap_positions(timetable, [], position_1, position_2, feasibility=True)[0]
+        if not successful:
+            timetable.rollback()
+            return None
+        return evaluator.swap_delta(position_1, position_2)
+
+    position = timetable.occupied_positions.random_choice()
+    time_slot = rng.choice([time_slot for time_slot in range(timetable.context.total_course_hours)
+                            if time_slot != position[1]])
+    chain = neighborhood.get_kempe_chain(timetable, position, time_slot)
+    timetable.begin()
+    moves = neighborhood.move_kempe_chain(timetable, chain, position[1], time_slot)
+    if moves is None:
+        timetable.rollback()
+        return None
+    return evaluator.update(moves)
+
+
+def test_incremental_cost_equals_full_evaluation(context):
+    pytest.importorskip("numpy")
+    import batch_evaluation as be
+    timetable = build_timetable(context)
+    evaluator = de.DeltaEvaluator(timetable)
+    rng = random.Random(11)
+    random.seed(11)
+
+    kept_moves = 0
+    for move in range(400):
+        old_cost = evaluator.total_cost
+        delta = random_move(timetable, evaluator, rng)
+        if delta is None:
+            continue
+        timetable.commit()
+        kept_moves += 1
+        assert evaluator.total_cost == pytest.approx(old_cost + delta, abs=1e-9)
+        assert evaluator.total_cost == pytest.approx(sc.return_total_penalty_of_timetable(timetable), abs=1e-6)
+        assert evaluator.total_cost == pytest.approx(be.return_total_penalty_of_timetable(timetable), abs=1e-6)
+    assert kept_moves > 50
+
+    # the caches that were updated move by move hold the same contributions as after a full evaluation
+    caches = capture_caches(evaluator)
+    evaluator.resync()
+    resynced = capture_caches(evaluator)
+    for cache, resynced_cache in zip(caches[:3], resynced[:3]):
+        assert without_zeros(cache) == without_zeros(resynced_cache)
+    assert caches[3] == pytest.approx(resynced[3], abs=1e-6)
+
+
+def test_revert_restores_every_cache(context):
+    timetable = build_timetable(context)
+    evaluator = de.DeltaEvaluator(timetable)
+    rng = random.Random(12)
+    random.seed(12)
+
+    reverted_moves = 0
+    for move in range(400):
+        before = capture_caches(evaluator)
+        if random_move(timetable, evaluator, rng) is None:
+            continue
+        if rng.random() < 0.5:
+            timetable.commit()
+            continue
+        timetable.rollback()
+        evaluator.revert()
+        reverted_moves += 1
+        assert capture_caches(evaluator) == before
+    assert reverted_moves > 25
+    assert evaluator.total_cost == pytest.approx(sc.return_total_penalty_of_timetable(timetable), abs=1e-6)
@@ -0,0 +1,87 @@
+import os
+import random
+import struct
+import instance_cache
+import process_input
+
+
+def object_fields(item):
+    """
+    :return: the values of all attributes of a data object, the class rooms of a site by their fi_number
+    """
+    fields = {}
+    for name in type(item).__slots__:
+        value = getattr(item, name)
+        if name == "class_rooms":
+            value = [room.fi_number for room in value]
+        fields[name] = value
+    return fields
+
+
+def context_fields(context):
+    """
+    :return: all parsed values of a context, as plain values that can be compared
+    """
+    fields = {name: getattr(context, name) for name in
+              ("academy_year", "semester", "kilometer_penalty", "late_hour_penalty", "not_home_penalty",
+               "min_amount_students", "biggest_room_capacity", "total_course_hours", "weeks", "courses_set",
+               "course_codes", "ugent_ids", "curriculum_codes", "site_codes", "fi_numbers")}
+    for name in ("courses_dict", "lecturers_dict", "curricula_dict", "sites_dict", "class_rooms_dict"):
+        mapping = getattr(context, name)
+        fields[name] = {key: object_fields(item) for key, item in mapping.items()}
+        fields[name + " order"] = list(mapping)
+    return fields
+
+
+def events_lists_fields(context):
+    random.seed(0)
+    return [[object_fields(course_event) for course_event in events]
+            for events in process_input.create_initial_events_lists(context)]
+
+
+def cache_path(cache_directory):
+    files = [name for name in os.listdir(cache_directory) if name.endswith(".bin")]
+    assert len(files) == 1
+    return os.path.join(cache_directory, files[0])
+
+
+def test_cache_round_trip(instance_path, tmp_path):
+    parsed = process_input.load_context(instance_path)
+    first = instance_cache.load_context(instance_path, str(tmp_path))
+    path = cache_path(str(tmp_path))
+    cached = instance_cache.read_instance(path)
+    assert cached is not None
+
+    assert context_fields(first) == context_fields(parsed)
+    assert context_fields(cached) == context_fields(parsed)
+    assert context_fields(instance_cache.load_context(instance_path, str(tmp_path))) == context_fields(parsed)
+    assert events_lists_fields(cached) == events_lists_fields(parsed)
+
+
+def corrupt_cache(path, offset, data):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def test_wrong_magic_number_falls_back_to_the_json_file(instance_path, tmp_path):
+    parsed = process_input.load_context(instance_path)
+    instance_cache.load_context(instance_path, str(tmp_path))
+    path = cache_path(str(tmp_path))
+    corrupt_cache(path, 0, b"XXXX")
+    assert instance_cache.read_instance(path) is None
+
+    assert context_fields(instance_cache.load_context(instance_path, str(tmp_path))) == context_fields(parsed)
+    # the cache is written again after parsing the json file
+    assert instance_cache.read_instance(path) is not None
+
+
+def test_wrong_version_falls_back_to_the_json_file(instance_path, tmp_path):
+    parsed = process_input.load_context(instance_path)
+    instance_cache.load_context(instance_path, str(tmp_path))
+    path = cache_path(str(tmp_path))
+    corrupt_cache(path, 4, struct.pack('<I', instance_cache.version + 1))
+    assert instance_cache.read_instance(path) is None
+
+    assert context_fields(instance_cache.load_context(instance_path, str(tmp_path))) == context_fields(parsed)
+    assert instance_cache.read_instance(path) is not None
@@ -0,0 +1,56 @@
+import itertools
+import random
+import room_assignment as ra
+
+
+def brute_force_cost(costs):
+    """
+    :return: the lowest total cost of all assignments of the rows to different columns
+    """
+    return min(sum(row[column] for row, column in zip(costs, columns))
+               for columns in itertools.permutations(range(len(costs[0])), len(costs)))
+
+
+def random_costs(rng, rows, columns, infeasible_probability):
+    costs = []
+    for row in range(rows):
+        costs.append([ra.infeasible_cost if rng.random() < infeasible_probability else rng.choice([0, 1, 2.5, 7])
+                      + rng.random() for column in range(columns)])
+    return costs
+
+
+def assert_optimal(costs):
+    assignment = ra.hungarian(costs)
+    assert len(assignment) == len(costs)
+    assert len(set(assignment)) == len(assignment)
+    assert all(0 <= column < len(costs[0]) for column in assignment)
+    total = sum(row[column] for row, column in zip(costs, assignment))
+    assert abs(total - brute_force_cost(costs)) <= 1e-9 * max(1.0, total)
+
+
+def test_hungarian_matches_brute_force():
+    rng = random.Random(0)
+    for test in range(3000):
+        rows = rng.randint(1, 5)
+        columns = rng.randint(rows, 6)
+        assert_optimal(random_costs(rng, rows, columns, 0.0))
+
+
+def test_hungarian_with_infeasible_columns():
+    rng = random.Random(1)
+    for test in range(1000):
+        rows = rng.randint(1, 5)
+        columns = rng.randint(rows, 6)
+        assert_optimal(random_costs(rng, rows, columns, 0.4))
+
+
+def test_hungarian_avoids_an_infeasible_column_when_possible():
+    # the first row only fits in the last column, which the second row prefers
+    costs = [[ra.infeasible_cost, ra.infeasible_cost, 5.0],
+             [3.0, 4.0, 0.0]]
+    assert ra.hungarian(costs) == [2, 0]
+
+
+def test_hungarian_with_ties():
+    costs = [[1.0, 1.0, 1.0], [1.0, 1.0, 1.0], [1.0, 1.0, 1.0]]
+    assert sorted(ra.hungarian(costs)) == [0, 1, 2]
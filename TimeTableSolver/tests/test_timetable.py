@@ -0,0 +1,123 @@
+import random
+import pytest
+import construct_timetable as ct
+import hard_constraints as hc
+import process_input
+
+
+def capture_state(timetable):
+    """
+    :return: everything that a transaction of the timetable can change, as plain values
+    """
+    context = timetable.context
+    indexes = (timetable.occupied_by_time_slot, timetable.empty_by_time_slot,
+               timetable.occupied_by_room, timetable.empty_by_room)
+    return {'events': dict(timetable.timetable.items()),
+            'lecturers': dict(timetable.lecturers.items()),
+            'occupied_positions': set(timetable.occupied_positions),
+            'indexes': [{key: set(positions) for key, positions in index.items()} for index in indexes],
+            'free_rooms': {time_slot: list(rooms) for time_slot, rooms in timetable.free_rooms.free_rooms.items()},
+            'lecturer_masks': {ugent_id: (lecturer.occupied_mask, set(lecturer.occupied_time_slots))
+                               for ugent_id, lecturer in context.lecturers_dict.items()},
+            'curriculum_masks': {code: (curriculum.occupied_mask, set(curriculum.occupied_time_slots))
+                                 for code, curriculum in context.curricula_dict.items()},
+            'course_hours': {code: course.course_hours for code, course in context.courses_dict.items()}}
+
+
+def build_timetable(context, grid=False):
+    """
+    :return: the timetable of the first week with the events of type 1 constructed, and the other events
+    """
+    events_1, events_2, events_3, events_4 = process_input.create_initial_events_lists(context)
+    timetable = process_input.create_initial_timetable(context, grid)
+    unplaced_events, timetable = ct.ConstructTimeTable(events_1, context.courses_set, timetable).construct()
+    return timetable, events_2 + events_3 + events_4 + unplaced_events
+
+
+def apply_random_changes(timetable, events, rng, amount):
+    """
+    Assigns, removes and moves events to other rooms in random order, without breaking a hard constraint.
+    :return: the amount of changes of every kind
+    """
+    context = timetable.context
+    counts = {'assign': 0, 'remove': 0, 'move': 0}
+    for change in range(amount):
+        kind = rng.choice(sorted(counts))
+        if kind == 'assign':
+            course_event = rng.choice(events)
+            position = rng.choice(list(timetable.positions))
+            room = context.class_rooms_dict[position[0]]
+            if timetable.timetable[position] is not None or not hc.room_capacity_constraint(course_event, room) \
+                    or not hc.course_event_fits_into_time_slot(context, course_event,
+                                                               position[1] + 40 * timetable.offset):
+                continue
+            timetable.assign_course_to_position(course_event, position)
+        elif kind == 'remove':
+            if len(timetable.occupied_positions) == 0:
+                continue
+            timetable.remove_course_from_position(timetable.occupied_positions.random_choice())
+        else:
+            time_slots = [time_slot for time_slot, positions in timetable.occupied_by_time_slot.items()
+                          if len(positions) > 0]
+            if len(time_slots) == 0:
+                continue
+            time_slot = rng.choice(time_slots)
+            occupied = list(timetable.occupied_by_time_slot[time_slot])
+            # the events of the time slot exchange their rooms, one of them may also go to an empty room
+            rooms = [fi_number for fi_number, ts in occupied]
+            rooms += [fi_number for fi_number, ts in list(timetable.empty_by_time_slot[time_slot])[:1]]
+            rng.shuffle(rooms)
+            timetable.move_courses_to_rooms([(position, fi_number) for position, fi_number in zip(occupied, rooms)])
+        counts[kind] += 1
+    return counts
+
+
+@pytest.mark.parametrize("grid", [False, True])
+def test_rollback_restores_everything(context, grid):
+    if grid:
+        pytest.importorskip("numpy")
+    timetable, events = build_timetable(context, grid)
+    before = capture_state(timetable)
+    rng = random.Random(3)
+
+    timetable.begin()
+    counts = apply_random_changes(timetable, events, rng, 300)
+    assert all(count > 0 for count in counts.values())
+    assert capture_state(timetable) != before
+    timetable.rollback()
+
+    assert timetable.undo_log is None
+    assert capture_state(timetable) == before
+
+
+def test_commit_keeps_the_changes(context):
+    timetable, events = build_timetable(context)
+    rng = random.Random(4)
+
+    timetable.begin()
+    apply_random_changes(timetable, events, rng, 100)
+    after = capture_state(timetable)
+    timetable.commit()
+    timetable.rollback()
+
+    assert capture_state(timetable) == after
+
+
+def test_rollback_in_a_week_leaves_the_other_weeks_alone(context):
+    timetable, events = build_timetable(context)
+    week, other_week = timetable.create_weeks([1, 2])
+    before = capture_state(week)
+    before_timetable = capture_state(timetable)
+    before_other_week = capture_state(other_week)
+    rng = random.Random(5)
+
+    week.begin()
+    apply_random_changes(week, events, rng, 300)
+    # the indexes are shared copy-on-write, changing a week must not change the timetables it shares them with
+    assert capture_state(timetable)['indexes'] == before_timetable['indexes']
+    assert capture_state(other_week)['free_rooms'] == before_other_week['free_rooms']
+    week.rollback()
+
+    assert capture_state(week) == before
+    assert capture_state(timetable) == before_timetable
+    assert capture_state(other_week) == before_other_week
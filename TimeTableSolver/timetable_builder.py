@@ -1,13 +1,46 @@
 import construct_timetable as ct
+import coloring_construction as cc
 import feasible_timetable as ft
+import contextlib
 import copy
 import time
 import random
 import improve_time_table as it
+import parallel_tempering as pt
+import room_assignment as ra
+
+# seconds for every sub problem of a phase, when the build has no time limit, None if the phase runs until it is done
+default_time_limits = {"construction": None, "tabu search": 120, "improvement": 60, "rooms": None}
+# the classes that can construct the initial timetables, they all have the interface of ConstructTimeTable
+construction_engines = {"greedy": ct.ConstructTimeTable, "coloring": cc.ColoringConstruction}
+# the time left until the deadline is divided over the phases that still have to run, in these proportions
+phase_weights = [("construction 1", 3), ("tabu search 1", 4), ("improvement 1", 4), ("rooms 1", 1),
+                 ("construction 2", 1), ("tabu search 2", 2), ("construction 3", 1), ("tabu search 3", 2),
+                 ("construction 4", 1), ("tabu search 4", 3), ("rooms 4", 1),
+                 ("construction 13", 1), ("tabu search 13", 1), ("rooms 13", 1)]
 
 
 class TimeTableBuilder:
-    def __init__(self, timetable, events_1, events_2, events_3, events_4, courses_set, start_time):
+    def __init__(self, context, timetable, events_1, events_2, events_3, events_4, courses_set, start_time,
+                 workers=None, phase_recorder=None, time_limit=None, replicas=None, exchange_states=True,
+                 optimise_rooms=True, construction="greedy"):
+        """
+        :param context: instance of SolverContext
+        :param workers: the amount of worker processes used to solve sibling sub problems in parallel,
+                        None to solve them one after the other
+        :param phase_recorder: object with a method phase(name) that returns a context manager,
+                               used to measure every phase of the build, None to measure nothing
+        :param time_limit: the amount of seconds the whole build may take, measured from now,
+                           None to give every sub problem the default time of its phase
+        :param replicas: the amount of simulated annealing replicas that run in the worker processes during the
+                         improvement phase, None to run one chain in this process
+        :param exchange_states: True to exchange states between the replicas (parallel tempering),
+                                False to run them as independent restarts
+        :param optimise_rooms: True to assign the rooms of every time slot optimally after the improvement phase
+                               and in every week timetable once all its events are placed
+        :param construction: the engine that constructs the initial timetables, one of construction_engines
+        """
+        self.context = context
         self.timetable = timetable
         self.events_1 = events_1
         self.events_2 = events_2
@@ -18,228 +51,135 @@ class TimeTableBuilder:
         random.shuffle(events_4)
         self.courses_set = courses_set
         self.start_time = start_time
+        self.workers = workers
+        self.executor = None
+        self.phase_recorder = phase_recorder
+        self.unplaced_counts = {}  # type of the events -> amount of events that could not be placed
+        self.replicas = replicas
+        self.exchange_states = exchange_states
+        self.optimise_rooms = optimise_rooms
+        self.construction_engine = construction_engines[construction]
+        # the room phases that do not run get no share of the time
+        self.phase_weights = [(name, weight) for name, weight in phase_weights
+                              if optimise_rooms or not name.startswith("rooms")]
+        self.deadline = None
+        if time_limit is not None:
+            self.deadline = time.monotonic() + time_limit
 
     def build_timetable(self):
-        timetable_13 = copy.deepcopy(self.timetable)  # empty timetable which will be used to represent the last week
+        if self.workers is not None and self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                self.executor = executor
+                try:
+                    return self.build_all_weeks()
+                finally:
+                    self.executor = None
+        return self.build_all_weeks()
+
+    def phase(self, name):
+        """
+        :param name: the name of a phase of the build
+        :return: context manager that measures the phase with the phase recorder
+        """
+        if self.phase_recorder is None:
+            return contextlib.nullcontext()
+        return self.phase_recorder.phase(name)
+
+    def get_phase_time(self, phase, sub_problems=1):
+        """
+        This function computes the amount of seconds for a phase, the share of the phase in the time left.
+        Because the time left is measured when the phase starts, the time that earlier phases did not use
+        goes to the phases that still have to run.
+        :param phase: the name of the phase, one of phase_weights
+        :param sub_problems: the amount of sub problems in the phase
+        :return: the amount of seconds for all sub problems of the phase together, None for no limit
+        """
+        return self.get_phase_times([phase], sub_problems)[0]
+
+    def get_phase_times(self, phases, sub_problems=1):
+        """
+        Same as get_phase_time, for consecutive phases that start at the same moment.
+        :param phases: list of names of phases, in the order of phase_weights
+        :param sub_problems: the amount of sub problems in each phase
+        :return: list with the amount of seconds of every phase, None for no limit
+        """
+        if self.deadline is None:
+            phase_times = []
+            for phase in phases:
+                default_time_limit = default_time_limits[phase.rsplit(" ", 1)[0]]
+                phase_times.append(None if default_time_limit is None else default_time_limit * sub_problems)
+            return phase_times
+        phase_names = [name for name, weight in self.phase_weights]
+        remaining_weights = sum(weight for name, weight in self.phase_weights[phase_names.index(phases[0]):])
+        time_left = max(0.0, self.deadline - time.monotonic())
+        weights = dict(self.phase_weights)
+        return [time_left * weights[phase] / remaining_weights for phase in phases]
+
+    @staticmethod
+    def share_phase_time(phase_time, sub_problems):
+        """
+        Every sub problem gets an equal share of the time left, so a sub problem that finishes early
+        leaves its time to the sub problems after it.
+        :param phase_time: the amount of seconds for all sub problems together, None for no limit
+        :param sub_problems: the amount of sub problems
+        :return: generator of the amount of seconds of every sub problem, computed when the sub problem starts
+        """
+        if phase_time is None:
+            for index in range(sub_problems):
+                yield None
+            return
+        phase_deadline = time.monotonic() + phase_time
+        for index in range(sub_problems):
+            yield max(0.0, phase_deadline - time.monotonic()) / (sub_problems - index)
+
+    def build_all_weeks(self):
+        # empty timetable which will be used to represent the last week
+        timetable_13 = self.timetable.create_weeks([12])[0]
         # events type 1
         print("Starting initial construction of timetable type 1.  " + str(time.perf_counter() - self.start_time))
-        construct_timetable = ct.ConstructTimeTable(events_list=self.events_1,
-                                                    courses_set=self.courses_set,
-                                                    timetable=self.timetable)
-        events_1, timetable = construct_timetable.construct()
+        with self.phase("construction 1"):
+            construct_timetable = self.construction_engine(events_list=self.events_1,
+                                                           courses_set=self.courses_set,
+                                                           timetable=self.timetable)
+            events_1, timetable = construct_timetable.construct(self.get_phase_time("construction 1"))
         print("Initial construction of timetable type 1 is finished.  " + str(time.perf_counter() - self.start_time))
         print("Starting tabu search on timetable type 1.  " + str(time.perf_counter() - self.start_time))
-        feasible_timetable = ft.FeasibleTimetable(events=events_1,
-                                                  timetable=timetable)
-        events_1, timetable = feasible_timetable.tabu_search()
+        with self.phase("tabu search 1"):
+            feasible_timetable = ft.FeasibleTimetable(events=events_1,
+                                                      timetable=timetable)
+            events_1, timetable = feasible_timetable.tabu_search(self.get_phase_time("tabu search 1"))
+        self.unplaced_counts[1] = len(events_1)
         print("Tabu search on timetable type 1 is finished.  " + str(time.perf_counter() - self.start_time))
 
         print("Starting the improvement on timetable type 1.  " + str(time.perf_counter() - self.start_time))
-        improve_tt_1 = it.ImproveTimeTable(timetable)
-        total_score, timetable = improve_tt_1.improve()
+        with self.phase("improvement 1"):
+            if self.executor is not None and self.replicas is not None:
+                improve_tt_1 = pt.ParallelTempering(timetable=timetable,
+                                                    executor=self.executor,
+                                                    replicas=self.replicas,
+                                                    exchange_states=self.exchange_states)
+            else:
+                improve_tt_1 = it.ImproveTimeTable(timetable)
+            total_score, timetable = improve_tt_1.improve(self.get_phase_time("improvement 1"))
+        if self.optimise_rooms:
+            self.optimise_rooms_of_timetables(1, [timetable])
         print("Improvement phase on timetable type 1 is finished.  " + str(time.perf_counter() - self.start_time))
 
-        # events type 2, split original timetable into two
-        print("Starting initial construction of timetable type 2.  " + str(time.perf_counter() - self.start_time))
-        events_2 = list(self.split(self.events_2, 2))
-        events_2a = events_2[0]
-        events_2b = events_2[1]
-
-        timetable_2a = timetable  # starts at week 0 -> offset = 0
-        timetable_2b = copy.deepcopy(timetable)  # starts at week 6 -> offset = 6
-        timetable_2b.update_offset(6)
-
-        construct_timetable_2a = ct.ConstructTimeTable(events_list=events_2a,
-                                                       courses_set=self.courses_set,
-                                                       timetable=timetable_2a)
-        construct_timetable_2b = ct.ConstructTimeTable(events_list=events_2b,
-                                                       courses_set=self.courses_set,
-                                                       timetable=timetable_2b)
-        events_2a, timetable_2a = construct_timetable_2a.construct()
-        events_2b, timetable_2b = construct_timetable_2b.construct()
-        print("Initial construction of timetable type 2 is finished.  " + str(time.perf_counter() - self.start_time))
-        print("Starting tabu search on timetable type 2.  " + str(time.perf_counter() - self.start_time))
-        feasible_timetable_2a = ft.FeasibleTimetable(events=events_2a,
-                                                     timetable=timetable_2a)
-        feasible_timetable_2b = ft.FeasibleTimetable(events=events_2b,
-                                                     timetable=timetable_2b)
-        events_2a, timetable_2a = feasible_timetable_2a.tabu_search()  # first 6 weeks
-        events_2b, timetable_2b = feasible_timetable_2b.tabu_search()  # second 6 weeks
-        print("Tabu search on timetable type 2 is finished.  " + str(time.perf_counter() - self.start_time))
-
-        # events type 3
-        print("Starting initial construction of timetable type 3.  " + str(time.perf_counter() - self.start_time))
-        timetable_3a = timetable_2a  # starts at week 0 -> offset = 0
-        timetable_3b = copy.deepcopy(timetable_2a)  # starts at week 3 -> offset = 3
-        timetable_3b.update_offset(3)
-        timetable_3c = timetable_2b  # starts at week 6 -> offset = 6
-        timetable_3d = copy.deepcopy(timetable_2b)  # starts at week 9 -> offset = 9
-        timetable_3d.update_offset(9)
-
-        events_3 = list(self.split(self.events_3, 4))
-        events_3a = events_3[0]
-        events_3b = events_3[1]
-        events_3c = events_3[2]
-        events_3d = events_3[3]
-
-        ct_3a = ct.ConstructTimeTable(events_list=events_3a,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_3a)
-        ct_3b = ct.ConstructTimeTable(events_list=events_3b,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_3b)
-        ct_3c = ct.ConstructTimeTable(events_list=events_3c,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_3c)
-        ct_3d = ct.ConstructTimeTable(events_list=events_3d,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_3d)
-        events_3a, timetable_3a = ct_3a.construct()
-        events_3b, timetable_3b = ct_3b.construct()
-        events_3c, timetable_3c = ct_3c.construct()
-        events_3d, timetable_3d = ct_3d.construct()
-        print("Initial construction of timetable type 3 is finished.  " + str(time.perf_counter() - self.start_time))
-        print("Starting tabu search on timetable type 3.  " + str(time.perf_counter() - self.start_time))
-        ft_3a = ft.FeasibleTimetable(events=events_3a,
-                                     timetable=timetable_3a)
-        ft_3b = ft.FeasibleTimetable(events=events_3b,
-                                     timetable=timetable_3b)
-        ft_3c = ft.FeasibleTimetable(events=events_3c,
-                                     timetable=timetable_3c)
-        ft_3d = ft.FeasibleTimetable(events=events_3d,
-                                     timetable=timetable_3d)
-        events_3a, timetable_3a = ft_3a.tabu_search()
-        events_3b, timetable_3b = ft_3b.tabu_search()
-        events_3c, timetable_3c = ft_3c.tabu_search()
-        events_3d, timetable_3d = ft_3d.tabu_search()
-        print("Tabu search on timetable type 3 is finished.  " + str(time.perf_counter() - self.start_time))
-
-        # events type 4
-        print("Starting initial construction of timetable type 4.  " + str(time.perf_counter() - self.start_time))
-        timetable_4a = timetable_3a  # starts at week 0 -> offset = 0
-        timetable_4b = copy.deepcopy(timetable_3a)  # starts at week 1 -> offset = 1
-        timetable_4b.update_offset(1)
-        timetable_4c = copy.deepcopy(timetable_3a)  # starts at week 2 -> offset = 2
-        timetable_4b.update_offset(2)
-        timetable_4d = timetable_3b  # starts at week 3 -> offset = 3
-        timetable_4e = copy.deepcopy(timetable_3b)  # starts at week 4 -> offset = 4
-        timetable_4e.update_offset(4)
-        timetable_4f = copy.deepcopy(timetable_3b)  # starts at week 5 -> offset = 5
-        timetable_4f.update_offset(5)
-        timetable_4g = timetable_3c  # starts at week 6 -> offset = 6
-        timetable_4h = copy.deepcopy(timetable_3c)  # starts at week 7 -> offset = 7
-        timetable_4h.update_offset(7)
-        timetable_4i = copy.deepcopy(timetable_3c)  # starts at week 8 -> offset = 8
-        timetable_4i.update_offset(8)
-        timetable_4j = timetable_3d  # starts at week 9 -> offset = 9
-        timetable_4k = copy.deepcopy(timetable_3d)  # starts at week 10 -> offset = 10
-        timetable_4k.update_offset(10)
-        timetable_4l = copy.deepcopy(timetable_3d)  # starts at week 11 -> offset = 11
-        timetable_4l.update_offset(11)
-
-        events_4 = list(self.split(self.events_4, 12))
-        events_4a = events_4[0]
-        events_4b = events_4[1]
-        events_4c = events_4[2]
-        events_4d = events_4[3]
-        events_4e = events_4[4]
-        events_4f = events_4[5]
-        events_4g = events_4[6]
-        events_4h = events_4[7]
-        events_4i = events_4[8]
-        events_4j = events_4[9]
-        events_4k = events_4[10]
-        events_4l = events_4[11]
+        # events type 2, split original timetable into two: week 0 and week 6
+        timetables_2 = self.split_timetables([timetable], 12, 2)
+        events_2 = self.solve_sub_problems(2, list(self.split(self.events_2, 2)), timetables_2)
 
-        ct_4a = ct.ConstructTimeTable(events_list=events_4a,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4a)
-        ct_4b = ct.ConstructTimeTable(events_list=events_4b,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4b)
-        ct_4c = ct.ConstructTimeTable(events_list=events_4c,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4c)
-        ct_4d = ct.ConstructTimeTable(events_list=events_4d,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4d)
-        ct_4e = ct.ConstructTimeTable(events_list=events_4e,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4e)
-        ct_4f = ct.ConstructTimeTable(events_list=events_4f,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4f)
-        ct_4g = ct.ConstructTimeTable(events_list=events_4g,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4g)
-        ct_4h = ct.ConstructTimeTable(events_list=events_4h,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4h)
-        ct_4i = ct.ConstructTimeTable(events_list=events_4i,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4i)
-        ct_4j = ct.ConstructTimeTable(events_list=events_4j,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4j)
-        ct_4k = ct.ConstructTimeTable(events_list=events_4k,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4k)
-        ct_4l = ct.ConstructTimeTable(events_list=events_4l,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_4l)
+        # events type 3, split every timetable of type 2 into two: weeks 0, 3, 6 and 9
+        timetables_3 = self.split_timetables(timetables_2, 6, 2)
+        events_3 = self.solve_sub_problems(3, list(self.split(self.events_3, 4)), timetables_3)
 
-        events_4a, timetable_4a = ct_4a.construct()
-        events_4b, timetable_4b = ct_4b.construct()
-        events_4c, timetable_4c = ct_4c.construct()
-        events_4d, timetable_4d = ct_4d.construct()
-        events_4e, timetable_4e = ct_4e.construct()
-        events_4f, timetable_4f = ct_4f.construct()
-        events_4g, timetable_4g = ct_4g.construct()
-        events_4h, timetable_4h = ct_4h.construct()
-        events_4i, timetable_4j = ct_4i.construct()
-        events_4j, timetable_4i = ct_4j.construct()
-        events_4k, timetable_4k = ct_4k.construct()
-        events_4l, timetable_4l = ct_4l.construct()
-        print("Initial construction of timetable type 4 is finished.  " + str(time.perf_counter() - self.start_time))
-        print("Starting tabu search on timetable type 4.  " + str(time.perf_counter() - self.start_time))
-        ft_4a = ft.FeasibleTimetable(events=events_4a,
-                                     timetable=timetable_4a)
-        ft_4b = ft.FeasibleTimetable(events=events_4b,
-                                     timetable=timetable_4b)
-        ft_4c = ft.FeasibleTimetable(events=events_4c,
-                                     timetable=timetable_4c)
-        ft_4d = ft.FeasibleTimetable(events=events_4d,
-                                     timetable=timetable_4d)
-        ft_4e = ft.FeasibleTimetable(events=events_4e,
-                                     timetable=timetable_4e)
-        ft_4f = ft.FeasibleTimetable(events=events_4f,
-                                     timetable=timetable_4f)
-        ft_4g = ft.FeasibleTimetable(events=events_4g,
-                                     timetable=timetable_4g)
-        ft_4h = ft.FeasibleTimetable(events=events_4h,
-                                     timetable=timetable_4h)
-        ft_4i = ft.FeasibleTimetable(events=events_4i,
-                                     timetable=timetable_4i)
-        ft_4j = ft.FeasibleTimetable(events=events_4j,
-                                     timetable=timetable_4j)
-        ft_4k = ft.FeasibleTimetable(events=events_4k,
-                                     timetable=timetable_4k)
-        ft_4l = ft.FeasibleTimetable(events=events_4l,
-                                     timetable=timetable_4l)
-
-        events_4a, timetable_4a = ft_4a.tabu_search()
-        events_4b, timetable_4b = ft_4b.tabu_search()
-        events_4c, timetable_4c = ft_4c.tabu_search()
-        events_4d, timetable_4d = ft_4d.tabu_search()
-        events_4e, timetable_4e = ft_4e.tabu_search()
-        events_4f, timetable_4f = ft_4f.tabu_search()
-        events_4g, timetable_4g = ft_4g.tabu_search()
-        events_4h, timetable_4h = ft_4h.tabu_search()
-        events_4i, timetable_4j = ft_4i.tabu_search()
-        events_4j, timetable_4i = ft_4j.tabu_search()
-        events_4k, timetable_4k = ft_4k.tabu_search()
-        events_4l, timetable_4l = ft_4l.tabu_search()
-        print("Tabu search on timetable type 4 is finished.  " + str(time.perf_counter() - self.start_time))
+        # events type 4, split every timetable of type 3 into three: one timetable for every week
+        timetables_4 = self.split_timetables(timetables_3, 3, 3)
+        events_4 = self.solve_sub_problems(4, list(self.split(self.events_4, 12)), timetables_4)
+        if self.optimise_rooms and self.executor is None:
+            # in parallel the workers already optimised the rooms of their week
+            self.optimise_rooms_of_timetables(4, timetables_4)
 
         # fixing unplaced events
         # type 1
@@ -248,46 +188,196 @@ class TimeTableBuilder:
             unplaced_events += copy.deepcopy(events_1)
         # type 2
         for i in range(6):
-            unplaced_events += copy.deepcopy(events_2a) + copy.deepcopy(events_2b)
+            for events in events_2:
+                unplaced_events += copy.deepcopy(events)
         # type 3
         for i in range(3):
-            unplaced_events += copy.deepcopy(events_3a) + copy.deepcopy(events_3b) \
-                               + copy.deepcopy(events_3c) + copy.deepcopy(events_3d)
+            for events in events_3:
+                unplaced_events += copy.deepcopy(events)
         # type 4
-        unplaced_events += copy.deepcopy(events_4a) + copy.deepcopy(events_4b) \
-                           + copy.deepcopy(events_4c) + copy.deepcopy(events_4d) \
-                           + copy.deepcopy(events_4e) + copy.deepcopy(events_4f)
-        unplaced_events += copy.deepcopy(events_4g) + copy.deepcopy(events_4h) \
-                           + copy.deepcopy(events_4i) + copy.deepcopy(events_4j) \
-                           + copy.deepcopy(events_4k) + copy.deepcopy(events_4l)
+        for events in events_4:
+            unplaced_events += copy.deepcopy(events)
 
         print("unplaced: " + str(len(unplaced_events)))
-        timetable_13.update_offset(12)
         random.shuffle(unplaced_events)
-        ct_13 = ct.ConstructTimeTable(events_list=unplaced_events,
-                                      courses_set=self.courses_set,
-                                      timetable=timetable_13)
-        events_13, timetable_13 = ct_13.construct()
-        ft_13 = ft.FeasibleTimetable(events=events_13,
-                                     timetable=timetable_13)
-        events_13, timetable_13 = ft_13.tabu_search()
+        with self.phase("construction 13"):
+            ct_13 = self.construction_engine(events_list=unplaced_events,
+                                             courses_set=self.courses_set,
+                                             timetable=timetable_13)
+            events_13, timetable_13 = ct_13.construct(self.get_phase_time("construction 13"))
+        with self.phase("tabu search 13"):
+            ft_13 = ft.FeasibleTimetable(events=events_13,
+                                         timetable=timetable_13)
+            events_13, timetable_13 = ft_13.tabu_search(self.get_phase_time("tabu search 13"))
+        self.unplaced_counts[13] = len(events_13)
+        if self.optimise_rooms:
+            self.optimise_rooms_of_timetables(13, [timetable_13])
         print(len(events_13))
 
-        return [(timetable_4a, [1]),
-                (timetable_4b, [2]),
-                (timetable_4c, [3]),
-                (timetable_4d, [4]),
-                (timetable_4e, [5]),
-                (timetable_4f, [6]),
-                (timetable_4g, [7]),
-                (timetable_4h, [8]),
-                (timetable_4i, [9]),
-                (timetable_4j, [10]),
-                (timetable_4k, [11]),
-                (timetable_4l, [12]),
-                (timetable_13, [13])]
+        weeks = [(timetable_4, [week + 1]) for week, timetable_4 in enumerate(timetables_4)]
+        weeks.append((timetable_13, [13]))
+        return weeks
+
+    @staticmethod
+    def split_timetables(timetables, weeks_per_timetable, parts):
+        """
+        Every timetable is split into a number of timetables, each one starting at a later week.
+        The first part keeps the original timetable, the other parts are weeks on top of it with a new offset.
+        :param timetables: list of instances of TimeTable
+        :param weeks_per_timetable: the amount of weeks that every given timetable represents
+        :param parts: the amount of parts every timetable gets split into
+        :return: list of instances of TimeTable, sorted by offset
+        """
+        new_timetables = []
+        for timetable in timetables:
+            new_timetables.append(timetable)
+            new_timetables += timetable.create_weeks([timetable.offset + part * weeks_per_timetable // parts
+                                                      for part in range(1, parts)])
+        return new_timetables
+
+    def solve_sub_problems(self, type_number, events_lists, timetables):
+        """
+        This function constructs and repairs sibling sub problems, which are independent of each other
+        because every timetable represents a different week.
+        The given list of timetables gets updated with the results.
+        :param type_number: the type of the events, only used for printing
+        :param events_lists: list of lists of course events, one list for every timetable
+        :param timetables: list of instances of TimeTable
+        :return: list of lists of the events that could not be placed
+        """
+        if self.executor is not None:
+            return self.solve_sub_problems_parallel(type_number, events_lists, timetables)
+
+        print("Starting initial construction of timetable type " + str(type_number) + ".  "
+              + str(time.perf_counter() - self.start_time))
+        unplaced_events_lists = []
+        with self.phase("construction " + str(type_number)):
+            max_times = self.share_phase_time(self.get_phase_time("construction " + str(type_number),
+                                                                  len(events_lists)), len(events_lists))
+            for index, (events, max_time) in enumerate(zip(events_lists, max_times)):
+                construct_timetable = self.construction_engine(events_list=events,
+                                                               courses_set=self.courses_set,
+                                                               timetable=timetables[index])
+                unplaced_events, timetables[index] = construct_timetable.construct(max_time)
+                unplaced_events_lists.append(unplaced_events)
+        print("Initial construction of timetable type " + str(type_number) + " is finished.  "
+              + str(time.perf_counter() - self.start_time))
+
+        print("Starting tabu search on timetable type " + str(type_number) + ".  "
+              + str(time.perf_counter() - self.start_time))
+        with self.phase("tabu search " + str(type_number)):
+            max_times = self.share_phase_time(self.get_phase_time("tabu search " + str(type_number),
+                                                                  len(unplaced_events_lists)),
+                                              len(unplaced_events_lists))
+            for index, (events, max_time) in enumerate(zip(unplaced_events_lists, max_times)):
+                feasible_timetable = ft.FeasibleTimetable(events=events,
+                                                          timetable=timetables[index])
+                unplaced_events_lists[index], timetables[index] = feasible_timetable.tabu_search(max_time)
+        self.unplaced_counts[type_number] = sum(len(events) for events in unplaced_events_lists)
+        print("Tabu search on timetable type " + str(type_number) + " is finished.  "
+              + str(time.perf_counter() - self.start_time))
+        return unplaced_events_lists
+
+    def solve_sub_problems_parallel(self, type_number, events_lists, timetables):
+        """
+        Same as solve_sub_problems, but every sub problem is sent to the process pool. Pickling the timetable
+        gives every worker its own copy of the context, the occupied time slots of each week and the course hours
+        get merged back into the context of this process afterwards.
+        The sub problems run at the same time, so with a time limit each one gets the time of the phases divided
+        by the amount of rounds the workers need. Time that is not used goes to the phases after this one.
+        Without a time limit each sub problem gets the default time of every phase.
+        """
+        print("Starting construction and tabu search on timetable type " + str(type_number) + " in parallel.  "
+              + str(time.perf_counter() - self.start_time))
+        unplaced_events_lists = []
+        with self.phase("construction and tabu search " + str(type_number)):
+            optimise_rooms = self.optimise_rooms and type_number == 4
+            phases = ["construction " + str(type_number), "tabu search " + str(type_number)]
+            if optimise_rooms:
+                phases.append("rooms " + str(type_number))
+            phase_times = self.get_phase_times(phases)
+            if self.deadline is not None:
+                rounds = -(-len(events_lists) // self.workers)
+                phase_times = [phase_time / rounds for phase_time in phase_times]
+            construction_time, max_time = phase_times[:2]
+            rooms_time = phase_times[2] if optimise_rooms else None
+            futures = []
+            for index, events in enumerate(events_lists):
+                futures.append(self.executor.submit(solve_sub_problem, events, timetables[index], self.courses_set,
+                                                    max_time, optimise_rooms, self.construction_engine,
+                                                    construction_time, rooms_time))
+
+            for index, future in enumerate(futures):
+                unplaced_events, timetable, occupancy, course_hours_changes, telemetry = future.result()
+                self.context.telemetry.merge(telemetry)
+                self.context.import_week_occupancy(timetables[index].offset, occupancy)
+                for course_code, change in course_hours_changes.items():
+                    self.context.courses_dict[course_code].course_hours += change
+                timetable.context = self.context
+                timetables[index] = timetable
+                unplaced_events_lists.append(unplaced_events)
+        self.unplaced_counts[type_number] = sum(len(events) for events in unplaced_events_lists)
+        print("Construction and tabu search on timetable type " + str(type_number) + " is finished.  "
+              + str(time.perf_counter() - self.start_time))
+        return unplaced_events_lists
+
+    def optimise_rooms_of_timetables(self, type_number, timetables):
+        """
+        This function assigns the rooms of every time slot optimally, the events keep their time slots.
+        :param type_number: the type of the events, only used for printing
+        :param timetables: list of instances of TimeTable
+        """
+        print("Starting room assignment on timetable type " + str(type_number) + ".  "
+              + str(time.perf_counter() - self.start_time))
+        with self.phase("rooms " + str(type_number)):
+            difference = 0
+            max_times = self.share_phase_time(self.get_phase_time("rooms " + str(type_number), len(timetables)),
+                                              len(timetables))
+            for timetable, max_time in zip(timetables, max_times):
+                difference += ra.RoomAssignment(timetable).optimise(max_time)
+        print("Room assignment on timetable type " + str(type_number) + " is finished, penalty changed by "
+              + str(difference) + ".  " + str(time.perf_counter() - self.start_time))
 
     @staticmethod
     def split(a, n):
         k, m = divmod(len(a), n)
         return (a[i * k + min(i, m):(i + 1) * k + min(i + 1, m)] for i in range(n))
+
+
+def solve_sub_problem(events, timetable, courses_set, max_time=None, optimise_rooms=False,
+                      construction_engine=ct.ConstructTimeTable, construction_time=None, rooms_time=None):
+    """
+    This function runs in a worker process, it constructs and repairs the timetable of one sub problem.
+    The timetable holds the worker's own copy of the context, so it never shares state with other sub problems.
+    :param events: list of course events that have to be placed
+    :param timetable: instance of TimeTable
+    :param courses_set: set of all courses
+    :param max_time: the amount of seconds for the tabu search, None for the default time
+    :param optimise_rooms: True to assign the rooms of every time slot optimally after the tabu search
+    :param construction_engine: the class that constructs the initial timetable, one of construction_engines
+    :param construction_time: the amount of seconds for the construction, None for no limit
+    :param rooms_time: the amount of seconds for the room assignment, None for no limit
+    :return: the unplaced events, the timetable, the occupancy of its week, the change of every course hours
+             and the exported telemetry of the worker
+    """
+    context = timetable.context
+    course_hours = {course_code: course.course_hours for course_code, course in context.courses_dict.items()}
+
+    construct_timetable = construction_engine(events_list=events,
+                                              courses_set=courses_set,
+                                              timetable=timetable)
+    events, timetable = construct_timetable.construct(construction_time)
+    feasible_timetable = ft.FeasibleTimetable(events=events,
+                                              timetable=timetable)
+    if max_time is None:
+        max_time = default_time_limits["tabu search"]
+    events, timetable = feasible_timetable.tabu_search(max_time)
+    if optimise_rooms:
+        ra.RoomAssignment(timetable).optimise(rooms_time)
+
+    course_hours_changes = {}
+    for course_code, course in context.courses_dict.items():
+        if course.course_hours != course_hours[course_code]:
+            course_hours_changes[course_code] = course.course_hours - course_hours[course_code]
+    return events, timetable, context.export_week_occupancy(timetable.offset), course_hours_changes, \
+        context.telemetry.export()